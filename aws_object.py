@@ -1,15 +1,206 @@
 import boto3
+import csv
+import functools
+import glob
+import hashlib
+import json
+import mmap
 import os
-from botocore.exceptions import ClientError
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+from botocore.utils import determine_content_length
+from urllib.parse import urlencode
 import uuid
 
 class AwsObject():
-    def __init__(self,aws_access_key_id,aws_secret_access_key,owner,region_name = "us-east-1"):
+    def __init__(self,aws_access_key_id,aws_secret_access_key,owner,region_name = "us-east-1",max_pool_connections = 10,endpoint_url = None,
+                 max_request_rate = None,retry_mode = "standard",max_attempts = 5):
         self.aws_access_key_id = aws_access_key_id
         self.aws_secret_access_key = aws_secret_access_key
         self.created_by = "platform-cli"
         self.owner = owner
         self.region_name = region_name
+        self.max_pool_connections = max_pool_connections
+        self.endpoint_url = endpoint_url
+        # Requests per second allowed per (service, region), shared by all threads; None = unlimited
+        self.max_request_rate = max_request_rate
+        # botocore retry mode ("standard", "adaptive" or "legacy") and attempts including the first
+        self.retry_mode = retry_mode
+        self.max_attempts = max_attempts
+        self._rate_limiters = {}
+        # A CallProfiler set here records every API call made by this object's clients
+        self.profiler = None
+        # One session per AwsObject; clients are cached by (service, region, endpoint)
+        # so service models are loaded and connections are opened only once.
+        self._session = None
+        self._clients = {}
+        self._lock = threading.RLock()
+        # boto3 resources are not thread safe, so they are cached per thread
+        self._local = threading.local()
+        self._bucket_regions = None
+        self._inventory = None
+        self._hosted_zone_ids = None
+        self._enabled_regions = None
+        # Seconds the local inventory answers list commands before resyncing
+        self.inventory_ttl = 300
+        # Seconds the discovered list of enabled regions is reused
+        self.regions_ttl = 86400
+
+    @property
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                self._session = boto3.session.Session(
+                    aws_access_key_id=self.aws_access_key_id,
+                    aws_secret_access_key=self.aws_secret_access_key,
+                    region_name=self.region_name
+                )
+            return self._session
+
+    def client_config(self, pool_size=None):
+        return Config(
+            max_pool_connections=pool_size or self.max_pool_connections,
+            retries={'mode': self.retry_mode, 'total_max_attempts': self.max_attempts}
+        )
+
+    def rate_limiter(self, service, region_name=None):
+        # One token bucket per (service, region): every client, resource and
+        # thread talking to that endpoint draws from it
+        if not self.max_request_rate:
+            return None
+        key = (service, region_name or self.region_name)
+        with self._lock:
+            limiter = self._rate_limiters.get(key)
+            if limiter is None:
+                limiter = self._rate_limiters[key] = RateLimiter(self.max_request_rate)
+            return limiter
+
+    def _hook_events(self, client, service, region_name):
+        # before-send fires for every HTTP attempt, retries included; pacing
+        # runs ahead of any other handler that might answer the request
+        limiter = self.rate_limiter(service, region_name)
+        if limiter is not None:
+            client.meta.events.register_first('before-send', limiter.before_send)
+        # Profiling hooks are always registered and cost one attribute check
+        # while no profiler is set, so a profiler can be attached to a warm object
+        for event, method in CallProfiler.events:
+            client.meta.events.register(event, functools.partial(self._profile_event, method, region_name))
+        return client
+
+    def _profile_event(self, method, region_name, **kwargs):
+        profiler = self.profiler
+        if profiler is not None:
+            getattr(profiler, method)(region_name=region_name, **kwargs)
+
+    def client(self, service, region_name=None, endpoint_url=None, pool_size=None):
+        # pool_size asks for a client with a bigger connection pool, for callers
+        # running more concurrent requests than max_pool_connections; it gets a
+        # client of its own so the default one keeps its size
+        key = (service, region_name or self.region_name, endpoint_url or self.endpoint_url)
+        if pool_size and pool_size > self.max_pool_connections:
+            key += (pool_size,)
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                # Session.client is not thread safe, so creation stays under the lock
+                client = self.session.client(
+                    service,
+                    region_name=key[1],
+                    endpoint_url=key[2],
+                    config=self.client_config(key[3] if len(key) > 3 else None)
+                )
+                self._clients[key] = self._hook_events(client, service, key[1])
+            return client
+
+    def resource(self, service, region_name=None, endpoint_url=None):
+        key = (service, region_name or self.region_name, endpoint_url or self.endpoint_url)
+        resources = getattr(self._local, "resources", None)
+        if resources is None:
+            resources = self._local.resources = {}
+        resource = resources.get(key)
+        if resource is None:
+            with self._lock:
+                resource = self.session.resource(
+                    service,
+                    region_name=key[1],
+                    endpoint_url=key[2],
+                    config=self.client_config()
+                )
+                self._hook_events(resource.meta.client, service, key[1])
+            resources[key] = resource
+        return resource
+
+    @property
+    def bucket_regions(self):
+        # Bucket names are global, so one bucket -> region cache serves every account
+        with self._lock:
+            if self._bucket_regions is None:
+                self._bucket_regions = JsonCache(os.path.join(cache_dir(), "bucket-regions.json"))
+            return self._bucket_regions
+
+    @property
+    def hosted_zone_ids(self):
+        with self._lock:
+            if self._hosted_zone_ids is None:
+                self._hosted_zone_ids = JsonCache(os.path.join(cache_dir(), "hosted-zones.json"))
+            return self._hosted_zone_ids
+
+    @property
+    def inventory(self):
+        with self._lock:
+            if self._inventory is None:
+                self._inventory = Inventory(os.path.join(cache_dir(), "inventory.sqlite3"))
+            return self._inventory
+
+    @property
+    def inventory_owner(self):
+        # Owner tags are only unique within an account, so inventory scopes are keyed by access key as well
+        return f"{self.aws_access_key_id}/{self.owner}"
+
+    def enabled_regions(self, refresh=False):
+        # DescribeRegions only returns the regions enabled for the account. That
+        # rarely changes, so the answer is cached per access key.
+        with self._lock:
+            if self._enabled_regions is None:
+                self._enabled_regions = JsonCache(os.path.join(cache_dir(), "regions.json"))
+        cached = self._enabled_regions.get(self.aws_access_key_id)
+        if not refresh and cached and time.time() - cached['fetched_at'] < self.regions_ttl:
+            return cached['regions']
+        response = self.client('ec2').describe_regions()
+        regions = sorted(region['RegionName'] for region in response['Regions'])
+        self._enabled_regions.set(self.aws_access_key_id, {'regions': regions, 'fetched_at': time.time()})
+        self._enabled_regions.save()
+        return regions
+
+    def map_regions(self, fn, regions, max_workers=8):
+        # Runs fn(region) for every region over a bounded pool and yields one
+        # {'Region', 'Result' or 'Error', 'Elapsed'} dict as each region finishes,
+        # so a slow or failing region never holds back or fails the others.
+        def run(region):
+            start = time.perf_counter()
+            try:
+                outcome = {'Region': region, 'Result': fn(region)}
+            except (ClientError, BotoCoreError) as e:
+                outcome = {'Region': region, 'Error': str(e)}
+            outcome['Elapsed'] = time.perf_counter() - start
+            return outcome
+
+        executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(regions))))
+        try:
+            for future in as_completed([executor.submit(run, region) for region in regions]):
+                yield future.result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
     def save_creadencial(self):
         folder_pat = os.path.join(os.path.expanduser('~'),".aws")        
         try:
@@ -30,113 +221,537 @@ class AwsObject():
     
     def valid_user(self):
         try:
-            iam_client = boto3.client(
-                'iam',
-                aws_access_key_id=self.aws_access_key_id,
-                aws_secret_access_key=self.aws_secret_access_key
-            )
+            iam_client = self.client('iam')
             response = iam_client.get_user()
             return True
         except Exception as e:
             return False
         
 
+def cache_dir():
+    # Local caches live next to the credentials written by save_creadencial
+    return os.environ.get("AWSCTL_CACHE_DIR") or os.path.join(os.path.expanduser('~'), ".aws", "awsctl")
+
+
+class RateLimiter():
+    # Token bucket shared between threads. Each caller reserves the next free
+    # slot under the lock and sleeps outside it, so callers are served in order
+    # and never busy-wait.
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or max(1.0, self.rate))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        # Takes a token and returns how long the caller must wait for it
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def before_send(self, **kwargs):
+        self.acquire()
+
+
+class CallProfiler():
+    # Records one entry per API call from botocore's call events: latency,
+    # attempts, bytes and status. Thread safe; summary() and chrome_trace()
+    # report on what was collected.
+    events = (
+        ('before-call', 'before_call'),
+        ('request-created', 'request_created'),
+        ('after-call', 'after_call'),
+        ('after-call-error', 'after_call_error'),
+    )
+
+    def __init__(self):
+        self.calls = []
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def before_call(self, model, context, region_name, **kwargs):
+        context['awsctl_call'] = {
+            'service': model.service_model.service_name,
+            'operation': model.name,
+            'region': region_name,
+            'start': time.perf_counter(),
+            'attempts': 0,
+            'bytes_out': 0,
+            'thread': threading.current_thread().name,
+        }
+
+    def request_created(self, request, region_name, **kwargs):
+        call = getattr(request, 'context', {}).get('awsctl_call')
+        if call is None:
+            return
+        call['attempts'] += 1
+        # Streams of unknown length (chunked uploads) count as 0
+        call['bytes_out'] += determine_content_length(request.body) or 0
+
+    def after_call(self, http_response, model, context, region_name, **kwargs):
+        length = http_response.headers.get('content-length')
+        if length is not None:
+            bytes_in = int(length)
+        elif not model.has_streaming_output:
+            bytes_in = len(http_response.content or b'')
+        else:
+            # Reading a streaming body here would consume it
+            bytes_in = 0
+        self._finish(context, http_response.status_code, bytes_in)
+
+    def after_call_error(self, exception, context, region_name, **kwargs):
+        self._finish(context, type(exception).__name__, 0)
+
+    def _finish(self, context, status, bytes_in):
+        call = context.pop('awsctl_call', None)
+        if call is None:
+            return
+        call['end'] = time.perf_counter()
+        call['status'] = status
+        call['bytes_in'] = bytes_in
+        call['retries'] = max(call.pop('attempts') - 1, 0)
+        with self._lock:
+            self.calls.append(call)
+
+    def summary(self):
+        # One row per (service, operation, region), slowest total first
+        rows = {}
+        for call in self.calls:
+            key = (call['service'], call['operation'], call['region'])
+            row = rows.setdefault(key, {'service': key[0], 'operation': key[1], 'region': key[2], 'calls': 0, 'errors': 0,
+                                        'retries': 0, 'total': 0.0, 'max': 0.0, 'bytes_out': 0, 'bytes_in': 0})
+            duration = call['end'] - call['start']
+            row['calls'] += 1
+            row['errors'] += 0 if isinstance(call['status'], int) and call['status'] < 300 else 1
+            row['retries'] += call['retries']
+            row['total'] += duration
+            row['max'] = max(row['max'], duration)
+            row['bytes_out'] += call['bytes_out']
+            row['bytes_in'] += call['bytes_in']
+        return sorted(rows.values(), key=lambda row: row['total'], reverse=True)
+
+    def format_summary(self):
+        header = ('service', 'operation', 'region', 'calls', 'errors', 'retries', 'total ms', 'avg ms', 'max ms', 'bytes out', 'bytes in')
+        lines = [header]
+        for row in self.summary():
+            lines.append((row['service'], row['operation'], row['region'], row['calls'], row['errors'], row['retries'],
+                          f"{row['total'] * 1000:.1f}", f"{row['total'] * 1000 / row['calls']:.1f}", f"{row['max'] * 1000:.1f}",
+                          row['bytes_out'], row['bytes_in']))
+        widths = [max(len(str(line[i])) for line in lines) for i in range(len(header))]
+        text = ['  '.join(str(value).ljust(width) if i < 3 else str(value).rjust(width)
+                          for i, (value, width) in enumerate(zip(line, widths))) for line in lines]
+        busy = sum(call['end'] - call['start'] for call in self.calls)
+        text.append(f"{len(self.calls)} calls, {busy * 1000:.1f} ms in calls, {(time.perf_counter() - self.started) * 1000:.1f} ms wall")
+        return '\n'.join(text)
+
+    def chrome_trace(self):
+        # Chrome trace-event format (chrome://tracing, Perfetto): one complete
+        # event per call on a row per thread, so overlap shows concurrency
+        threads = {}
+        events = []
+        for call in sorted(self.calls, key=lambda call: call['start']):
+            tid = threads.setdefault(call['thread'], len(threads) + 1)
+            events.append({
+                'name': f"{call['service']}.{call['operation']}",
+                'cat': call['service'],
+                'ph': 'X',
+                'ts': round((call['start'] - self.started) * 1e6, 1),
+                'dur': round((call['end'] - call['start']) * 1e6, 1),
+                'pid': os.getpid(),
+                'tid': tid,
+                'args': {key: call[key] for key in ('region', 'status', 'retries', 'bytes_out', 'bytes_in')},
+            })
+        for name, tid in threads.items():
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid, 'args': {'name': name}})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write_trace(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.chrome_trace(), f)
+
+
+class JsonCache():
+    # Small thread-safe dict persisted as JSON; writes are atomic and only
+    # happen when something changed.
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = None
+        self._dirty = False
+
+    def _load(self):
+        if self._data is None:
+            try:
+                with open(self.path) as f:
+                    self._data = json.load(f)
+            except (OSError, ValueError):
+                self._data = {}
+        return self._data
+
+    def get(self, key):
+        with self._lock:
+            return self._load().get(key)
+
+    def set(self, key, value):
+        with self._lock:
+            data = self._load()
+            if data.get(key) != value:
+                data[key] = value
+                self._dirty = True
+
+    def discard(self, key):
+        with self._lock:
+            if self._load().pop(key, None) is not None:
+                self._dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._data, f)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+
+class Inventory():
+    # SQLite index of the resources this tool created or discovered. Rows are
+    # grouped in scopes of (kind, owner, region), owner being AwsObject.inventory_owner;
+    # a scope is fresh while its last full sync is younger than the caller's TTL.
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self):
+        if not self._ready:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        if not self._ready:
+            with conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS resources ("
+                             "kind TEXT, owner TEXT, region TEXT, resource_id TEXT, data TEXT, "
+                             "PRIMARY KEY (kind, owner, region, resource_id))")
+                conn.execute("CREATE TABLE IF NOT EXISTS syncs ("
+                             "kind TEXT, owner TEXT, region TEXT, synced_at REAL, "
+                             "PRIMARY KEY (kind, owner, region))")
+            self._ready = True
+        return conn
+
+    def _run(self, fn):
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    return fn(conn)
+            finally:
+                conn.close()
+
+    def is_fresh(self, kind, owner, region, ttl):
+        if not ttl or ttl <= 0:
+            return False
+        row = self._run(lambda conn: conn.execute(
+            "SELECT synced_at FROM syncs WHERE kind=? AND owner=? AND region=?",
+            (kind, owner, region)).fetchone())
+        return row is not None and time.time() - row[0] < ttl
+
+    def items(self, kind, owner, region):
+        rows = self._run(lambda conn: conn.execute(
+            "SELECT data FROM resources WHERE kind=? AND owner=? AND region=? ORDER BY resource_id",
+            (kind, owner, region)).fetchall())
+        return [json.loads(row[0]) for row in rows]
+
+    def record(self, kind, owner, region, items, id_key, full=True, batch_size=100):
+        # Passes items through while writing them to the index in batches. A
+        # full record replaces the scope and marks it synced once the stream
+        # is exhausted, so an interrupted listing never looks fresh.
+        seen = set()
+        batch = []
+        for item in items:
+            seen.add(item[id_key])
+            batch.append(item)
+            if len(batch) >= batch_size:
+                self.upsert(kind, owner, region, batch, id_key)
+                batch = []
+            yield item
+        self.upsert(kind, owner, region, batch, id_key)
+        if not full:
+            return
+
+        def fn(conn):
+            stored = conn.execute(
+                "SELECT resource_id FROM resources WHERE kind=? AND owner=? AND region=?",
+                (kind, owner, region)).fetchall()
+            conn.executemany(
+                "DELETE FROM resources WHERE kind=? AND owner=? AND region=? AND resource_id=?",
+                [(kind, owner, region, row[0]) for row in stored if row[0] not in seen])
+            conn.execute("INSERT OR REPLACE INTO syncs VALUES (?, ?, ?, ?)", (kind, owner, region, time.time()))
+        self._run(fn)
+
+    def upsert(self, kind, owner, region, items, id_key):
+        if not items:
+            return
+        self._run(lambda conn: conn.executemany(
+            "INSERT OR REPLACE INTO resources VALUES (?, ?, ?, ?, ?)",
+            [(kind, owner, region, item[id_key], json.dumps(item, default=str)) for item in items]))
+
+    def update(self, kind, owner, region, resource_id, fn):
+        # Applies fn to the stored item in place; unknown resources are ignored
+        def apply(conn):
+            row = conn.execute(
+                "SELECT data FROM resources WHERE kind=? AND owner=? AND region=? AND resource_id=?",
+                (kind, owner, region, resource_id)).fetchone()
+            if row is None:
+                return
+            item = json.loads(row[0])
+            fn(item)
+            conn.execute(
+                "UPDATE resources SET data=? WHERE kind=? AND owner=? AND region=? AND resource_id=?",
+                (json.dumps(item, default=str), kind, owner, region, resource_id))
+        self._run(apply)
+
+    def invalidate(self, kind, owner, region):
+        # Keeps the rows but forces the next list to resync
+        self._run(lambda conn: conn.execute(
+            "DELETE FROM syncs WHERE kind=? AND owner=? AND region=?", (kind, owner, region)))
+
+
 class Ec2():
     def __init__(self,aws_object: AwsObject,region_name = None):
         self.valid_type = ["t3.micro","t2.small"]
-        self.max_instnces = 2
+        self.max_instnces = int(os.environ.get("AWSCTL_MAX_INSTANCES", 2))
         self.valid_images = [{"ubuntu":"ami-020cba7c55df1f615","amazon-linux":"ami-00ca32bbc84273381"}]
         self.aws_object = aws_object
         self.region_name = region_name or self.aws_object.region_name
+        # Instance IDs sent per StopInstances/StartInstances call
+        self.batch_size = 100
+        # Values allowed in one DescribeInstances filter
+        self.filter_size = 200
 
 
-    def create_ec2(self,type = "t3.micro",image_id_or_name = "ami-020cba7c55df1f615"):
+    # States that count towards the owner's instance cap
+    active_states = ["pending", "running", "stopping", "stopped"]
+    # States an instance only passes through; an index holding one of these is stale within seconds
+    transitional_states = ("pending", "stopping", "shutting-down")
+    # Errors caused by one instance in a batch; only these are worth retrying ID by ID
+    per_instance_error_codes = ("IncorrectInstanceState", "InvalidInstanceID.NotFound", "InvalidInstanceID.Malformed", "UnsupportedOperation")
+
+    def create_ec2(self,type = "t3.micro",image_id_or_name = "ami-020cba7c55df1f615",count = 1):
+        # Launches count instances in one RunInstances call and returns their IDs
         if type not in self.valid_type:
             return f"instance type must one of {self.valid_type}"
+        image_id = None
         for name, id in self.valid_images[0].items():
             if name == image_id_or_name or id == image_id_or_name:
-                image_id_or_name = id
-                ec2 = boto3.resource(
-                    'ec2',
-                    region_name=self.region_name,
-                    aws_access_key_id=self.aws_object.aws_access_key_id,
-                    aws_secret_access_key=self.aws_object.aws_secret_access_key
-                )
-                try:
-                    instances = ec2.create_instances(
-                        
-                        ImageId=image_id_or_name,
-                        InstanceType=type,
-                        MinCount = 1,
-                        MaxCount = 1,
-                        TagSpecifications = [{"ResourceType": "instance", "Tags": [{"Key": "CreatedBy", "Value": self.aws_object.created_by}, {"Key": "Owner", "Value": self.aws_object.owner}]}],
-
-                    )
-                except Exception as e:
-                    print(f"Error creating EC2 instance: {e}")
-                return True
-            return f"instance type must one of {self.valid_images}"
+                image_id = id
+        if image_id is None:
+            return f"image must be one of {self.valid_images}"
+        if count < 1:
+            return "count must be at least 1"
+        # One listing of the owner's live instances enforces the cap for the whole launch
+        existing = sum(1 for _ in self.iter_instances(states=self.active_states))
+        if existing + count > self.max_instnces:
+            return f"owner {self.aws_object.owner} has {existing} instances; launching {count} more would exceed the limit of {self.max_instnces}"
+        ec2 = self.aws_object.client('ec2', self.region_name)
+        try:
+            response = ec2.run_instances(
+                ImageId=image_id,
+                InstanceType=type,
+                MinCount = count,
+                MaxCount = count,
+                TagSpecifications = [{"ResourceType": "instance", "Tags": [{"Key": "CreatedBy", "Value": self.aws_object.created_by}, {"Key": "Owner", "Value": self.aws_object.owner}]}],
+            )
+        except ClientError as e:
+            return f"Error creating EC2 instance: {e}"
+        # New instances are still pending, so the next listing resyncs rather
+        # than serving that state from the index until the TTL runs out
+        self.aws_object.inventory.upsert(*self._inventory_scope(), response['Instances'], 'InstanceId')
+        self.aws_object.inventory.invalidate(*self._inventory_scope())
+        return [instance['InstanceId'] for instance in response['Instances']]
 
 
 
-    def get_id(self):
-        ec2 = boto3.client(
-            'ec2',
-            region_name=self.region_name,
-            aws_access_key_id=self.aws_object.aws_access_key_id,
-            aws_secret_access_key=self.aws_object.aws_secret_access_key
-        )
+    def iter_instances(self, states=None, instance_types=None, tags=None, page_size=None):
+        # Yields owned instances page by page so callers can stream them
+        ec2 = self.aws_object.client('ec2', self.region_name)
         custom_filter = [{
             'Name':'tag:Owner', 
             'Values': [self.aws_object.owner]},{
             'Name':'tag:CreatedBy', 
             'Values': [self.aws_object.created_by]}]
-            
-        response = ec2.describe_instances(Filters=custom_filter)
-        instance_ids = []
-        for reservation in response['Reservations']:
-            for instance in reservation['Instances']:
-                instance_ids.append(instance['InstanceId'])
-        
-        return instance_ids
+        if states:
+            custom_filter.append({'Name': 'instance-state-name', 'Values': list(states)})
+        if instance_types:
+            custom_filter.append({'Name': 'instance-type', 'Values': list(instance_types)})
+        for key, value in (tags or {}).items():
+            custom_filter.append({'Name': f'tag:{key}', 'Values': [value]})
+
+        pagination = {'PageSize': page_size} if page_size else {}
+        paginator = ec2.get_paginator('describe_instances')
+        for page in paginator.paginate(Filters=custom_filter, PaginationConfig=pagination):
+            for reservation in page['Reservations']:
+                for instance in reservation['Instances']:
+                    yield instance
+
+    def get_id(self, states=None, instance_types=None, tags=None, page_size=None):
+        return [instance['InstanceId'] for instance in self.iter_instances(states, instance_types, tags, page_size)]
+
+    def _inventory_scope(self):
+        return ('instance', self.aws_object.inventory_owner, self.region_name)
+
+    def list_instances(self, states=None, instance_types=None, tags=None, page_size=None, refresh=False):
+        # Answers from the local inventory while it is fresh, otherwise streams from AWS
+        inventory = self.aws_object.inventory
+        scope = self._inventory_scope()
+        if not refresh and inventory.is_fresh(*scope, self.aws_object.inventory_ttl):
+            for instance in inventory.items(*scope):
+                if self._matches(instance, states, instance_types, tags):
+                    yield instance
+            return
+        # A filtered listing is not the whole fleet, so it only updates what it saw
+        full = not (states or instance_types or tags)
+        yield from inventory.record(*scope, self.iter_instances(states, instance_types, tags, page_size), 'InstanceId', full=full)
+
+    @staticmethod
+    def _matches(instance, states, instance_types, tags):
+        if states and instance['State']['Name'] not in states:
+            return False
+        if instance_types and instance['InstanceType'] not in instance_types:
+            return False
+        instance_tags = {tag['Key']: tag['Value'] for tag in instance.get('Tags', [])}
+        return all(instance_tags.get(key) == value for key, value in (tags or {}).items())
+
+    def _record_states(self, report):
+        # Settled states are written in place; a transitional one (what
+        # StopInstances/StartInstances return) also marks the scope for a resync
+        def set_state(state):
+            def fn(instance):
+                instance['State']['Name'] = state
+            return fn
+        inventory = self.aws_object.inventory
+        scope = self._inventory_scope()
+        transitional = False
+        for item in report:
+            if 'CurrentState' in item:
+                inventory.update(*scope, item['InstanceId'], set_state(item['CurrentState']))
+                transitional = transitional or item['CurrentState'] in self.transitional_states
+        if transitional:
+            inventory.invalidate(*scope)
 
     def stop(self,id):
-        ec2 = boto3.resource(
-            'ec2',
-            region_name=self.region_name,
-            aws_access_key_id=self.aws_object.aws_access_key_id,
-            aws_secret_access_key=self.aws_object.aws_secret_access_key
-        )
+        ec2 = self.aws_object.resource('ec2', self.region_name)
         instance = ec2.Instance(id=id)
-        instance.stop()
+        response = instance.stop()
+        self._record_states(self._state_report(response, 'StoppingInstances'))
+        return response
     
     def stop_all(self):
-        ids = self.get_id()
-        if ids == None:
+        ids = self.get_id(states=["running"])
+        if not ids:
             return "There is no instances"
-        for id in ids:
-            self.stop(id)
-        return True
+        return self._change_state('stop_instances', 'StoppingInstances', ids)
 
     def start(self,id):
-        ec2 = boto3.resource(
-            'ec2',
-            region_name=self.region_name,
-            aws_access_key_id=self.aws_object.aws_access_key_id,
-            aws_secret_access_key=self.aws_object.aws_secret_access_key
-        )
+        ec2 = self.aws_object.resource('ec2', self.region_name)
         instance = ec2.Instance(id=id)
         response = instance.start()
+        self._record_states(self._state_report(response, 'StartingInstances'))
         return response
    
         
     def start_all(self):
-        ids = self.get_id()
-        if ids == None:
+        ids = self.get_id(states=["stopped"])
+        if not ids:
             return "There is no instances"
-        for id in ids:
-            self.start(id)
-        return True
+        return self._change_state('start_instances', 'StartingInstances', ids)
+
+    def _change_state(self, operation, result_key, ids):
+        # Send the IDs in chunks and return one report entry per instance
+        ec2 = self.aws_object.client('ec2', self.region_name)
+        call = getattr(ec2, operation)
+        report = []
+        for i in range(0, len(ids), self.batch_size):
+            chunk = ids[i:i + self.batch_size]
+            try:
+                report.extend(self._state_report(call(InstanceIds=chunk), result_key))
+            except ClientError as e:
+                code = e.response['Error'].get('Code')
+                if code not in self.per_instance_error_codes:
+                    # Throttling, auth and permission errors would hit every single-ID call too
+                    report.extend({'InstanceId': id, 'Error': code} for id in chunk)
+                    continue
+                # One bad instance fails the whole call; retry one by one to isolate it
+                for id in chunk:
+                    try:
+                        report.extend(self._state_report(call(InstanceIds=[id]), result_key))
+                    except ClientError as e:
+                        report.append({'InstanceId': id, 'Error': e.response['Error'].get('Code')})
+        self._record_states(report)
+        return report
+
+    def _describe_states(self, ids):
+        # Filtering on instance-id (rather than InstanceIds=) means one vanished
+        # instance cannot fail the whole call
+        ec2 = self.aws_object.client('ec2', self.region_name)
+        paginator = ec2.get_paginator('describe_instances')
+        states = {}
+        for i in range(0, len(ids), self.filter_size):
+            chunk = ids[i:i + self.filter_size]
+            for page in paginator.paginate(Filters=[{'Name': 'instance-id', 'Values': chunk}]):
+                for reservation in page['Reservations']:
+                    for instance in reservation['Instances']:
+                        states[instance['InstanceId']] = instance['State']['Name']
+        return states
+
+    def wait_for_state(self, ids, state, timeout=600, delay=2, max_delay=15, progress=None):
+        # Polls all still-pending instances with one batched DescribeInstances per
+        # interval. The interval doubles (up to max_delay) while nothing moves and
+        # drops back to delay once something does. progress(done, total) is called
+        # after every poll. Returns ({id: state} reached, {id: state} still pending).
+        pending = {id: None for id in ids}
+        done = {}
+        deadline = time.monotonic() + timeout
+        interval = delay
+        while pending:
+            moved = False
+            for id, current in self._describe_states(list(pending)).items():
+                if current == state or current == 'terminated':
+                    del pending[id]
+                    done[id] = current
+                    moved = True
+                elif pending[id] != current:
+                    pending[id] = current
+                    moved = True
+            if progress:
+                progress(len(done), len(ids))
+            remaining = deadline - time.monotonic()
+            if not pending or remaining <= 0:
+                break
+            interval = delay if moved else min(interval * 2, max_delay)
+            time.sleep(min(interval, remaining))
+        self._record_states([{'InstanceId': id, 'CurrentState': current}
+                             for id, current in {**pending, **done}.items() if current])
+        return done, pending
+
+    @staticmethod
+    def _state_report(response, result_key):
+        return [{
+            'InstanceId': item['InstanceId'],
+            'PreviousState': item['PreviousState']['Name'],
+            'CurrentState': item['CurrentState']['Name']
+        } for item in response[result_key]]
 
 
     def listec2(self):
@@ -148,17 +763,89 @@ class Ec2():
             ls += f"instance id: f{i}\n"
 
 
+class _BufferReader():
+    # Read-only file object over a slice of a reused part buffer. botocore
+    # reads request bodies in chunks, so a part is never copied as a whole.
+    def __init__(self, view):
+        self.view = view
+        self.position = 0
+
+    def __len__(self):
+        return len(self.view)
+
+    def read(self, size=-1):
+        end = len(self.view) if size is None or size < 0 else min(self.position + size, len(self.view))
+        data = bytes(self.view[self.position:end])
+        self.position = end
+        return data
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        self.position = (0, self.position, len(self.view))[whence] + offset
+        return self.position
+
+    def tell(self):
+        return self.position
+
+
 class S3():
+    # Errors S3 returns when a request reaches the wrong regional endpoint
+    wrong_region_codes = ('PermanentRedirect', 'AuthorizationHeaderMalformed', 'IllegalLocationConstraintException', '301')
+    # Ranged downloads: bytes per GetObject range, per body read, and requests per range
+    download_part_size = 8 * 1024 * 1024
+    read_size = 1024 * 1024
+    download_attempts = 3
+    # Streamed uploads do not know their length: part sizes double every
+    # 1,000 parts so the 10,000-part limit is reached only after terabytes
+    part_growth_every = 1000
+    max_parts = 10000
+    max_part_size = 5 * 1024 ** 3
+
     def __init__(self, aws_object: AwsObject):
         self.aws_object = aws_object
 
+    def bucket_region(self, bucket_name: str):
+        cache = self.aws_object.bucket_regions
+        region = cache.get(bucket_name)
+        if region:
+            return region
+        s3_client = self.aws_object.client('s3')
+        try:
+            location = s3_client.get_bucket_location(Bucket=bucket_name)['LocationConstraint']
+            # us-east-1 reports no constraint and the oldest EU buckets report "EU"
+            region = {None: 'us-east-1', '': 'us-east-1', 'EU': 'eu-west-1'}.get(location, location)
+        except ClientError as e:
+            # GetBucketLocation needs s3:GetBucketLocation; S3 often names the region in
+            # the error's headers, and HeadBucket returns it even when access is denied
+            region = self._region_header(e.response)
+            if not region:
+                try:
+                    region = self._region_header(s3_client.head_bucket(Bucket=bucket_name))
+                except ClientError as head_error:
+                    region = self._region_header(head_error.response)
+            if not region:
+                raise
+        cache.set(bucket_name, region)
+        return region
+
+    @staticmethod
+    def _region_header(response):
+        return response.get('ResponseMetadata', {}).get('HTTPHeaders', {}).get('x-amz-bucket-region')
+
+    def bucket_client(self, bucket_name: str, pool_size=None):
+        return self.aws_object.client('s3', self.bucket_region(bucket_name), pool_size=pool_size)
+
+    def _call_bucket(self, bucket_name, fn, pool_size=None):
+        # Runs fn(client) against the bucket's region, re-resolving once if the cached region is stale
+        try:
+            return fn(self.bucket_client(bucket_name, pool_size))
+        except ClientError as e:
+            if e.response['Error'].get('Code') not in self.wrong_region_codes:
+                raise
+            self.aws_object.bucket_regions.discard(bucket_name)
+            return fn(self.bucket_client(bucket_name, pool_size))
+
     def create_bucket(self, bucket_name: str):
-        s3_client = boto3.client(
-            's3',
-            region_name=self.aws_object.region_name,
-            aws_access_key_id=self.aws_object.aws_access_key_id,
-            aws_secret_access_key=self.aws_object.aws_secret_access_key
-        )
+        s3_client = self.aws_object.client('s3')
         try:
             kwargs = {'Bucket': bucket_name}
             if self.aws_object.region_name != 'us-east-1':
@@ -166,6 +853,7 @@ class S3():
                     'LocationConstraint': self.aws_object.region_name
                 }
             s3_client.create_bucket(**kwargs)
+            self.aws_object.bucket_regions.set(bucket_name, self.aws_object.region_name)
             s3_client.put_bucket_tagging(
                 Bucket=bucket_name,
                 Tagging={
@@ -175,68 +863,677 @@ class S3():
                     ]
                 }
             )
+            self.aws_object.inventory.upsert(*self._inventory_scope(), [{'Name': bucket_name, 'Region': self.aws_object.region_name}], 'Name')
             return True
         except Exception as e:
             print(f"Error creating bucket: {e}")
             return False
+        finally:
+            self.aws_object.bucket_regions.save()
         
-    def upload_file(self, bucket_name: str, file_path: str):
-        s3_client = boto3.client(
-            's3',
-            region_name=self.aws_object.region_name,
-            aws_access_key_id=self.aws_object.aws_access_key_id,
-            aws_secret_access_key=self.aws_object.aws_secret_access_key
-        )
-        object_name = os.path.basename(file_path)
+    @staticmethod
+    def transfer_config(multipart_threshold=None, multipart_chunksize=None, max_concurrency=None):
+        # Unset values keep boto3's defaults (8 MiB threshold/parts, 10 threads)
+        kwargs = {
+            'multipart_threshold': multipart_threshold,
+            'multipart_chunksize': multipart_chunksize,
+            'max_concurrency': max_concurrency,
+        }
+        return TransferConfig(**{k: v for k, v in kwargs.items() if v is not None})
+
+    def _tagging(self):
+        return f"Owner={self.aws_object.owner}&CreatedBy={self.aws_object.created_by}"
+
+    def _upload(self, bucket_name, file_path, key, transfer_config=None, workers=1):
+        # workers files at once, each with max_concurrency parts in flight, all on one client
+        transfer_config = transfer_config or self.transfer_config()
+        self._call_bucket(bucket_name, lambda s3_client: s3_client.upload_file(
+            file_path, bucket_name, key,
+            ExtraArgs={"Tagging": self._tagging()},
+            Config=transfer_config), pool_size=workers * transfer_config.max_concurrency)
+
+    def upload_file(self, bucket_name: str, file_path: str, key=None, transfer_config=None):
+        object_name = key or os.path.basename(file_path)
         try:
-            s3_client.upload_file(file_path, bucket_name, object_name, ExtraArgs={"Tagging": f"Owner={self.aws_object.owner}&CreatedBy={self.aws_object.created_by}"})
+            self._upload(bucket_name, file_path, object_name, transfer_config)
             return True
         except Exception as e:
             print(f"Error uploading file: {e}")
             return False
+        finally:
+            self.aws_object.bucket_regions.save()
 
-    def list_buckets(self):
-        s3_resource = boto3.resource(
-            's3',
-            region_name=self.aws_object.region_name,
-            aws_access_key_id=self.aws_object.aws_access_key_id,
-            aws_secret_access_key=self.aws_object.aws_secret_access_key
-        )
-        owned_buckets = []
-        for bucket in s3_resource.buckets.all():
+    def upload_stream(self, bucket_name: str, stream, key: str, transfer_config=None):
+        # Uploads a binary stream of unknown length (e.g. stdin) as a multipart
+        # upload; returns the number of bytes uploaded. Memory is bounded by
+        # max_concurrency + 1 part buffers, reused as parts finish: one is
+        # filled from the stream while the others upload. A stream that fits
+        # in one part is sent with a single PutObject.
+        transfer_config = transfer_config or self.transfer_config()
+        concurrency = transfer_config.max_concurrency
+        free = queue.Queue()
+        for _ in range(concurrency + 1):
+            # Allocated on first use, so short streams only ever need one
+            free.put(None)
+
+        def read_part(number):
+            size = min(transfer_config.multipart_chunksize * 2 ** ((number - 1) // self.part_growth_every), self.max_part_size)
+            buffer = free.get()
+            if buffer is None or len(buffer) < size:
+                buffer = bytearray(size)
+            view = memoryview(buffer)[:size]
+            filled = 0
+            while filled < size:
+                count = stream.readinto(view[filled:])
+                if not count:
+                    break
+                filled += count
+            return buffer, filled, size
+
+        buffer, filled, size = read_part(1)
+        if filled < size:
+            self._call_bucket(bucket_name, lambda s3_client: s3_client.put_object(
+                Bucket=bucket_name, Key=key, Body=_BufferReader(memoryview(buffer)[:filled]), Tagging=self._tagging()))
+            self.aws_object.bucket_regions.save()
+            return filled
+
+        # Tags given here are applied when the upload completes
+        upload_id = self._call_bucket(bucket_name, lambda s3_client: s3_client.create_multipart_upload(
+            Bucket=bucket_name, Key=key, Tagging=self._tagging()))['UploadId']
+        self.aws_object.bucket_regions.save()
+        s3_client = self.bucket_client(bucket_name, concurrency)
+        failed = []
+
+        def upload(number, buffer, filled):
             try:
-                bucket_tags = bucket.Tagging().tag_set
-                bucket_owner = None
-                bucket_creator = None
-                if not bucket_tags: # Handles buckets with empty tag sets
+                response = s3_client.upload_part(Bucket=bucket_name, Key=key, UploadId=upload_id, PartNumber=number,
+                                                 Body=_BufferReader(memoryview(buffer)[:filled]))
+            except Exception as e:
+                failed.append(e)
+                raise
+            finally:
+                free.put(buffer)
+            # Checksums botocore added to the part must be repeated on completion
+            part = {name: value for name, value in response.items() if name.startswith('Checksum')}
+            return dict(part, ETag=response['ETag'], PartNumber=number)
+
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        futures = []
+        total = 0
+        try:
+            number = 1
+            while filled:
+                futures.append(executor.submit(upload, number, buffer, filled))
+                total += filled
+                if filled < size:
+                    break
+                if failed:
+                    # Stop reading as soon as a part has failed
+                    raise failed[0]
+                number += 1
+                if number > self.max_parts:
+                    raise ValueError(f"stream needs more than {self.max_parts} parts; raise the part size")
+                buffer, filled, size = read_part(number)
+            parts = [future.result() for future in futures]
+            s3_client.complete_multipart_upload(Bucket=bucket_name, Key=key, UploadId=upload_id, MultipartUpload={'Parts': parts})
+        except BaseException:
+            executor.shutdown(wait=True, cancel_futures=True)
+            s3_client.abort_multipart_upload(Bucket=bucket_name, Key=key, UploadId=upload_id)
+            raise
+        finally:
+            executor.shutdown(wait=True)
+        return total
+
+    def upload_paths(self, bucket_name: str, paths, prefix="", max_workers=4, transfer_config=None):
+        # Uploads files, directories and globs; files run in parallel and each
+        # large file is also split into parallel multipart parts by transfer_config.
+        # Yields (path, key, error) as uploads finish; error is None on success.
+        yield from self._upload_many(bucket_name, expand_upload_paths(paths, prefix), max_workers, transfer_config)
+
+    def _upload_many(self, bucket_name, pairs, max_workers=4, transfer_config=None):
+        def upload(path, key):
+            try:
+                self._upload(bucket_name, path, key, transfer_config, max_workers)
+                return path, key, None
+            except Exception as e:
+                return path, key, e
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futures = [executor.submit(upload, path, key) for path, key in pairs]
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            self.aws_object.bucket_regions.save()
+
+    def iter_objects(self, bucket_name: str, prefix="", page_size=None):
+        paginator = self.bucket_client(bucket_name).get_paginator('list_objects_v2')
+        pagination = {'PageSize': page_size} if page_size else {}
+        for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix, PaginationConfig=pagination):
+            yield from page.get('Contents', [])
+
+    def iter_objects_sharded(self, bucket_name: str, prefix="", max_workers=None, shard_depth=1, delimiter="/", page_size=None):
+        # One continuation-token chain is one request at a time, however big the
+        # bucket. Here the first shard_depth levels under prefix are listed with
+        # the delimiter, and every common prefix found becomes a shard listed by
+        # its own chain on the pool. Objects arrive in no particular order; a
+        # bounded queue keeps the workers at most a few pages ahead of the caller.
+        max_workers = max_workers or self.aws_object.max_pool_connections
+        paginator = self.bucket_client(bucket_name, max_workers).get_paginator('list_objects_v2')
+        pagination = {'PageSize': page_size} if page_size else {}
+        pages = queue.Queue(maxsize=max_workers * 2)
+        stop = threading.Event()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+
+        def list_shard(shard, depth):
+            kwargs = {'Bucket': bucket_name, 'Prefix': shard, 'PaginationConfig': pagination}
+            if depth < shard_depth:
+                kwargs['Delimiter'] = delimiter
+            subshards = []
+            try:
+                for page in paginator.paginate(**kwargs):
+                    if stop.is_set():
+                        return
+                    put(('objects', page.get('Contents', []), None))
+                    subshards.extend(common['Prefix'] for common in page.get('CommonPrefixes', []))
+                put(('done', depth + 1, subshards))
+            except Exception as e:
+                put(('error', e, None))
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        running = 1
+        executor.submit(list_shard, prefix, 0)
+        try:
+            while running:
+                kind, value, subshards = pages.get()
+                if kind == 'objects':
+                    yield from value
+                elif kind == 'done':
+                    running += len(subshards) - 1
+                    for shard in subshards:
+                        executor.submit(list_shard, shard, value)
+                else:
+                    raise value
+        finally:
+            stop.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def delete_keys(self, bucket_name: str, keys):
+        # DeleteObjects takes up to 1000 keys; returns the keys that failed
+        s3_client = self.bucket_client(bucket_name)
+        failed = []
+        for i in range(0, len(keys), 1000):
+            errors = self._delete_batch(s3_client, bucket_name, [{'Key': key} for key in keys[i:i + 1000]])
+            failed.extend((error['Key'], error.get('Code')) for error in errors)
+        return failed
+
+    @staticmethod
+    def _delete_batch(s3_client, bucket_name, objects):
+        # Quiet mode only reports the keys that could not be deleted
+        response = s3_client.delete_objects(Bucket=bucket_name, Delete={'Objects': objects, 'Quiet': True})
+        return response.get('Errors', [])
+
+    def iter_object_versions(self, bucket_name: str, prefix=""):
+        # Every version and delete marker, as {'Key', 'VersionId'}
+        paginator = self.bucket_client(bucket_name).get_paginator('list_object_versions')
+        for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+            for version in page.get('Versions', []) + page.get('DeleteMarkers', []):
+                yield {'Key': version['Key'], 'VersionId': version['VersionId']}
+
+    def delete_prefix(self, bucket_name: str, prefix="", versions=False, max_workers=8, batch_size=1000):
+        # Pipelines the listing into DeleteObjects batches: the listing keeps
+        # paging in this thread while up to max_workers batches are in flight.
+        # With versions, every version and delete marker is removed for good;
+        # without, a versioned bucket only gets delete markers.
+        # Yields (deleted, errors) per batch as batches finish; errors are the
+        # DeleteObjects Errors entries (Key, VersionId, Code, Message).
+        s3_client = self.bucket_client(bucket_name, max_workers)
+        if versions:
+            targets = self.iter_object_versions(bucket_name, prefix)
+        else:
+            targets = ({'Key': obj['Key']} for obj in self.iter_objects(bucket_name, prefix))
+
+        def delete(objects):
+            errors = self._delete_batch(s3_client, bucket_name, objects)
+            return len(objects) - len(errors), errors
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        pending = set()
+        try:
+            batch = []
+            for target in targets:
+                batch.append(target)
+                if len(batch) < batch_size:
                     continue
-                for tag in bucket_tags:
-                    if tag['Key'] == 'Owner':
-                        bucket_owner = tag['Value']
-                    if tag['Key'] == 'CreatedBy':
-                        bucket_creator = tag['Value']
-                if bucket_owner == self.aws_object.owner and bucket_creator == self.aws_object.created_by:
-                    owned_buckets.append(bucket.name)
-            except ClientError as e:
-                code = e.response['Error'].get('Code')
-                if code in ('NoSuchTagSet', 'AccessDenied'):
-                    # Bucket has no tags or access is restricted; skip it
+                pending.add(executor.submit(delete, batch))
+                batch = []
+                # Listing never runs more than one round of batches ahead of the deletes
+                while len(pending) >= max_workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            if batch:
+                pending.add(executor.submit(delete, batch))
+            for future in as_completed(pending):
+                yield future.result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            self.aws_object.bucket_regions.save()
+
+    def delete_bucket(self, bucket_name: str):
+        self._call_bucket(bucket_name, lambda s3_client: s3_client.delete_bucket(Bucket=bucket_name))
+        self.aws_object.bucket_regions.discard(bucket_name)
+        self.aws_object.bucket_regions.save()
+        # The next list-buckets resyncs instead of answering from the index
+        self.aws_object.inventory.invalidate(*self._inventory_scope())
+
+    def copy_object(self, src_bucket: str, src_key: str, dst_bucket: str, dst_key: str, size=None, tags="owner", transfer_config=None, workers=1):
+        # Server-side copy: S3 moves the bytes, nothing passes through this host.
+        # Objects below multipart_threshold take one CopyObject; larger ones are
+        # copied as UploadPartCopy byte ranges, max_concurrency at a time.
+        # tags is "owner" to tag the copy with our Owner/CreatedBy like an
+        # upload, or "copy" to keep the source object's tags.
+        transfer_config = transfer_config or self.transfer_config()
+        # workers objects may be copying at once, each with max_concurrency parts
+        pool_size = workers * transfer_config.max_concurrency
+        source = {'Bucket': src_bucket, 'Key': src_key}
+        head = None
+        if size is None:
+            head = self._call_bucket(src_bucket, lambda s3_client: s3_client.head_object(**source))
+            size = head['ContentLength']
+        # CopyObject itself stops at 5 GiB
+        if size < min(transfer_config.multipart_threshold, self.max_part_size):
+            kwargs = {'TaggingDirective': 'REPLACE', 'Tagging': self._tagging()} if tags == 'owner' else {}
+            self._call_bucket(dst_bucket, lambda s3_client: s3_client.copy_object(
+                Bucket=dst_bucket, Key=dst_key, CopySource=source, **kwargs), pool_size=pool_size)
+            return size
+
+        # UploadPartCopy does not carry metadata or tags, so they are set on the upload
+        if head is None:
+            head = self._call_bucket(src_bucket, lambda s3_client: s3_client.head_object(**source))
+        if tags == 'owner':
+            tagging = self._tagging()
+        else:
+            tag_set = self._call_bucket(src_bucket, lambda s3_client: s3_client.get_object_tagging(**source))['TagSet']
+            tagging = urlencode([(tag['Key'], tag['Value']) for tag in tag_set])
+        kwargs = {name: head[name] for name in ('ContentType', 'CacheControl', 'ContentDisposition', 'ContentEncoding', 'ContentLanguage', 'Metadata')
+                  if head.get(name)}
+        upload_id = self._call_bucket(dst_bucket, lambda s3_client: s3_client.create_multipart_upload(
+            Bucket=dst_bucket, Key=dst_key, Tagging=tagging, **kwargs), pool_size=pool_size)['UploadId']
+        s3_client = self.bucket_client(dst_bucket, pool_size)
+        # Objects can be up to 5 TiB, so parts grow to fit within max_parts
+        part_size = max(transfer_config.multipart_chunksize, -(-size // self.max_parts))
+        ranges = [(offset, min(offset + part_size, size) - 1) for offset in range(0, size, part_size)]
+
+        def copy_part(number, first, last):
+            # IfMatch keeps every part from the same version of the source
+            result = s3_client.upload_part_copy(Bucket=dst_bucket, Key=dst_key, UploadId=upload_id, PartNumber=number, CopySource=source,
+                                                CopySourceRange=f"bytes={first}-{last}", CopySourceIfMatch=head['ETag'])['CopyPartResult']
+            part = {name: value for name, value in result.items() if name.startswith('Checksum')}
+            return dict(part, ETag=result['ETag'], PartNumber=number)
+
+        executor = ThreadPoolExecutor(max_workers=transfer_config.max_concurrency)
+        try:
+            futures = [executor.submit(copy_part, number, first, last) for number, (first, last) in enumerate(ranges, 1)]
+            parts = [future.result() for future in futures]
+            s3_client.complete_multipart_upload(Bucket=dst_bucket, Key=dst_key, UploadId=upload_id, MultipartUpload={'Parts': parts})
+        except BaseException:
+            executor.shutdown(wait=True, cancel_futures=True)
+            s3_client.abort_multipart_upload(Bucket=dst_bucket, Key=dst_key, UploadId=upload_id)
+            raise
+        finally:
+            executor.shutdown(wait=True)
+        return size
+
+    def copy_objects(self, src_bucket: str, src_prefix: str, dst_bucket: str, dst_prefix="", max_workers=8, tags="owner", transfer_config=None,
+                     page_size=None):
+        # Copies every object under src_prefix to dst_prefix + the rest of its
+        # key, max_workers objects at a time while the listing continues.
+        # Yields (src_key, dst_key, error) as copies finish; error is None on success.
+        # A destination inside the source prefix is left out of the listing,
+        # otherwise the listing would keep finding the copies it just made.
+        nested = src_bucket == dst_bucket and dst_prefix.startswith(src_prefix)
+        if nested and dst_prefix == src_prefix:
+            raise ValueError(f"s3://{dst_bucket}/{dst_prefix} is the source itself")
+        def copy(obj, dst_key):
+            try:
+                self.copy_object(src_bucket, obj['Key'], dst_bucket, dst_key, obj['Size'], tags, transfer_config, max_workers)
+                return obj['Key'], dst_key, None
+            except Exception as e:
+                return obj['Key'], dst_key, e
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        pending = set()
+        try:
+            for obj in self.iter_objects(src_bucket, src_prefix, page_size):
+                if nested and obj['Key'].startswith(dst_prefix):
                     continue
-                # Re-raise unexpected errors
-                raise
-        return owned_buckets
+                pending.add(executor.submit(copy, obj, dst_prefix + obj['Key'][len(src_prefix):]))
+                while len(pending) >= max_workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            for future in as_completed(pending):
+                yield future.result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            self.aws_object.bucket_regions.save()
+
+    def sync(self, local_dir: str, bucket_name: str, prefix="", delete=False, max_workers=4, transfer_config=None, dry_run=False):
+        # Uploads only files that are new or changed since the remote copy.
+        # A local manifest keeps size, mtime and hashes per file, so unchanged
+        # files are never re-read; the remote side is one paginated listing.
+        transfer_config = transfer_config or self.transfer_config()
+        if prefix and not prefix.endswith('/'):
+            prefix = f"{prefix}/"
+        manifest_id = hashlib.sha1(f"{os.path.abspath(local_dir)}|{bucket_name}|{prefix}".encode()).hexdigest()
+        manifest = JsonCache(os.path.join(cache_dir(), "sync-manifests", f"{manifest_id}.json"))
+        remote = {obj['Key']: obj for obj in self.iter_objects(bucket_name, prefix)}
+
+        result = {'uploaded': [], 'unchanged': 0, 'deleted': [], 'failed': []}
+        to_upload = []
+        local_keys = set()
+        for path, key in expand_upload_paths([local_dir], prefix):
+            local_keys.add(key)
+            stat = os.stat(path)
+            entry = manifest.get(key)
+            if not (entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns
+                    and entry['part_size'] == transfer_config.multipart_chunksize):
+                md5, etag = file_digests(path, transfer_config.multipart_threshold, transfer_config.multipart_chunksize)
+                previous_etag = entry['etag'] if entry and entry['md5'] == md5 else None
+                entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'md5': md5,
+                         'part_size': transfer_config.multipart_chunksize, 'etag': previous_etag or etag}
+            obj = remote.get(key)
+            remote_etag = obj['ETag'].strip('"') if obj else None
+            if obj and obj['Size'] == entry['size'] and remote_etag in (entry['md5'], entry['etag']):
+                result['unchanged'] += 1
+                # Remember the remote ETag so multipart objects keep matching
+                manifest.set(key, dict(entry, etag=remote_etag))
+                continue
+            to_upload.append((path, key, entry))
+
+        entries = {key: entry for _, key, entry in to_upload}
+        if not dry_run:
+            for path, key, error in self._upload_many(bucket_name, [(p, k) for p, k, _ in to_upload], max_workers, transfer_config):
+                if error is None:
+                    manifest.set(key, entries[key])
+                    result['uploaded'].append(key)
+                else:
+                    result['failed'].append((key, error))
+        else:
+            result['uploaded'] = [key for _, key, _ in to_upload]
+
+        if delete:
+            removed = sorted(key for key in remote if key not in local_keys)
+            failed = [] if dry_run else self.delete_keys(bucket_name, removed)
+            failed_keys = {key for key, _ in failed}
+            result['deleted'] = [key for key in removed if key not in failed_keys]
+            result['failed'].extend(failed)
+            for key in result['deleted']:
+                manifest.discard(key)
+        if not dry_run:
+            manifest.save()
+        return result
+
+    def download_file(self, bucket_name: str, key: str, path: str, part_size=None, max_workers=None, resume=True, verify=True):
+        # Fetches the object as byte ranges in parallel. Each range is streamed
+        # straight into its place in a preallocated <path>.awsctl-part file with
+        # positional writes, which is renamed to path once complete. Finished
+        # ranges are recorded, so a rerun after an interruption only fetches the
+        # rest, provided the object (its ETag) has not changed in between.
+        part_size = part_size or self.download_part_size
+        head = self._call_bucket(bucket_name, lambda s3_client: s3_client.head_object(Bucket=bucket_name, Key=key))
+        size, etag = head['ContentLength'], head['ETag']
+        max_workers = max_workers or self.aws_object.max_pool_connections
+        s3_client = self.bucket_client(bucket_name, max_workers)
+        self.aws_object.bucket_regions.save()
+        partial = f"{path}.awsctl-part"
+        state_id = hashlib.sha1(f"{os.path.abspath(path)}|{bucket_name}|{key}".encode()).hexdigest()
+        state = JsonCache(os.path.join(cache_dir(), "downloads", f"{state_id}.json"))
+        ranges = [(offset, min(offset + part_size, size)) for offset in range(0, size, part_size)]
+
+        done = set()
+        if (resume and state.get('etag') == etag and state.get('part_size') == part_size
+                and os.path.exists(partial) and os.path.getsize(partial) == size):
+            done = set(state.get('done') or [])
+        state.set('etag', etag)
+        state.set('part_size', part_size)
+        state.set('done', sorted(done))
+        state.save()
+        resumed = sum(ranges[i][1] - ranges[i][0] for i in done)
+
+        def fetch(index):
+            start, end = ranges[index]
+            offset = start
+            for attempt in range(self.download_attempts):
+                try:
+                    # IfMatch fails the request if the object is replaced mid-download
+                    body = s3_client.get_object(Bucket=bucket_name, Key=key, IfMatch=etag, Range=f"bytes={offset}-{end - 1}")['Body']
+                    for chunk in body.iter_chunks(self.read_size):
+                        view = memoryview(chunk)
+                        while view:
+                            written = os.pwrite(fd, view, offset)
+                            offset += written
+                            view = view[written:]
+                    return index
+                except BotoCoreError:
+                    # The connection dropped mid-body; ask again for the bytes still missing
+                    if attempt == self.download_attempts - 1:
+                        raise
+
+        fd = os.open(partial, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if not done:
+                os.ftruncate(fd, 0)
+            # Sized up front so every range can be written at its own offset
+            os.ftruncate(fd, size)
+            executor = ThreadPoolExecutor(max_workers=max_workers)
+            try:
+                futures = [executor.submit(fetch, index) for index in range(len(ranges)) if index not in done]
+                for future in as_completed(futures):
+                    done.add(future.result())
+                    state.set('done', sorted(done))
+                    state.save()
+            finally:
+                executor.shutdown(wait=True, cancel_futures=True)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+        verified = self._verify_download(s3_client, bucket_name, key, partial, head) if verify else None
+        if verified is False:
+            os.remove(partial)
+            os.remove(state.path)
+            raise ValueError(f"s3://{bucket_name}/{key}: downloaded data does not match ETag {etag}")
+        os.replace(partial, path)
+        os.remove(state.path)
+        return {'Size': size, 'Parts': len(ranges), 'Resumed': resumed, 'Verified': verified}
+
+    @staticmethod
+    def _verify_download(s3_client, bucket_name, key, path, head):
+        # The ETag is the object's MD5, or for multipart uploads the MD5 of the
+        # part MD5s plus "-<parts>". Returns None when it cannot be checked:
+        # SSE-KMS/SSE-C ETags are not MD5s, and parts of uneven size cannot be rebuilt.
+        etag = head['ETag'].strip('"')
+        md5, _, part_count = etag.partition('-')
+        if head.get('ServerSideEncryption') == 'aws:kms' or head.get('SSECustomerAlgorithm') or len(md5) != 32:
+            return None
+        size = head['ContentLength']
+        if not part_count:
+            return file_digests(path, size + 1, max(size, 1))[0] == etag
+        upload_part_size = s3_client.head_object(Bucket=bucket_name, Key=key, PartNumber=1)['ContentLength']
+        if not part_count.isdigit() or -(-size // upload_part_size) != int(part_count):
+            return None
+        return file_digests(path, 0, upload_part_size)[1] == etag
+
+    def _owned_bucket(self, bucket, pool_size=None):
+        # Returns the listing entry with its region and tags if the tags mark
+        # the bucket as ours, otherwise None
+        bucket_name = bucket['Name']
+        try:
+            bucket_tags = self._call_bucket(bucket_name, lambda s3_client: s3_client.get_bucket_tagging(Bucket=bucket_name), pool_size)['TagSet']
+        except ClientError as e:
+            code = e.response['Error'].get('Code')
+            if code in ('NoSuchTagSet', 'AccessDenied'):
+                # Bucket has no tags or access is restricted; skip it
+                return None
+            # Re-raise unexpected errors
+            raise
+        bucket_owner = None
+        bucket_creator = None
+        for tag in bucket_tags:
+            if tag['Key'] == 'Owner':
+                bucket_owner = tag['Value']
+            if tag['Key'] == 'CreatedBy':
+                bucket_creator = tag['Value']
+        if bucket_owner == self.aws_object.owner and bucket_creator == self.aws_object.created_by:
+            return {
+                'Name': bucket_name,
+                'Region': self.aws_object.bucket_regions.get(bucket_name),
+                'CreationDate': bucket.get('CreationDate'),
+                'Tags': bucket_tags,
+            }
+        return None
+
+    def is_owned_bucket(self, bucket_name: str):
+        return self._owned_bucket({'Name': bucket_name}) is not None
+
+    def iter_owned_bucket_records(self, max_workers=None, order="sorted"):
+        # Tag lookups are fanned out over a bounded pool; order is "sorted"
+        # (listing order, i.e. by name) or "completion" (as soon as each lookup ends)
+        if order not in ("sorted", "completion"):
+            raise ValueError(f"order must be 'sorted' or 'completion', not {order!r}")
+        s3_client = self.aws_object.client('s3')
+        buckets = []
+        for page in s3_client.get_paginator('list_buckets').paginate():
+            for bucket in page.get('Buckets', []):
+                buckets.append(bucket)
+                # Newer ListBuckets responses carry the region, which saves a GetBucketLocation
+                if bucket.get('BucketRegion'):
+                    self.aws_object.bucket_regions.set(bucket['Name'], bucket['BucketRegion'])
+        max_workers = max_workers or self.aws_object.max_pool_connections
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            # Each task resolves the bucket's region (cached) and reads its tags there
+            futures = [executor.submit(self._owned_bucket, bucket, max_workers) for bucket in buckets]
+            for future in (futures if order == "sorted" else as_completed(futures)):
+                record = future.result()
+                if record is not None:
+                    yield record
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            self.aws_object.bucket_regions.save()
+
+    def iter_owned_buckets(self, max_workers=None, order="sorted"):
+        for record in self.iter_owned_bucket_records(max_workers, order):
+            yield record['Name']
+
+    def list_buckets(self, max_workers=None, order="sorted"):
+        return list(self.iter_owned_buckets(max_workers, order))
+
+    def _inventory_scope(self):
+        # Bucket names are global, so buckets are indexed without a region
+        return ('bucket', self.aws_object.inventory_owner, '')
+
+    def list_owned_bucket_records(self, max_workers=None, order="sorted", refresh=False):
+        # Answers from the local inventory while it is fresh, otherwise resyncs it
+        inventory = self.aws_object.inventory
+        scope = self._inventory_scope()
+        if not refresh and inventory.is_fresh(*scope, self.aws_object.inventory_ttl):
+            yield from inventory.items(*scope)
+            return
+        yield from inventory.record(*scope, self.iter_owned_bucket_records(max_workers, order), 'Name')
+
+    def list_owned_buckets(self, max_workers=None, order="sorted", refresh=False):
+        for record in self.list_owned_bucket_records(max_workers, order, refresh):
+            yield record['Name']
 
 
 
 class Route53():
-    def __init__(self,aws_object: AwsObject,domain_name):
-        self.route53 = boto3.client(
-            'route53',
-            aws_access_key_id=aws_object.aws_access_key_id,
-            aws_secret_access_key=aws_object.aws_secret_access_key
-        )
+    def __init__(self,aws_object: AwsObject,domain_name = None,create_if_missing = True):
+        self.route53 = aws_object.client('route53')
         self.aws_object = aws_object
-        self.resourceId = self.create_zone(domain_name)
+        self.resourceId = None
+        self.created = False
+        self._from_cache = False
+        if domain_name:
+            self.resourceId = self.find_zone(domain_name)
+            if self.resourceId is not None and self._from_cache and create_if_missing:
+                # Only the create path checks a cached ID up front: trusting a
+                # deleted zone here would skip creating it altogether
+                try:
+                    self.route53.get_hosted_zone(Id=self.resourceId)
+                except ClientError as e:
+                    if not self._forget_zone(e):
+                        raise
+            if self.resourceId is None:
+                if not create_if_missing:
+                    raise ClientError(
+                        {
+                            'Error': {
+                                'Code': 'NoSuchHostedZone',
+                                'Message': f'No hosted zone found for {domain_name}'
+                            }
+                        },
+                        'ListHostedZonesByName'
+                    )
+                self.resourceId = self.create_zone(domain_name)
+                self.created = True
+
+    @staticmethod
+    def _fqdn(name):
+        return name if name.endswith('.') else f"{name}."
+
+    def _zone_cache_key(self, name):
+        # Zone IDs belong to an account, so the cache is keyed by access key as well
+        return f"{self.aws_object.aws_access_key_id}/{name}"
+
+    def find_zone(self, domain_name):
+        # Resolves domain -> zone ID from the on-disk cache, falling back to one ListHostedZonesByName call
+        name = self._fqdn(domain_name)
+        zone_id = self.aws_object.hosted_zone_ids.get(self._zone_cache_key(name))
+        if zone_id:
+            self._from_cache = True
+        else:
+            response = self.route53.list_hosted_zones_by_name(DNSName=name, MaxItems='1')
+            matches = [zone['Id'] for zone in response['HostedZones'] if zone['Name'] == name]
+            if not matches:
+                return None
+            zone_id = matches[0]
+            self._from_cache = False
+            self.aws_object.hosted_zone_ids.set(self._zone_cache_key(name), zone_id)
+            self.aws_object.hosted_zone_ids.save()
+        self.zone_id_only = zone_id.split('/')[-1]
+        self._domain_name = name
+        return zone_id
+
+    def _forget_zone(self, error):
+        # A cached zone ID that no longer exists is dropped and resolved again;
+        # returns False for any other error, which the caller re-raises
+        if error.response['Error'].get('Code') != 'NoSuchHostedZone' or not self._from_cache:
+            return False
+        self.aws_object.hosted_zone_ids.discard(self._zone_cache_key(self._domain_name))
+        self.aws_object.hosted_zone_ids.save()
+        self.resourceId = self.find_zone(self._domain_name)
+        return True
+
+    def _zone_call(self, operation, **kwargs):
+        # Calls a zone API, retrying once against the re-resolved zone if the cached ID was stale
+        try:
+            return getattr(self.route53, operation)(HostedZoneId=self.resourceId, **kwargs)
+        except ClientError as e:
+            if not self._forget_zone(e) or self.resourceId is None:
+                raise
+            return getattr(self.route53, operation)(HostedZoneId=self.resourceId, **kwargs)
     
     def create_zone(self, domain_name):
         response = self.route53.create_hosted_zone(
@@ -261,12 +1558,57 @@ class Route53():
                 },
             ]
         )
+        self.aws_object.inventory.upsert(*self._inventory_scope(), [{'Id': resource_full_id, 'Name': response['HostedZone']['Name']}], 'Id')
+        self._domain_name = response['HostedZone']['Name']
+        self._from_cache = False
+        self.aws_object.hosted_zone_ids.set(self._zone_cache_key(self._domain_name), resource_full_id)
+        self.aws_object.hosted_zone_ids.save()
         # Keep the full id for other APIs (moto expects full id in HostedZoneId)
         return resource_full_id
+
+    def _inventory_scope(self):
+        # Hosted zones are global, so they are indexed without a region
+        return ('hosted_zone', self.aws_object.inventory_owner, '')
+
+    def iter_owned_zones(self):
+        # ListTagsForResources takes at most 10 zone IDs per call
+        zones = (zone for page in self.route53.get_paginator('list_hosted_zones').paginate()
+                 for zone in page['HostedZones'])
+        batch = []
+        for zone in zones:
+            batch.append(zone)
+            if len(batch) == 10:
+                yield from self._owned_zones(batch)
+                batch = []
+        if batch:
+            yield from self._owned_zones(batch)
+
+    def _owned_zones(self, zones):
+        response = self.route53.list_tags_for_resources(
+            ResourceType='hostedzone',
+            ResourceIds=[zone['Id'].split('/')[-1] for zone in zones]
+        )
+        tags_by_id = {
+            tag_set['ResourceId']: {tag['Key']: tag['Value'] for tag in tag_set.get('Tags', [])}
+            for tag_set in response['ResourceTagSets']
+        }
+        for zone in zones:
+            tags = tags_by_id.get(zone['Id'].split('/')[-1], {})
+            if tags.get('Owner') == self.aws_object.owner and tags.get('CreatedBy') == self.aws_object.created_by:
+                yield {'Id': zone['Id'], 'Name': zone['Name']}
+
+    def list_zones(self, refresh=False):
+        # Answers from the local inventory while it is fresh, otherwise resyncs it
+        inventory = self.aws_object.inventory
+        scope = self._inventory_scope()
+        if not refresh and inventory.is_fresh(*scope, self.aws_object.inventory_ttl):
+            yield from inventory.items(*scope)
+            return
+        yield from inventory.record(*scope, self.iter_owned_zones(), 'Id')
     
     def create_record(self, name, ip, dns_type="A", ttl=300):
-        response = self.route53.change_resource_record_sets(
-            HostedZoneId=self.resourceId,
+        response = self._zone_call(
+            'change_resource_record_sets',
             ChangeBatch={
                 'Changes': [
                     {
@@ -287,8 +1629,8 @@ class Route53():
     def delete_record(self,name):
         # Route53 requires the full existing record (including TTL and ResourceRecords) to delete
         # Fetch the current record set for the given name and type A
-        record_sets = self.route53.list_resource_record_sets(
-            HostedZoneId=self.resourceId,
+        record_sets = self._zone_call(
+            'list_resource_record_sets',
             StartRecordName=name,
             StartRecordType='A',
             MaxItems='1'
@@ -315,8 +1657,8 @@ class Route53():
                 },
                 'ChangeResourceRecordSets'
             )
-        response = self.route53.change_resource_record_sets(
-            HostedZoneId=self.resourceId,
+        response = self._zone_call(
+            'change_resource_record_sets',
             ChangeBatch={
                 'Changes': [
                     {
@@ -346,8 +1688,8 @@ class Route53():
         else:
             # Try to reuse existing TTL if present; otherwise default to 300
             try:
-                existing = self.route53.list_resource_record_sets(
-                    HostedZoneId=self.resourceId,
+                existing = self._zone_call(
+                    'list_resource_record_sets',
                     StartRecordName=name,
                     StartRecordType=dns_type,
                     MaxItems='1'
@@ -360,8 +1702,8 @@ class Route53():
             except Exception:
                 record_set['TTL'] = 300
 
-        response = self.route53.change_resource_record_sets(
-            HostedZoneId=self.resourceId,
+        response = self._zone_call(
+            'change_resource_record_sets',
             ChangeBatch={
                 'Changes': [
                     {
@@ -377,3 +1719,175 @@ class Route53():
 
 
 
+
+    # Route53 limits per ChangeResourceRecordSets call; UPSERT counts twice
+    max_batch_records = 1000
+    max_batch_chars = 32000
+
+    def record_name(self, name):
+        # Relative names ("www", "@") are taken as relative to this zone
+        zone = self._domain_name
+        if name in ('', '@'):
+            return zone
+        name = self._fqdn(name)
+        if name != zone and not name.endswith(f".{zone}"):
+            name = f"{name}{zone}"
+        return name
+
+    @staticmethod
+    def _record_key(record_set):
+        # Route53 escapes "*" as \052 in listings
+        name = record_set['Name'].replace('\\052', '*').lower()
+        return (name, record_set['Type'], record_set.get('SetIdentifier'))
+
+    def iter_record_sets(self):
+        # A stale cached zone ID fails on the first page, which is retried like _zone_call does
+        paginator = self.route53.get_paginator('list_resource_record_sets')
+        pages = iter(paginator.paginate(HostedZoneId=self.resourceId))
+        try:
+            page = next(pages, None)
+        except ClientError as e:
+            if not self._forget_zone(e) or self.resourceId is None:
+                raise
+            pages = iter(paginator.paginate(HostedZoneId=self.resourceId))
+            page = next(pages, None)
+        while page is not None:
+            yield from page['ResourceRecordSets']
+            page = next(pages, None)
+
+    def plan_records(self, records, prune=False):
+        # Diffs the desired records against the zone (one paginated pass) and
+        # returns only the changes needed to make the zone match
+        desired = {}
+        for record in records:
+            record_set = {
+                'Name': self.record_name(record['name']),
+                'Type': record.get('type', 'A').upper(),
+                'TTL': int(record.get('ttl') or 300),
+                'ResourceRecords': [{'Value': value} for value in record['values']],
+            }
+            if record.get('set_identifier'):
+                record_set['SetIdentifier'] = record['set_identifier']
+            key = self._record_key(record_set)
+            if key in desired:
+                # Repeated rows add values to the same record set
+                desired[key]['ResourceRecords'].extend(record_set['ResourceRecords'])
+            else:
+                desired[key] = record_set
+
+        changes = []
+        for current in self.iter_record_sets():
+            key = self._record_key(current)
+            wanted = desired.pop(key, None)
+            if wanted is None:
+                if prune and not (current['Type'] in ('SOA', 'NS') and key[0] == self._domain_name.lower()):
+                    changes.append({'Action': 'DELETE', 'ResourceRecordSet': current})
+                continue
+            same_values = sorted(r['Value'] for r in wanted['ResourceRecords']) == sorted(r['Value'] for r in current.get('ResourceRecords', []))
+            if current.get('AliasTarget') or not same_values or wanted['TTL'] != current.get('TTL'):
+                changes.append({'Action': 'UPSERT', 'ResourceRecordSet': wanted})
+        changes.extend({'Action': 'CREATE', 'ResourceRecordSet': record_set} for record_set in desired.values())
+        return changes
+
+    def change_batches(self, changes):
+        # Packs changes into as few ChangeBatches as Route53's size limits allow
+        batch, records, chars = [], 0, 0
+        for change in changes:
+            weight = 2 if change['Action'] == 'UPSERT' else 1
+            values = change['ResourceRecordSet'].get('ResourceRecords', [])
+            change_records = max(len(values), 1) * weight
+            change_chars = sum(len(v['Value']) for v in values) * weight
+            if batch and (records + change_records > self.max_batch_records or chars + change_chars > self.max_batch_chars):
+                yield batch
+                batch, records, chars = [], 0, 0
+            batch.append(change)
+            records += change_records
+            chars += change_chars
+        if batch:
+            yield batch
+
+    def apply_changes(self, changes):
+        return [
+            self._zone_call('change_resource_record_sets', ChangeBatch={'Changes': batch})
+            for batch in self.change_batches(changes)
+        ]
+
+
+def expand_upload_paths(paths, prefix=""):
+    # Maps local files, directories and glob patterns to (path, key) pairs.
+    # Directories and globs keep paths relative to their root, so
+    # "build/" uploads build/js/app.js as <prefix>js/app.js.
+    if prefix and not prefix.endswith('/'):
+        prefix = f"{prefix}/"
+    for path in paths:
+        if glob.has_magic(path):
+            root = path
+            while glob.has_magic(root):
+                root = os.path.dirname(root)
+            matches = sorted(glob.glob(path, recursive=True))
+            files = [m for m in matches if os.path.isfile(m)]
+        elif os.path.isdir(path):
+            root = path
+            files = sorted(
+                os.path.join(dirpath, name)
+                for dirpath, _, names in os.walk(path)
+                for name in names
+            )
+        else:
+            root = os.path.dirname(path)
+            files = [path]
+        for file_path in files:
+            relative = os.path.relpath(file_path, root or '.')
+            yield file_path, prefix + relative.replace(os.sep, '/')
+
+
+def file_digests(path, multipart_threshold, part_size):
+    # Returns (md5, etag) in one memory-mapped pass. etag is what S3 reports
+    # for the object when uploaded with this threshold and part size.
+    whole = hashlib.md5()
+    part_digests = []
+    size = os.path.getsize(path)
+    if size:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            with memoryview(data) as view:
+                for offset in range(0, size, part_size):
+                    # Slices of the mapping are hashed in place, without copying
+                    with view[offset:offset + part_size] as part:
+                        whole.update(part)
+                        part_digests.append(hashlib.md5(part).digest())
+    md5 = whole.hexdigest()
+    if size < multipart_threshold:
+        return md5, md5
+    return md5, f"{hashlib.md5(b''.join(part_digests)).hexdigest()}-{len(part_digests)}"
+
+
+def load_records(f, fmt=None):
+    # Reads desired records from CSV (name,type,ttl,value), a JSON list or NDJSON.
+    # Each record needs a name and either "value" or a "values" list.
+    name = getattr(f, 'name', '') or ''
+    if fmt is None:
+        ext = os.path.splitext(name)[1].lower()
+        fmt = {'.csv': 'csv', '.json': 'json', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}.get(ext, 'ndjson')
+    if fmt == 'csv':
+        rows = csv.DictReader(f)
+    elif fmt == 'json':
+        rows = json.load(f)
+    else:
+        rows = (json.loads(line) for line in f if line.strip())
+    records = []
+    for row in rows:
+        values = row.get('values')
+        if values is None:
+            values = [row['value']] if row.get('value') else []
+        elif isinstance(values, str):
+            values = [values]
+        if not row.get('name') or not values:
+            raise ValueError(f"record needs a name and at least one value: {row}")
+        records.append({
+            'name': row['name'],
+            'type': row.get('type') or 'A',
+            'ttl': row.get('ttl') or 300,
+            'values': list(values),
+            'set_identifier': row.get('set_identifier'),
+        })
+    return records
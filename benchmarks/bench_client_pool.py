@@ -0,0 +1,63 @@
+"""Per-call overhead of building a fresh boto3 client vs. the AwsObject pool.
+
+Runs entirely against moto, so no AWS account is needed:
+
+    uv run python benchmarks/bench_client_pool.py --calls 200
+"""
+import argparse
+import os
+import sys
+import time
+
+import boto3
+from moto import mock_aws
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from aws_object import AwsObject  # noqa: E402
+
+
+def fresh_client_call(aws_obj):
+    # What every method did before the pool: a new client per call
+    ec2 = boto3.client(
+        'ec2',
+        region_name=aws_obj.region_name,
+        aws_access_key_id=aws_obj.aws_access_key_id,
+        aws_secret_access_key=aws_obj.aws_secret_access_key
+    )
+    ec2.describe_instances()
+
+
+def pooled_client_call(aws_obj):
+    aws_obj.client('ec2').describe_instances()
+
+
+def measure(fn, aws_obj, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn(aws_obj)
+    return (time.perf_counter() - start) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=100)
+    args = parser.parse_args()
+
+    for var in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
+        os.environ.setdefault(var, "testing")
+
+    with mock_aws():
+        aws_obj = AwsObject("testing", "testing", "bench-owner")
+        # Warm moto itself so the first measured call is not penalised
+        pooled_client_call(aws_obj)
+        before = measure(fresh_client_call, aws_obj, args.calls)
+        after = measure(pooled_client_call, aws_obj, args.calls)
+
+    print(f"calls per variant: {args.calls}")
+    print(f"fresh client per call: {before * 1000:.2f} ms/call")
+    print(f"pooled client:         {after * 1000:.2f} ms/call")
+    print(f"speedup:               {before / after:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+"""Performance suite for the bulk paths, run against a local moto server.
+
+    uv run python benchmarks/bench_suite.py                    # compare with baseline.json
+    uv run python benchmarks/bench_suite.py --update-baseline  # record a new baseline
+    uv run python benchmarks/bench_suite.py --scale 0.1        # quick, smaller run
+
+Seeds 2,000 buckets with mixed tags, 500 tagged instances and a zone with
+10,000 records (all multiplied by --scale), then times every scenario with a
+fresh AwsObject and cache directory and counts its API calls with CallProfiler.
+Exits 1 when a scenario makes more API calls, or takes longer, than its
+baseline allows. Wall times depend on the machine, so record the baseline on
+the machine that runs the comparison; API-call counts are portable.
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.config import Config
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from aws_object import AwsObject, CallProfiler, Ec2, Route53, S3  # noqa: E402
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+OWNER = "bench-owner"
+DOMAIN = "bench.example.com"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_moto_server():
+    # A separate process, so the server does not compete with the code under test for the GIL
+    port = free_port()
+    proc = subprocess.Popen([sys.executable, "-m", "moto.server", "-p", str(port)],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"{url}/moto-api/", timeout=1)
+            return proc, url
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("moto server did not start; install it with `uv sync --dev` (moto[server])")
+
+
+def seed(url, scale):
+    def client(service):
+        return boto3.client(service, endpoint_url=url, region_name="us-east-1",
+                            config=Config(max_pool_connections=32))
+
+    owned = [{"Key": "Owner", "Value": OWNER}, {"Key": "CreatedBy", "Value": "platform-cli"}]
+    other = [{"Key": "Owner", "Value": "someone-else"}, {"Key": "CreatedBy", "Value": "platform-cli"}]
+
+    # Buckets: half ours, a quarter someone else's, a quarter untagged
+    s3 = client("s3")
+
+    def make_bucket(i):
+        name = f"bench-bucket-{i:05d}"
+        s3.create_bucket(Bucket=name)
+        tags = owned if i % 2 == 0 else other if i % 4 == 1 else None
+        if tags:
+            s3.put_bucket_tagging(Bucket=name, Tagging={"TagSet": tags + [{"Key": "team", "Value": f"t{i % 7}"}]})
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(make_bucket, range(int(2000 * scale))))
+
+    ec2 = client("ec2")
+    for count, tags in ((int(500 * scale), owned), (int(50 * scale) or 1, other)):
+        ec2.run_instances(ImageId="ami-020cba7c55df1f615", InstanceType="t3.micro", MinCount=count, MaxCount=count,
+                          TagSpecifications=[{"ResourceType": "instance", "Tags": tags}])
+
+    route53 = client("route53")
+    zone_id = route53.create_hosted_zone(Name=DOMAIN, CallerReference=str(time.time()))["HostedZone"]["Id"]
+    records = int(10000 * scale)
+    for start in range(0, records, 1000):
+        route53.change_resource_record_sets(HostedZoneId=zone_id, ChangeBatch={"Changes": [{
+            "Action": "CREATE",
+            "ResourceRecordSet": {"Name": f"host{i}.{DOMAIN}", "Type": "A", "TTL": 300,
+                                  "ResourceRecords": [{"Value": f"10.0.{i // 256 % 256}.{i % 256}"}]},
+        } for i in range(start, min(start + 1000, records))]})
+    return records
+
+
+def apply_records(aws_obj, records, run):
+    # Every run rewrites the same 5% of the zone, so each one has equal work
+    zone = Route53(aws_obj, DOMAIN, create_if_missing=False)
+    desired = [{"name": f"host{i}", "type": "A", "ttl": 300,
+                "values": [f"10.{1 + run % 200}.{i // 256 % 256}.{i % 256}" if i % 20 == 0 else f"10.0.{i // 256 % 256}.{i % 256}"]}
+               for i in range(records)]
+    return zone.apply_changes(zone.plan_records(desired))
+
+
+def record_operations(aws_obj, records, run):
+    zone = Route53(aws_obj, DOMAIN, create_if_missing=False)
+    for i in range(20):
+        # moto's server keeps deleted names reserved, so every run uses fresh ones
+        name = f"crud{run}-{i}.{DOMAIN}"
+        zone.create_record(name, f"192.0.2.{i}")
+        zone.update_record(name, "A", ip=f"198.51.100.{i}", ttl=600)
+        zone.delete_record(name)
+
+
+# Run in this order: stop_all needs running instances and start_all stopped ones
+SCENARIOS = {
+    "s3.list_buckets": lambda aws_obj, records, run: S3(aws_obj).list_buckets(),
+    "ec2.get_id": lambda aws_obj, records, run: Ec2(aws_obj).get_id(),
+    "ec2.stop_all": lambda aws_obj, records, run: Ec2(aws_obj).stop_all(),
+    "ec2.start_all": lambda aws_obj, records, run: Ec2(aws_obj).start_all(),
+    "route53.list_records": lambda aws_obj, records, run: list(Route53(aws_obj, DOMAIN, create_if_missing=False).iter_record_sets()),
+    "route53.apply_records": apply_records,
+    "route53.record_operations": record_operations,
+}
+
+
+def run_suite(url, records, repeat, only):
+    results = {}
+    for run in range(repeat):
+        for name, scenario in SCENARIOS.items():
+            if only and name not in only:
+                continue
+            # Cold caches every time: nothing carries over between measurements
+            with tempfile.TemporaryDirectory() as cache:
+                os.environ["AWSCTL_CACHE_DIR"] = cache
+                aws_obj = AwsObject("testing", "testing", OWNER, endpoint_url=url, max_pool_connections=32)
+                aws_obj.profiler = CallProfiler()
+                start = time.perf_counter()
+                scenario(aws_obj, records, run)
+                wall = time.perf_counter() - start
+            entry = results.setdefault(name, {"walls": [], "api_calls": 0})
+            entry["walls"].append(wall)
+            entry["api_calls"] = max(entry["api_calls"], len(aws_obj.profiler.calls))
+    return {name: {"wall_s": round(statistics.median(entry["walls"]), 4), "api_calls": entry["api_calls"]}
+            for name, entry in results.items()}
+
+
+def compare(results, baseline, wall_tolerance, calls_tolerance, wall_floor):
+    failures = []
+    print(f"{'scenario':28} {'wall s':>9} {'base s':>9} {'calls':>7} {'base':>7}  status")
+    for name, result in results.items():
+        base = baseline.get(name)
+        status = "new"
+        if base:
+            problems = []
+            if result["api_calls"] > base["api_calls"] * (1 + calls_tolerance):
+                problems.append("api calls")
+            # The floor keeps sub-second scenarios from failing on scheduler noise
+            if result["wall_s"] > base["wall_s"] * (1 + wall_tolerance) and result["wall_s"] - base["wall_s"] > wall_floor:
+                problems.append("wall time")
+            status = "REGRESSED (" + ", ".join(problems) + ")" if problems else "ok"
+            if problems:
+                failures.append(name)
+        print(f"{name:28} {result['wall_s']:9.3f} {base['wall_s'] if base else float('nan'):9.3f} "
+              f"{result['api_calls']:7d} {base['api_calls'] if base else 0:7d}  {status}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplier for the seeded volumes")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per scenario; the median wall time is kept")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="Only run this scenario (repeatable)")
+    parser.add_argument("--endpoint-url", help="Use an already running moto server instead of starting one")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--wall-tolerance", type=float, default=0.30, help="Allowed relative wall-time increase")
+    parser.add_argument("--calls-tolerance", type=float, default=0.05, help="Allowed relative API-call increase")
+    parser.add_argument("--wall-floor", type=float, default=0.05, help="Wall-time increases below this many seconds never fail")
+    args = parser.parse_args()
+
+    for var in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
+        os.environ.setdefault(var, "testing")
+
+    proc = None
+    url = args.endpoint_url
+    if url is None:
+        proc, url = start_moto_server()
+    try:
+        start = time.perf_counter()
+        records = seed(url, args.scale)
+        print(f"seeded scale {args.scale} in {time.perf_counter() - start:.1f}s against {url}")
+        results = run_suite(url, records, args.repeat, args.scenario)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            stored = json.load(f)
+        if stored.get("scale") == args.scale:
+            baseline = stored["scenarios"]
+        else:
+            print(f"baseline was recorded at scale {stored.get('scale')}, not {args.scale}; nothing to compare")
+    failures = compare(results, baseline, args.wall_tolerance, args.calls_tolerance, args.wall_floor)
+
+    if args.update_baseline:
+        # Scenarios not run this time keep their previous numbers
+        with open(args.baseline, "w") as f:
+            json.dump({"scale": args.scale, "scenarios": {**baseline, **results}}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"baseline written to {args.baseline}")
+        return 0
+    if failures:
+        print(f"{len(failures)} scenario(s) regressed: {', '.join(failures)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+import importlib
+import os
+import threading
+import click
+
+
+class AwsContext:
+    # The AwsObject is built on first use, so help, completion and argument
+    # errors never import boto3 or prompt for credentials.
+    # Long-lived processes (the daemon) set shared_objects to a dict so that
+    # invocations with the same settings reuse one warm AwsObject.
+    shared_objects = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, aws_obj=None, profiler=None, output='text', fields=None, **settings):
+        self._aws_obj = aws_obj
+        self.profiler = profiler
+        # How list commands print their records, see commands.output
+        self.output = output
+        self.fields = fields
+        self.settings = settings
+
+    @property
+    def aws_obj(self):
+        if self._aws_obj is None:
+            from aws_object import AwsObject
+            settings = dict(self.settings)
+            # If completion script is being generated, don't prompt for credentials
+            if os.environ.get('_AWSCTL_COMPLETE'):
+                for name in ('aws_access_key_id', 'aws_secret_access_key', 'owner'):
+                    settings[name] = settings.get(name) or 'dummy'
+            else:
+                # Only prompt for missing credentials if not generating completion
+                if not settings.get('aws_access_key_id'):
+                    settings['aws_access_key_id'] = click.prompt('AWS Access Key ID', type=str)
+                if not settings.get('aws_secret_access_key'):
+                    settings['aws_secret_access_key'] = click.prompt('AWS Secret Access Key', type=str, hide_input=True)
+                if not settings.get('owner'):
+                    settings['owner'] = click.prompt('Owner tag', type=str)
+            inventory_ttl = settings.pop('inventory_ttl', None)
+            if AwsContext.shared_objects is None:
+                self._aws_obj = AwsObject(**settings)
+            else:
+                key = tuple(sorted(settings.items()))
+                with AwsContext._shared_lock:
+                    if key not in AwsContext.shared_objects:
+                        AwsContext.shared_objects[key] = AwsObject(**settings)
+                    self._aws_obj = AwsContext.shared_objects[key]
+            if inventory_ttl is not None:
+                self._aws_obj.inventory_ttl = inventory_ttl
+        if self.profiler is not None:
+            self._aws_obj.profiler = self.profiler
+        return self._aws_obj
+
+    def finish_profile(self, trace_file=None):
+        # Detach first: a shared AwsObject outlives this invocation
+        if self._aws_obj is not None and self._aws_obj.profiler is self.profiler:
+            self._aws_obj.profiler = None
+        click.echo(self.profiler.format_summary(), err=True)
+        if trace_file:
+            self.profiler.write_trace(trace_file)
+            click.echo(f'Trace written to {trace_file}', err=True)
+
+
+class LazyGroup(click.Group):
+    # Subcommands given as name -> "module:attribute" are imported only when
+    # click resolves them, e.g. `awsctl s3 ...` never loads the EC2 commands.
+    def __init__(self, *args, lazy_subcommands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_subcommands = lazy_subcommands or {}
+
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_subcommands))
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name in self.lazy_subcommands and cmd_name not in self.commands:
+            module_name, attribute = self.lazy_subcommands[cmd_name].split(':')
+            self.add_command(getattr(importlib.import_module(module_name), attribute), cmd_name)
+        return super().get_command(ctx, cmd_name)
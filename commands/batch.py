@@ -0,0 +1,195 @@
+import io
+import json
+import shlex
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import click
+from commands import AwsContext
+
+# A script line containing only this word waits for every earlier step
+BARRIER = 'wait'
+
+
+class _StepStream():
+    # Stands in for sys.stdout/sys.stderr while a batch runs: each worker
+    # thread writes into its own step buffer, anything else goes to `real`.
+    encoding = 'utf-8'
+    errors = 'strict'
+
+    def __init__(self, real):
+        self.real = real
+        self._local = threading.local()
+
+    def capture(self, buffer):
+        self._local.buffer = buffer
+
+    def writable(self):
+        return True
+
+    def isatty(self):
+        return False
+
+    def write(self, s):
+        target = getattr(self._local, 'buffer', None)
+        return (target if target is not None else self.real).write(s)
+
+    def flush(self):
+        if getattr(self._local, 'buffer', None) is None:
+            self.real.flush()
+
+
+def parse_script(lines, fmt='auto'):
+    """Yield steps as dicts {step, id, args}, or None for a `wait` barrier."""
+    number = 0
+    for lineno, raw in enumerate(lines, 1):
+        line = raw.strip()
+        if not line or line.startswith('#'):
+            continue
+        if line == BARRIER:
+            yield None
+            continue
+        step_id = None
+        if fmt == 'jsonl' or (fmt == 'auto' and line[0] in '[{'):
+            try:
+                entry = json.loads(line)
+            except ValueError as e:
+                raise click.BadParameter(f'line {lineno}: invalid JSON ({e})', param_hint='SCRIPT')
+            if isinstance(entry, dict):
+                if entry.get('wait'):
+                    yield None
+                    continue
+                step_id = entry.get('id')
+                entry = entry.get('args')
+            args = shlex.split(entry) if isinstance(entry, str) else entry
+            if not isinstance(args, list) or not all(isinstance(a, str) for a in args):
+                raise click.BadParameter(f'line {lineno}: expected a list of strings or an object with "args"', param_hint='SCRIPT')
+        else:
+            args = shlex.split(line, comments=True)
+        if args[:1] == ['awsctl']:
+            args = args[1:]
+        if not args:
+            continue
+        number += 1
+        yield {'step': number, 'id': step_id if step_id is not None else number, 'args': args}
+
+
+def global_args(aws_obj, inventory_ttl, output='text', fields=None):
+    # The batch's own (already prompted) settings, put in front of every step
+    # so steps never prompt; a step may still override any of them.
+    args = [
+        '--aws-access-key-id', aws_obj.aws_access_key_id,
+        '--aws-secret-access-key', aws_obj.aws_secret_access_key,
+        '--owner', aws_obj.owner,
+        '--region', aws_obj.region_name,
+        '--max-pool-connections', str(aws_obj.max_pool_connections),
+        '--max-request-rate', str(aws_obj.max_request_rate or 0),
+        '--retry-mode', aws_obj.retry_mode,
+        '--max-attempts', str(aws_obj.max_attempts),
+        '--output', output,
+    ]
+    if fields:
+        args += ['--fields', ','.join(fields)]
+    if inventory_ttl is not None:
+        args += ['--inventory-ttl', str(inventory_ttl)]
+    return args
+
+
+def run_step(cli, step, prefix, stdout, stderr):
+    out, err = io.StringIO(), io.StringIO()
+    stdout.capture(out)
+    stderr.capture(err)
+    start = time.perf_counter()
+    try:
+        cli.main(args=prefix + step['args'], prog_name='awsctl')
+        code = 0
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            code = e.code or 0
+        else:
+            err.write(f'{e.code}\n')
+            code = 1
+    except Exception:
+        err.write(traceback.format_exc())
+        code = 1
+    finally:
+        stdout.capture(None)
+        stderr.capture(None)
+    return {
+        'step': step['step'],
+        'id': step['id'],
+        'args': step['args'],
+        'exit_code': code,
+        'elapsed_ms': round((time.perf_counter() - start) * 1000, 3),
+        'stdout': out.getvalue(),
+        'stderr': err.getvalue(),
+    }
+
+
+@click.command('batch')
+@click.argument('script', type=click.File('r'), default='-')
+@click.option('--format', 'fmt', type=click.Choice(['auto', 'jsonl', 'lines']), default='auto', show_default=True, help='Script format; auto treats lines starting with [ or { as JSON')
+@click.option('--concurrency', '-j', default=1, show_default=True, type=click.IntRange(1, 64), help='Steps run in parallel between `wait` lines')
+@click.option('--stop-on-error', is_flag=True, help='Do not start new steps once one has failed')
+@click.pass_context
+def batch(ctx: click.Context, script, fmt: str, concurrency: int, stop_on_error: bool):
+    """Run many awsctl commands in one process and report NDJSON results.
+
+    SCRIPT has one command per line, either shell-style
+    (`s3 create-bucket my-bucket`) or JSON (`["s3", "create-bucket", "my-bucket"]`
+    or `{"id": "bucket", "args": [...]}`). A line with just `wait` waits
+    for all earlier steps before starting the next ones.
+    """
+    steps = list(parse_script(script, fmt))
+    ctx_obj: AwsContext = ctx.obj
+    cli = ctx.find_root().command
+
+    # Resolve (and prompt for) credentials once, then let every step reuse
+    # the same AwsObject through the shared-object registry.
+    saved_shared = AwsContext.shared_objects
+    if saved_shared is None:
+        AwsContext.shared_objects = {}
+    prefix = global_args(ctx_obj.aws_obj, ctx_obj.settings.get('inventory_ttl'), ctx_obj.output, ctx_obj.fields)
+
+    real_stdout, real_stderr = sys.stdout, sys.stderr
+    stdout, stderr = _StepStream(real_stdout), _StepStream(real_stderr)
+    summary = {'ok': 0, 'failed': 0, 'skipped': 0}
+
+    def emit(record):
+        # Only called from this thread, as steps finish
+        summary['ok' if record['exit_code'] == 0 else 'failed'] += 1
+        real_stdout.write(json.dumps(record) + '\n')
+        real_stdout.flush()
+
+    start = time.perf_counter()
+    sys.stdout, sys.stderr = stdout, stderr
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            pending = set()
+            for step in steps:
+                if step is None or len(pending) >= concurrency:
+                    # A barrier drains everything; otherwise wait for a free slot
+                    while pending and (step is None or len(pending) >= concurrency):
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            emit(future.result())
+                if step is None:
+                    continue
+                if stop_on_error and summary['failed']:
+                    summary['skipped'] += 1
+                    continue
+                pending.add(pool.submit(run_step, cli, step, prefix, stdout, stderr))
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    emit(future.result())
+    finally:
+        sys.stdout, sys.stderr = real_stdout, real_stderr
+        AwsContext.shared_objects = saved_shared
+
+    summary['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 3)
+    click.echo(json.dumps({'summary': summary}))
+    if summary['failed']:
+        sys.exit(1)
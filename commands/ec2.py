@@ -0,0 +1,236 @@
+import sys
+import click
+from commands import AwsContext
+
+
+def echo_state_report(report, region=None):
+    suffix = f' ({region})' if region else ''
+    for item in report:
+        if 'Error' in item:
+            click.echo(f"{item['InstanceId']}{suffix}: failed ({item['Error']})")
+        else:
+            click.echo(f"{item['InstanceId']}{suffix}: {item['PreviousState']} -> {item['CurrentState']}")
+
+
+@click.group()
+@click.pass_obj
+def ec2(ctx_obj: AwsContext):
+    """Manage EC2 instances."""
+    pass
+
+
+def wait_options(f):
+    f = click.option('--timeout', default=600, show_default=True, type=click.IntRange(min=1), help='Seconds --wait waits before giving up')(f)
+    f = click.option('--wait', is_flag=True, help='Wait until every affected instance reaches its target state')(f)
+    return f
+
+
+def echo_still_pending(pending, timeout, region=None):
+    suffix = f' ({region})' if region else ''
+    for id, current in pending.items():
+        click.echo(f'{id}{suffix}: still {current or "unknown"} after {timeout}s')
+
+
+def wait_for_instances(inst, ids, state, timeout):
+    last = None
+
+    def progress(done, total):
+        # Progress goes to stderr, and only when the count moves
+        nonlocal last
+        if done != last:
+            last = done
+            click.echo(f'{done}/{total} instances {state}', err=True)
+
+    done, pending = inst.wait_for_state(ids, state, timeout=timeout, progress=progress)
+    echo_still_pending(pending, timeout)
+    return not pending
+
+
+@ec2.command('create')
+@click.option('--type', 'instance_type', default='t3.micro', show_default=True, help='EC2 instance type')
+@click.option('--image', 'image_id_or_name', default='ami-020cba7c55df1f615', show_default=True, help='AMI ID or known name (ubuntu/amazon-linux)')
+@click.option('--count', default=1, show_default=True, type=click.IntRange(min=1), help='Instances launched in one call')
+@wait_options
+@click.pass_obj
+def ec2_create(ctx_obj: AwsContext, instance_type: str, image_id_or_name: str, count: int, wait: bool, timeout: int):
+    from aws_object import Ec2
+    inst = Ec2(ctx_obj.aws_obj)
+    res = inst.create_ec2(type=instance_type, image_id_or_name=image_id_or_name, count=count)
+    if isinstance(res, str):
+        click.echo(res)
+        sys.exit(1)
+    click.echo(f'{len(res)} EC2 instance(s) created')
+    for id in res:
+        click.echo(f'instance id: {id}')
+    if wait and not wait_for_instances(inst, res, 'running', timeout):
+        sys.exit(1)
+
+
+def parse_tags(ctx, param, values):
+    tags = {}
+    for value in values:
+        key, sep, tag_value = value.partition('=')
+        if not sep or not key:
+            raise click.BadParameter(f'expected KEY=VALUE, got {value!r}')
+        tags[key] = tag_value
+    return tags
+
+
+def parse_regions(ctx, param, value):
+    if value is None:
+        return None
+    regions = [region.strip() for region in value.split(',') if region.strip()]
+    if not regions:
+        raise click.BadParameter('expected a comma-separated list of regions')
+    return regions
+
+
+def region_options(f):
+    f = click.option('--region-workers', default=8, show_default=True, type=click.IntRange(1, 64), help='Regions queried in parallel')(f)
+    f = click.option('--regions', callback=parse_regions, help='Comma-separated regions to query instead of --region')(f)
+    f = click.option('--all-regions', is_flag=True, help='Query every region enabled for the account')(f)
+    return f
+
+
+def selected_regions(ctx_obj: AwsContext, all_regions: bool, regions: list[str] | None, refresh: bool = False):
+    # None means "just --region"
+    if all_regions and regions:
+        raise click.UsageError('--all-regions and --regions are mutually exclusive')
+    if all_regions:
+        return ctx_obj.aws_obj.enabled_regions(refresh=refresh)
+    return regions
+
+
+def echo_region_outcome(outcome, count_label):
+    # Per-region timing and errors go to stderr so stdout stays the result list
+    elapsed_ms = outcome['Elapsed'] * 1000
+    if 'Error' in outcome:
+        click.echo(f"{outcome['Region']}: failed after {elapsed_ms:.0f} ms ({outcome['Error']})", err=True)
+    else:
+        click.echo(f"{outcome['Region']}: {count_label(outcome['Result'])} in {elapsed_ms:.0f} ms", err=True)
+
+
+def iter_regions(aws_obj, regions, region_workers, fn, count_label, failed):
+    # Yields (region, result) as regions finish; failed regions go to the failed list
+    for outcome in aws_obj.map_regions(fn, regions, max_workers=region_workers):
+        echo_region_outcome(outcome, count_label)
+        if 'Error' in outcome:
+            failed.append(outcome['Region'])
+        else:
+            yield outcome['Region'], outcome['Result']
+
+
+def exit_if_all_failed(regions, failed):
+    # Only a run where every region failed is an error
+    if regions and len(failed) == len(regions):
+        sys.exit(1)
+
+
+def run_in_regions(aws_obj, regions, region_workers, fn, echo_result, count_label):
+    failed = []
+    for region, result in iter_regions(aws_obj, regions, region_workers, fn, count_label, failed):
+        echo_result(region, result)
+    exit_if_all_failed(regions, failed)
+
+
+INSTANCE_COLUMNS = ['InstanceId', 'State.Name', 'InstanceType', 'PrivateIpAddress', 'PublicIpAddress', 'Placement.AvailabilityZone']
+
+
+@ec2.command('list')
+@click.option('--state', 'states', multiple=True, help='Only list instances in this state (repeatable)')
+@click.option('--type', 'instance_types', multiple=True, help='Only list instances of this type (repeatable)')
+@click.option('--tag', 'tags', multiple=True, callback=parse_tags, help='Extra KEY=VALUE tag filter (repeatable)')
+@click.option('--page-size', type=click.IntRange(5, 1000), help='Instances requested per DescribeInstances page')
+@click.option('--refresh', is_flag=True, help='Ignore the local inventory and resync from AWS')
+@region_options
+@click.pass_obj
+def ec2_list(ctx_obj: AwsContext, states: tuple[str, ...], instance_types: tuple[str, ...], tags: dict, page_size: int | None, refresh: bool,
+             all_regions: bool, regions: list[str] | None, region_workers: int):
+    from aws_object import Ec2
+    from commands.output import render
+    regions = selected_regions(ctx_obj, all_regions, regions, refresh)
+    if regions is not None:
+        def list_region(region):
+            return list(Ec2(ctx_obj.aws_obj, region).list_instances(states, instance_types, tags, page_size, refresh=refresh))
+
+        failed = []
+        records = (dict(instance, Region=region)
+                   for region, instances in iter_regions(ctx_obj.aws_obj, regions, region_workers, list_region,
+                                                         lambda instances: f'{len(instances)} instances', failed)
+                   for instance in instances)
+        render(ctx_obj, records, lambda instance: f"instance id: {instance['InstanceId']} region: {instance['Region']}",
+               INSTANCE_COLUMNS + ['Region'])
+        exit_if_all_failed(regions, failed)
+        return
+    inst = Ec2(ctx_obj.aws_obj)
+    render(ctx_obj, inst.list_instances(states, instance_types, tags, page_size, refresh=refresh),
+           lambda instance: f"instance id: {instance['InstanceId']}", INSTANCE_COLUMNS, empty='No instances found')
+
+
+def change_state_in_regions(ctx_obj: AwsContext, operation: str, target: str, all_regions: bool, regions: list[str] | None, region_workers: int,
+                            wait: bool, timeout: int):
+    from aws_object import Ec2
+    timed_out = False
+
+    def change_region(region):
+        inst = Ec2(ctx_obj.aws_obj, region)
+        res = getattr(inst, operation)()
+        # "There is no instances" means nothing to do in this region
+        report = [] if isinstance(res, str) else res
+        ids = [item['InstanceId'] for item in report if 'Error' not in item]
+        pending = inst.wait_for_state(ids, target, timeout=timeout)[1] if wait and ids else {}
+        return report, pending
+
+    def echo_region(region, result):
+        nonlocal timed_out
+        report, pending = result
+        echo_state_report(report, region)
+        echo_still_pending(pending, timeout, region)
+        timed_out = timed_out or bool(pending)
+
+    run_in_regions(ctx_obj.aws_obj, selected_regions(ctx_obj, all_regions, regions), region_workers,
+                   change_region, echo_region, lambda result: f'{len(result[0])} instances')
+    if timed_out:
+        sys.exit(1)
+
+
+def change_state(ctx_obj: AwsContext, action: str, target: str, instance_id: str | None, all_regions: bool, regions: list[str] | None,
+                 region_workers: int, wait: bool, timeout: int):
+    from aws_object import Ec2
+    if all_regions or regions:
+        if instance_id:
+            raise click.UsageError('--id applies to --region only; instance IDs are regional')
+        change_state_in_regions(ctx_obj, f'{action}_all', target, all_regions, regions, region_workers, wait, timeout)
+        return
+    inst = Ec2(ctx_obj.aws_obj)
+    if instance_id:
+        getattr(inst, action)(instance_id)
+        click.echo(f"{'Stopping' if action == 'stop' else 'Starting'} {instance_id}")
+        ids = [instance_id]
+    else:
+        res = getattr(inst, f'{action}_all')()
+        if isinstance(res, str):
+            click.echo(res)
+            return
+        echo_state_report(res)
+        ids = [item['InstanceId'] for item in res if 'Error' not in item]
+    if wait and ids and not wait_for_instances(inst, ids, target, timeout):
+        sys.exit(1)
+
+
+@ec2.command('stop')
+@click.option('--id', 'instance_id', help='Instance ID to stop; if omitted, all owned instances will be stopped')
+@wait_options
+@region_options
+@click.pass_obj
+def ec2_stop(ctx_obj: AwsContext, instance_id: str | None, wait: bool, timeout: int, all_regions: bool, regions: list[str] | None, region_workers: int):
+    change_state(ctx_obj, 'stop', 'stopped', instance_id, all_regions, regions, region_workers, wait, timeout)
+
+
+@ec2.command('start')
+@click.option('--id', 'instance_id', help='Instance ID to start; if omitted, all owned instances will be started')
+@wait_options
+@region_options
+@click.pass_obj
+def ec2_start(ctx_obj: AwsContext, instance_id: str | None, wait: bool, timeout: int, all_regions: bool, regions: list[str] | None, region_workers: int):
+    change_state(ctx_obj, 'start', 'running', instance_id, all_regions, regions, region_workers, wait, timeout)
@@ -0,0 +1,125 @@
+import json
+import time
+import click
+
+FORMATS = ('text', 'json', 'ndjson', 'table')
+# Rows written per click.echo call; output streams in chunks of this size
+FLUSH_EVERY = 100
+# Seconds a slow listing may hold back rows before they are written anyway
+FLUSH_INTERVAL = 0.5
+# Rows buffered to size the table columns before the table starts streaming
+TABLE_SAMPLE = 100
+
+
+def parse_fields(ctx, param, value):
+    if value is None:
+        return None
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    if not fields:
+        raise click.BadParameter('expected a comma-separated list of fields')
+    return fields
+
+
+def get_field(record, path):
+    # Dotted paths into the API's dicts and lists: State.Name,
+    # NetworkInterfaces.0.PrivateIpAddress, and Tags.Owner for Key/Value tag lists
+    value = record
+    for part in path.split('.'):
+        if isinstance(value, dict):
+            value = value.get(part)
+        elif isinstance(value, list) and part.isdigit():
+            value = value[int(part)] if int(part) < len(value) else None
+        elif isinstance(value, list):
+            value = next((item.get('Value') for item in value if isinstance(item, dict) and item.get('Key') == part), None)
+        else:
+            return None
+        if value is None:
+            return None
+    return value
+
+
+def project(record, fields):
+    return {field: get_field(record, field) for field in fields}
+
+
+def _cell(value):
+    if value is None:
+        return '-'
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return str(value)
+
+
+class _Writer():
+    # Collects rendered text and hands it to click.echo in chunks. The first
+    # row goes out at once, later ones every FLUSH_EVERY rows or FLUSH_INTERVAL seconds.
+    def __init__(self):
+        self.parts = []
+        self.rows = 0
+        self.flushed_at = time.monotonic()
+
+    def write(self, text, row=False):
+        self.parts.append(text)
+        if row:
+            self.rows += 1
+            if self.rows == 1 or self.rows % FLUSH_EVERY == 0 or time.monotonic() - self.flushed_at >= FLUSH_INTERVAL:
+                self.flush()
+
+    def flush(self):
+        if self.parts:
+            click.echo(''.join(self.parts), nl=False)
+            self.parts = []
+        self.flushed_at = time.monotonic()
+
+
+def render(ctx_obj, records, text, columns, empty=None):
+    """Write records in ctx_obj.output format as they arrive; returns how many were written.
+
+    text turns a record into its text-mode line, columns are the table's
+    default fields, and empty is the text-mode message for no records.
+    """
+    fmt = getattr(ctx_obj, 'output', 'text')
+    fields = getattr(ctx_obj, 'fields', None)
+    out = _Writer()
+    if fmt == 'table':
+        _render_table(out, records, fields or columns)
+    elif fmt == 'json':
+        out.write('[')
+        for record in records:
+            out.write((',\n' if out.rows else '\n') + json.dumps(project(record, fields) if fields else record, default=str), row=True)
+        out.write('\n]\n' if out.rows else ']\n')
+    elif fmt == 'ndjson':
+        for record in records:
+            out.write(json.dumps(project(record, fields) if fields else record, default=str) + '\n', row=True)
+    elif fields:
+        # Tab separated, so text output with --fields can go straight to cut/awk
+        for record in records:
+            out.write('\t'.join(_cell(get_field(record, field)) for field in fields) + '\n', row=True)
+    else:
+        for record in records:
+            out.write(text(record) + '\n', row=True)
+    if fmt == 'text' and not out.rows and empty:
+        out.write(empty + '\n')
+    out.flush()
+    return out.rows
+
+
+def _render_table(out, records, columns):
+    # Column widths come from the first TABLE_SAMPLE rows, so the table
+    # starts printing without waiting for the whole listing
+    records = iter(records)
+    sample = []
+    for record in records:
+        sample.append([_cell(get_field(record, column)) for column in columns])
+        if len(sample) >= TABLE_SAMPLE:
+            break
+    widths = [max([len(column)] + [len(row[i]) for row in sample]) for i, column in enumerate(columns)]
+
+    def line(cells):
+        return '  '.join(cell.ljust(width) for cell, width in zip(cells, widths)).rstrip() + '\n'
+
+    out.write(line(columns))
+    for cells in sample:
+        out.write(line(cells), row=True)
+    for record in records:
+        out.write(line([_cell(get_field(record, column)) for column in columns]), row=True)
@@ -0,0 +1,121 @@
+import sys
+import click
+from commands import AwsContext
+
+
+@click.group()
+@click.pass_obj
+def route53(ctx_obj: AwsContext):
+    """Manage Route53 hosted zones and records."""
+    pass
+
+
+def open_zone(ctx_obj: AwsContext, zone_domain: str):
+    # Record commands only resolve existing zones; creating one is explicit (create-zone)
+    from botocore.exceptions import ClientError
+    from aws_object import Route53
+    try:
+        return Route53(ctx_obj.aws_obj, zone_domain, create_if_missing=False)
+    except ClientError as e:
+        if e.response['Error'].get('Code') != 'NoSuchHostedZone':
+            raise
+        click.echo(f'No hosted zone found for {zone_domain}; run `route53 create-zone {zone_domain}` first')
+        sys.exit(1)
+
+
+@route53.command('create-zone')
+@click.argument('domain_name')
+@click.pass_obj
+def r53_create_zone(ctx_obj: AwsContext, domain_name: str):
+    from aws_object import Route53
+    r53 = Route53(ctx_obj.aws_obj, domain_name)
+    if r53.created:
+        click.echo(f'Hosted zone created: {r53.resourceId}')
+    else:
+        click.echo(f'Hosted zone exists: {r53.resourceId}')
+
+
+@route53.command('list-zones')
+@click.option('--refresh', is_flag=True, help='Ignore the local inventory and resync from AWS')
+@click.pass_obj
+def r53_list_zones(ctx_obj: AwsContext, refresh: bool):
+    from aws_object import Route53
+    from commands.output import render
+    r53 = Route53(ctx_obj.aws_obj)
+    render(ctx_obj, r53.list_zones(refresh=refresh), lambda zone: f"{zone['Name']} {zone['Id']}",
+           ['Name', 'Id', 'ResourceRecordSetCount'], empty='No owned hosted zones found')
+
+
+@route53.command('create-record')
+@click.argument('zone_domain')
+@click.argument('name')
+@click.argument('ip')
+@click.option('--type', 'dns_type', default='A', show_default=True)
+@click.option('--ttl', default=300, show_default=True, type=int)
+@click.pass_obj
+def r53_create_record(ctx_obj: AwsContext, zone_domain: str, name: str, ip: str, dns_type: str, ttl: int):
+    r53 = open_zone(ctx_obj, zone_domain)
+    resp = r53.create_record(name, ip, dns_type=dns_type, ttl=ttl)
+    code = resp.get('ResponseMetadata', {}).get('HTTPStatusCode')
+    click.echo(f'Record create status: {code}')
+
+
+@route53.command('update-record')
+@click.argument('zone_domain')
+@click.argument('name')
+@click.option('--type', 'dns_type', default='A', show_default=True)
+@click.option('--ip')
+@click.option('--ttl', type=int)
+@click.pass_obj
+def r53_update_record(ctx_obj: AwsContext, zone_domain: str, name: str, dns_type: str, ip: str | None, ttl: int | None):
+    r53 = open_zone(ctx_obj, zone_domain)
+    resp = r53.update_record(name, dns_type, ip=ip, ttl=ttl)
+    if isinstance(resp, str):
+        click.echo(resp)
+        sys.exit(1)
+    code = resp.get('ResponseMetadata', {}).get('HTTPStatusCode')
+    click.echo(f'Record update status: {code}')
+
+
+@route53.command('delete-record')
+@click.argument('zone_domain')
+@click.argument('name')
+@click.pass_obj
+def r53_delete_record(ctx_obj: AwsContext, zone_domain: str, name: str):
+    r53 = open_zone(ctx_obj, zone_domain)
+    resp = r53.delete_record(name)
+    code = resp.get('ResponseMetadata', {}).get('HTTPStatusCode')
+    click.echo(f'Record delete status: {code}')
+
+
+@route53.command('apply-records')
+@click.argument('zone_domain')
+@click.argument('records_file', type=click.File('r'))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'json', 'ndjson']), help='Input format (guessed from the file extension by default)')
+@click.option('--prune', is_flag=True, help='Delete records in the zone that are not in the file (apex SOA/NS are kept)')
+@click.option('--dry-run', is_flag=True, help='Print the plan without changing the zone')
+@click.pass_obj
+def r53_apply_records(ctx_obj: AwsContext, zone_domain: str, records_file, fmt: str | None, prune: bool, dry_run: bool):
+    """Make the zone match a CSV/JSON/NDJSON file of records."""
+    from aws_object import load_records
+    try:
+        records = load_records(records_file, fmt)
+    except (ValueError, KeyError) as e:
+        raise click.BadParameter(str(e), param_hint='RECORDS_FILE')
+    r53 = open_zone(ctx_obj, zone_domain)
+    changes = r53.plan_records(records, prune=prune)
+    for change in changes:
+        record_set = change['ResourceRecordSet']
+        values = ','.join(r['Value'] for r in record_set.get('ResourceRecords', []))
+        click.echo(f"{change['Action']} {record_set['Name']} {record_set['Type']} {record_set.get('TTL', '-')} {values}")
+    counts = {action: sum(1 for c in changes if c['Action'] == action) for action in ('CREATE', 'UPSERT', 'DELETE')}
+    batches = len(list(r53.change_batches(changes)))
+    summary = f"{counts['CREATE']} to create, {counts['UPSERT']} to update, {counts['DELETE']} to delete in {batches} batch(es)"
+    if not changes:
+        click.echo('Zone already matches the file')
+        return
+    if dry_run:
+        click.echo(f'Plan: {summary}')
+        return
+    r53.apply_changes(changes)
+    click.echo(f'Applied: {summary}')
@@ -0,0 +1,326 @@
+import sys
+import click
+from commands import AwsContext
+
+
+@click.group()
+@click.pass_obj
+def s3(ctx_obj: AwsContext):
+    """Manage S3 buckets and objects."""
+    pass
+
+
+@s3.command('create-bucket')
+@click.argument('bucket_name')
+@click.pass_obj
+def s3_create_bucket(ctx_obj: AwsContext, bucket_name: str):
+    from aws_object import S3
+    client = S3(ctx_obj.aws_obj)
+    ok = client.create_bucket(bucket_name)
+    if ok:
+        click.echo(f'Bucket {bucket_name} created')
+    else:
+        click.echo('Failed to create bucket')
+        sys.exit(1)
+
+
+def transfer_options(f):
+    f = click.option('--multipart-threshold', type=click.IntRange(min=5), help='Size in MiB above which multipart is used (boto3 default: 8)')(f)
+    f = click.option('--part-size', type=click.IntRange(min=5), help='Multipart part size in MiB (boto3 default: 8)')(f)
+    f = click.option('--max-concurrency', type=click.IntRange(min=1), help='Parallel parts per multipart upload (boto3 default: 10)')(f)
+    f = click.option('--workers', default=4, show_default=True, type=click.IntRange(min=1), help='Files uploaded in parallel')(f)
+    return f
+
+
+def build_transfer_config(client, part_size: int | None, max_concurrency: int | None, multipart_threshold: int | None):
+    mib = 1024 * 1024
+    return client.transfer_config(
+        multipart_threshold=multipart_threshold * mib if multipart_threshold else None,
+        multipart_chunksize=part_size * mib if part_size else None,
+        max_concurrency=max_concurrency,
+    )
+
+
+@s3.command('upload')
+@click.option('--bucket', 'bucket_name', required=True, help='Bucket name')
+@click.option('--prefix', default='', help='Key prefix; directories and globs keep their relative paths under it')
+@click.option('--key', help='Object key for data read from stdin (PATHS is "-")')
+@transfer_options
+@click.argument('paths', nargs=-1, required=True)
+@click.pass_obj
+def s3_upload(ctx_obj: AwsContext, bucket_name: str, prefix: str, key: str | None, workers: int, max_concurrency: int | None, part_size: int | None, multipart_threshold: int | None,
+              paths: tuple[str, ...]):
+    """Upload files, directories or glob patterns, or stdin with `-`."""
+    from aws_object import S3
+    client = S3(ctx_obj.aws_obj)
+    config = build_transfer_config(client, part_size, max_concurrency, multipart_threshold)
+    if '-' in paths or key:
+        if paths != ('-',) or not key:
+            raise click.UsageError('stdin uploads take exactly one PATH "-" and a --key')
+        # --prefix works as for files: the key goes under it
+        if prefix and not prefix.endswith('/'):
+            prefix = f'{prefix}/'
+        upload_stdin(client, bucket_name, prefix + key, config)
+        return
+    uploaded = failed = 0
+    for path, key, error in client.upload_paths(bucket_name, paths, prefix=prefix, max_workers=workers, transfer_config=config):
+        if error is None:
+            uploaded += 1
+            click.echo(f'Uploaded {path} to s3://{bucket_name}/{key}')
+        else:
+            failed += 1
+            click.echo(f'Failed to upload {path}: {error}', err=True)
+    if uploaded == 0 and failed == 0:
+        click.echo('No files matched')
+        sys.exit(1)
+    if failed:
+        click.echo(f'{failed} file(s) failed to upload')
+        sys.exit(1)
+
+
+def upload_stdin(client, bucket_name: str, key: str, config):
+    from botocore.exceptions import BotoCoreError, ClientError
+    try:
+        with click.open_file('-', 'rb') as stdin:
+            size = client.upload_stream(bucket_name, stdin, key, transfer_config=config)
+    except (BotoCoreError, ClientError, OSError, ValueError) as e:
+        click.echo(f'Failed to upload stdin to s3://{bucket_name}/{key}: {e}', err=True)
+        sys.exit(1)
+    click.echo(f'Uploaded {size} bytes from stdin to s3://{bucket_name}/{key}')
+
+
+@s3.command('sync')
+@click.argument('local_dir', type=click.Path(exists=True, file_okay=False))
+@click.option('--bucket', 'bucket_name', required=True, help='Bucket name')
+@click.option('--prefix', default='', help='Key prefix the directory is synced to')
+@click.option('--delete', is_flag=True, help='Delete objects under the prefix that no longer exist locally')
+@click.option('--dry-run', is_flag=True, help='Show what would change without uploading or deleting')
+@transfer_options
+@click.pass_obj
+def s3_sync(ctx_obj: AwsContext, local_dir: str, bucket_name: str, prefix: str, delete: bool, dry_run: bool, workers: int, max_concurrency: int | None, part_size: int | None, multipart_threshold: int | None):
+    """Upload only new or changed files from a directory."""
+    from aws_object import S3
+    client = S3(ctx_obj.aws_obj)
+    config = build_transfer_config(client, part_size, max_concurrency, multipart_threshold)
+    result = client.sync(local_dir, bucket_name, prefix=prefix, delete=delete, max_workers=workers, transfer_config=config, dry_run=dry_run)
+    verb = 'Would upload' if dry_run else 'Uploaded'
+    for key in result['uploaded']:
+        click.echo(f'{verb} s3://{bucket_name}/{key}')
+    for key in result['deleted']:
+        click.echo(f"{'Would delete' if dry_run else 'Deleted'} s3://{bucket_name}/{key}")
+    for key, error in result['failed']:
+        click.echo(f'Failed {key}: {error}', err=True)
+    click.echo(f"{len(result['uploaded'])} uploaded, {result['unchanged']} unchanged, {len(result['deleted'])} deleted, {len(result['failed'])} failed")
+    if result['failed']:
+        sys.exit(1)
+
+
+@s3.command('download')
+@click.option('--bucket', 'bucket_name', required=True, help='Bucket name')
+@click.option('--part-size', default=8, show_default=True, type=click.IntRange(min=1), help='Size in MiB of each byte range fetched')
+@click.option('--workers', type=click.IntRange(min=1), help='Ranges fetched in parallel (defaults to --max-pool-connections)')
+@click.option('--no-resume', is_flag=True, help='Start over instead of keeping ranges finished by an interrupted run')
+@click.option('--no-verify', is_flag=True, help='Skip checking the file against the object\'s ETag')
+@click.argument('key')
+@click.argument('dest', required=False)
+@click.pass_obj
+def s3_download(ctx_obj: AwsContext, bucket_name: str, part_size: int, workers: int | None, no_resume: bool, no_verify: bool, key: str, dest: str | None):
+    """Download an object in parallel byte ranges; DEST defaults to the key's file name."""
+    import os
+    from botocore.exceptions import BotoCoreError, ClientError
+    from aws_object import S3
+    client = S3(ctx_obj.aws_obj)
+    path = dest or os.path.basename(key)
+    if os.path.isdir(path):
+        path = os.path.join(path, os.path.basename(key))
+    try:
+        result = client.download_file(bucket_name, key, path, part_size=part_size * 1024 * 1024, max_workers=workers,
+                                      resume=not no_resume, verify=not no_verify)
+    except (BotoCoreError, ClientError, OSError, ValueError) as e:
+        click.echo(f'Failed to download s3://{bucket_name}/{key}: {e}', err=True)
+        sys.exit(1)
+    resumed = f", {result['Resumed']} bytes resumed" if result['Resumed'] else ''
+    checked = 'checksum verified' if result['Verified'] else 'checksum not verified'
+    click.echo(f"Downloaded s3://{bucket_name}/{key} to {path} ({result['Size']} bytes in {result['Parts']} parts{resumed}, {checked})")
+
+
+@s3.command('ls')
+@click.argument('bucket_name')
+@click.option('--prefix', default='', help='Only list keys starting with this prefix')
+@click.option('--parallel', is_flag=True, help='List each common prefix as its own shard, concurrently; keys come out unordered')
+@click.option('--workers', type=click.IntRange(min=1), help='Shards listed at once with --parallel (defaults to --max-pool-connections)')
+@click.option('--shard-depth', default=1, show_default=True, type=click.IntRange(min=1), help='Delimiter levels split into shards with --parallel')
+@click.option('--delimiter', default='/', show_default=True, help='Separator that defines the shards')
+@click.option('--page-size', type=click.IntRange(1, 1000), help='Keys requested per ListObjectsV2 page')
+@click.pass_obj
+def s3_ls(ctx_obj: AwsContext, bucket_name: str, prefix: str, parallel: bool, workers: int | None, shard_depth: int, delimiter: str, page_size: int | None):
+    """List the objects in a bucket as the pages arrive."""
+    from botocore.exceptions import BotoCoreError, ClientError
+    from aws_object import S3
+    from commands.output import render
+    client = S3(ctx_obj.aws_obj)
+    if parallel:
+        objects = client.iter_objects_sharded(bucket_name, prefix, max_workers=workers, shard_depth=shard_depth, delimiter=delimiter, page_size=page_size)
+    else:
+        objects = client.iter_objects(bucket_name, prefix, page_size=page_size)
+    try:
+        render(ctx_obj, objects, lambda obj: f"{obj['LastModified']:%Y-%m-%d %H:%M:%S} {obj['Size']:>12} {obj['Key']}",
+               ['Key', 'Size', 'LastModified', 'StorageClass'])
+    except (BotoCoreError, ClientError) as e:
+        click.echo(f'Failed to list s3://{bucket_name}/{prefix}: {e}', err=True)
+        sys.exit(1)
+    finally:
+        ctx_obj.aws_obj.bucket_regions.save()
+
+
+def delete_options(f):
+    f = click.option('--yes', is_flag=True, help='Do not ask for confirmation')(f)
+    f = click.option('--force', is_flag=True, help='Also delete from buckets not tagged with your Owner')(f)
+    f = click.option('--workers', default=8, show_default=True, type=click.IntRange(min=1), help='DeleteObjects batches of 1,000 keys in flight at once')(f)
+    f = click.option('--versions', is_flag=True, help='Permanently delete every object version and delete marker too')(f)
+    return f
+
+
+def delete_objects(ctx_obj: AwsContext, client, bucket_name: str, prefix: str, versions: bool, workers: int, force: bool, yes: bool):
+    from botocore.exceptions import BotoCoreError, ClientError
+    target = f's3://{bucket_name}/{prefix}'
+    try:
+        if not force and not client.is_owned_bucket(bucket_name):
+            click.echo(f'{bucket_name} is not tagged as owned by {ctx_obj.aws_obj.owner}; use --force to delete anyway', err=True)
+            sys.exit(1)
+        if not yes:
+            click.confirm(f"Delete every object{' version' if versions else ''} under {target}?", abort=True, err=True)
+        deleted = failed = batches = 0
+        for count, errors in client.delete_prefix(bucket_name, prefix, versions=versions, max_workers=workers):
+            deleted += count
+            failed += len(errors)
+            batches += 1
+            for error in errors:
+                version = f" (version {error['VersionId']})" if error.get('VersionId') else ''
+                click.echo(f"Failed to delete {error['Key']}{version}: {error.get('Code')} {error.get('Message', '')}".rstrip(), err=True)
+            # Progress goes to stderr every 10 batches
+            if batches % 10 == 0:
+                click.echo(f'{deleted} objects deleted so far', err=True)
+    except (BotoCoreError, ClientError) as e:
+        click.echo(f'Failed to delete from {target}: {e}', err=True)
+        sys.exit(1)
+    click.echo(f'{deleted} objects deleted, {failed} failed')
+    return failed == 0
+
+
+@s3.command('delete-prefix')
+@click.argument('bucket_name')
+@click.argument('prefix')
+@delete_options
+@click.pass_obj
+def s3_delete_prefix(ctx_obj: AwsContext, bucket_name: str, prefix: str, versions: bool, workers: int, force: bool, yes: bool):
+    """Delete every object whose key starts with PREFIX."""
+    from aws_object import S3
+    if not prefix:
+        raise click.UsageError('PREFIX is empty; use `s3 empty-bucket` to delete everything')
+    if not delete_objects(ctx_obj, S3(ctx_obj.aws_obj), bucket_name, prefix, versions, workers, force, yes):
+        sys.exit(1)
+
+
+@s3.command('empty-bucket')
+@click.argument('bucket_name')
+@delete_options
+@click.option('--delete-bucket', is_flag=True, help='Delete the bucket itself once it is empty')
+@click.pass_obj
+def s3_empty_bucket(ctx_obj: AwsContext, bucket_name: str, versions: bool, workers: int, force: bool, yes: bool, delete_bucket: bool):
+    """Delete every object in a bucket, and optionally the bucket."""
+    from botocore.exceptions import ClientError
+    from aws_object import S3
+    client = S3(ctx_obj.aws_obj)
+    if not delete_objects(ctx_obj, client, bucket_name, '', versions, workers, force, yes):
+        sys.exit(1)
+    if delete_bucket:
+        try:
+            client.delete_bucket(bucket_name)
+        except ClientError as e:
+            # BucketNotEmpty here usually means old versions are left; see --versions
+            click.echo(f'Failed to delete bucket {bucket_name}: {e}', err=True)
+            sys.exit(1)
+        click.echo(f'Bucket {bucket_name} deleted')
+
+
+def parse_s3_url(value: str):
+    # s3://bucket/key or bucket/key -> (bucket, key)
+    bucket, _, key = value.removeprefix('s3://').partition('/')
+    if not bucket:
+        raise click.BadParameter(f'expected s3://BUCKET[/KEY], got {value!r}')
+    return bucket, key
+
+
+@s3.command('copy')
+@click.argument('src')
+@click.argument('dst')
+@click.option('--recursive', is_flag=True, help='Treat the source key as a prefix even without a trailing /')
+@click.option('--tags', type=click.Choice(['owner', 'copy']), default='owner', show_default=True, help='Tag copies with your Owner/CreatedBy, or keep the source tags')
+@click.option('--multipart-threshold', type=click.IntRange(min=5), help='Size in MiB from which objects are copied in parallel parts (boto3 default: 8)')
+@click.option('--part-size', type=click.IntRange(min=5), help='Part size in MiB (boto3 default: 8)')
+@click.option('--max-concurrency', type=click.IntRange(min=1), help='Parts copied in parallel per object (boto3 default: 10)')
+@click.option('--workers', default=8, show_default=True, type=click.IntRange(min=1), help='Objects copied in parallel')
+@click.pass_obj
+def s3_copy(ctx_obj: AwsContext, src: str, dst: str, recursive: bool, tags: str, multipart_threshold: int | None, part_size: int | None, max_concurrency: int | None, workers: int):
+    """Copy a key, a prefix or a whole bucket server-side.
+
+    SRC and DST are s3://BUCKET/KEY. A SRC without a key, or ending in /,
+    copies every object under it to DST, keeping the rest of each key.
+    """
+    from botocore.exceptions import BotoCoreError, ClientError
+    from aws_object import S3
+    src_bucket, src_key = parse_s3_url(src)
+    dst_bucket, dst_key = parse_s3_url(dst)
+    client = S3(ctx_obj.aws_obj)
+    config = build_transfer_config(client, part_size, max_concurrency, multipart_threshold)
+    if not (recursive or not src_key or src_key.endswith('/')):
+        # A single object; a DST ending in / gets the source's file name
+        if not dst_key or dst_key.endswith('/'):
+            dst_key += src_key.rsplit('/', 1)[-1]
+        try:
+            client.copy_object(src_bucket, src_key, dst_bucket, dst_key, tags=tags, transfer_config=config)
+        except (BotoCoreError, ClientError) as e:
+            click.echo(f'Failed to copy s3://{src_bucket}/{src_key}: {e}', err=True)
+            sys.exit(1)
+        finally:
+            ctx_obj.aws_obj.bucket_regions.save()
+        click.echo(f'Copied s3://{src_bucket}/{src_key} to s3://{dst_bucket}/{dst_key}')
+        return
+
+    # Folder-style copies land under DST/; a bare --recursive prefix is swapped as is
+    if dst_key and not dst_key.endswith('/') and (not src_key or src_key.endswith('/')):
+        dst_key += '/'
+    copied = failed = 0
+    try:
+        for key, target, error in client.copy_objects(src_bucket, src_key, dst_bucket, dst_key, max_workers=workers, tags=tags, transfer_config=config):
+            if error is None:
+                copied += 1
+                click.echo(f'Copied s3://{src_bucket}/{key} to s3://{dst_bucket}/{target}')
+            else:
+                failed += 1
+                click.echo(f'Failed to copy s3://{src_bucket}/{key}: {error}', err=True)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    except (BotoCoreError, ClientError) as e:
+        click.echo(f'Failed to list s3://{src_bucket}/{src_key}: {e}', err=True)
+        sys.exit(1)
+    if copied == 0 and failed == 0:
+        click.echo('No objects matched')
+        sys.exit(1)
+    click.echo(f'{copied} copied, {failed} failed')
+    if failed:
+        sys.exit(1)
+
+
+@s3.command('list-buckets')
+@click.option('--workers', type=click.IntRange(min=1), help='Concurrent tag lookups (defaults to --max-pool-connections)')
+@click.option('--order', type=click.Choice(['sorted', 'completion']), default='sorted', show_default=True, help='Print buckets by name or as soon as each lookup finishes')
+@click.option('--refresh', is_flag=True, help='Ignore the local inventory and resync from AWS')
+@click.pass_obj
+def s3_list_buckets(ctx_obj: AwsContext, workers: int | None, order: str, refresh: bool):
+    from aws_object import S3
+    from commands.output import render
+    client = S3(ctx_obj.aws_obj)
+    render(ctx_obj, client.list_owned_bucket_records(max_workers=workers, order=order, refresh=refresh),
+           lambda bucket: bucket['Name'], ['Name', 'Region', 'CreationDate'], empty='No owned buckets found')
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""Long-lived awsctl process serving CLI invocations over a Unix socket.
+
+    python daemon.py serve  --socket ~/.awsctl/daemon.sock
+    python daemon.py client --socket ~/.awsctl/daemon.sock -- s3 list-buckets
+    python daemon.py stop   --socket ~/.awsctl/daemon.sock
+
+The server keeps boto3 imported and one AwsObject (session, clients, open
+connections) per distinct set of global options. The client forwards argv,
+stdin, the working directory and AWS_*/AWSCTL_* environment variables, and
+streams stdout/stderr back. The client half only uses the standard library
+so the wrapper script can run it on the host.
+"""
+import argparse
+import io
+import json
+import os
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+import traceback
+
+# Frame types: 1 byte type + 4 byte big-endian length + payload
+HEADER, STDIN, STDIN_EOF, STDOUT, STDERR, EXIT = b'H', b'I', b'E', b'O', b'R', b'X'
+# Exit status of the client when no daemon is listening; the wrapper falls back to one-shot
+NO_DAEMON = 75
+FORWARD_ENV_PREFIXES = ('AWS_', 'AWSCTL_', '_AWSCTL_', 'COMP_')
+
+
+def default_socket_path():
+    return os.environ.get('AWSCTL_DAEMON_SOCKET') or os.path.join(os.path.expanduser('~'), '.awsctl', 'daemon.sock')
+
+
+def send_frame(sock, kind, payload=b''):
+    sock.sendall(kind + struct.pack('>I', len(payload)) + payload)
+
+
+def _recv_exact(sock, size):
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise EOFError
+        buf += chunk
+    return bytes(buf)
+
+
+def recv_frame(sock):
+    head = _recv_exact(sock, 5)
+    (size,) = struct.unpack('>I', head[1:])
+    return head[:1], _recv_exact(sock, size)
+
+
+# Client
+
+def _pump_stdin(sock, stdin):
+    try:
+        while True:
+            chunk = stdin.read1(65536) if hasattr(stdin, 'read1') else stdin.read(65536)
+            if not chunk:
+                break
+            send_frame(sock, STDIN, chunk)
+        send_frame(sock, STDIN_EOF)
+    except (OSError, ValueError):
+        pass
+
+
+def run_client(socket_path, argv, stdin=None, stdout=None, stderr=None, env=None, cwd=None):
+    stdin = stdin if stdin is not None else sys.stdin.buffer
+    stdout = stdout if stdout is not None else sys.stdout.buffer
+    stderr = stderr if stderr is not None else sys.stderr.buffer
+    env = os.environ if env is None else env
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except OSError:
+        sock.close()
+        return NO_DAEMON
+    with sock:
+        header = {
+            'argv': list(argv),
+            'env': {k: v for k, v in env.items() if k.startswith(FORWARD_ENV_PREFIXES)},
+            'cwd': cwd or os.getcwd(),
+        }
+        send_frame(sock, HEADER, json.dumps(header).encode())
+        threading.Thread(target=_pump_stdin, args=(sock, stdin), daemon=True).start()
+        while True:
+            try:
+                kind, payload = recv_frame(sock)
+            except (EOFError, OSError):
+                stderr.write(b'awsctl daemon closed the connection\n')
+                return 1
+            if kind == STDOUT:
+                stdout.write(payload)
+                stdout.flush()
+            elif kind == STDERR:
+                stderr.write(payload)
+                stderr.flush()
+            elif kind == EXIT:
+                return json.loads(payload)
+
+
+def stop_daemon(socket_path):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except OSError:
+        sock.close()
+        return NO_DAEMON
+    with sock:
+        send_frame(sock, HEADER, json.dumps({'control': 'stop'}).encode())
+        try:
+            recv_frame(sock)
+        except EOFError:
+            pass
+    return 0
+
+
+# Server
+
+class _FrameWriter(io.RawIOBase):
+    def __init__(self, conn, kind, lock):
+        self.conn = conn
+        self.kind = kind
+        self.lock = lock
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        with self.lock:
+            send_frame(self.conn, self.kind, bytes(data))
+        return len(data)
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        daemon = self.server.awsctl_daemon
+        conn = self.request
+        try:
+            kind, payload = recv_frame(conn)
+        except EOFError:
+            return
+        header = json.loads(payload)
+        if header.get('control') == 'stop':
+            send_frame(conn, EXIT, b'0')
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+            return
+
+        read_fd, write_fd = os.pipe()
+        threading.Thread(target=self._pump_stdin, args=(conn, write_fd), daemon=True).start()
+        send_lock = threading.Lock()
+        stdin = io.TextIOWrapper(os.fdopen(read_fd, 'rb'), encoding='utf-8')
+        stdout = io.TextIOWrapper(io.BufferedWriter(_FrameWriter(conn, STDOUT, send_lock)), encoding='utf-8', line_buffering=True)
+        stderr = io.TextIOWrapper(io.BufferedWriter(_FrameWriter(conn, STDERR, send_lock)), encoding='utf-8', line_buffering=True)
+        try:
+            code = daemon.run(header, stdin, stdout, stderr)
+            stdout.flush()
+            stderr.flush()
+            send_frame(conn, EXIT, json.dumps(code).encode())
+        except OSError:
+            # The client went away mid-command
+            pass
+        finally:
+            stdin.close()
+
+    @staticmethod
+    def _pump_stdin(conn, write_fd):
+        with os.fdopen(write_fd, 'wb') as pipe:
+            try:
+                while True:
+                    kind, payload = recv_frame(conn)
+                    if kind == STDIN:
+                        pipe.write(payload)
+                        pipe.flush()
+                    elif kind == STDIN_EOF:
+                        break
+            except (EOFError, OSError):
+                pass
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class AwsctlDaemon():
+    def __init__(self, socket_path, idle_timeout=1800):
+        self.socket_path = socket_path
+        self.idle_timeout = idle_timeout
+        self.last_used = time.monotonic()
+        # os.environ, the cwd and sys.std* are process-wide, so commands run one at a time
+        self._run_lock = threading.Lock()
+        self.server = None
+
+    def run(self, header, stdin, stdout, stderr):
+        import main as awsctl_main
+        with self._run_lock:
+            self.last_used = time.monotonic()
+            saved_env = {k: v for k, v in os.environ.items() if k.startswith(FORWARD_ENV_PREFIXES)}
+            saved_cwd = os.getcwd()
+            saved_streams = sys.stdin, sys.stdout, sys.stderr
+            for key in saved_env:
+                del os.environ[key]
+            os.environ.update(header.get('env', {}))
+            sys.stdin, sys.stdout, sys.stderr = stdin, stdout, stderr
+            try:
+                os.chdir(header.get('cwd') or saved_cwd)
+                awsctl_main.cli.main(args=header['argv'], prog_name='awsctl')
+                code = 0
+            except SystemExit as e:
+                if e.code is None or isinstance(e.code, int):
+                    code = e.code or 0
+                else:
+                    print(e.code, file=sys.stderr)
+                    code = 1
+            except Exception:
+                traceback.print_exc()
+                code = 1
+            finally:
+                sys.stdin, sys.stdout, sys.stderr = saved_streams
+                for key in [k for k in os.environ if k.startswith(FORWARD_ENV_PREFIXES)]:
+                    del os.environ[key]
+                os.environ.update(saved_env)
+                os.chdir(saved_cwd)
+                self.last_used = time.monotonic()
+            return code
+
+    def _watch_idle(self):
+        while True:
+            time.sleep(min(self.idle_timeout, 30))
+            if not self._run_lock.locked() and time.monotonic() - self.last_used > self.idle_timeout:
+                self.server.shutdown()
+                return
+
+    def bind(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.socket_path)), exist_ok=True)
+        if os.path.exists(self.socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+                raise RuntimeError(f'a daemon is already listening on {self.socket_path}')
+            except OSError:
+                # Left behind by a daemon that did not shut down cleanly
+                os.unlink(self.socket_path)
+            finally:
+                probe.close()
+        # Import everything a command needs up front so the first call is warm too
+        import main as awsctl_main  # noqa: F401
+        import aws_object  # noqa: F401
+        from commands import AwsContext
+        AwsContext.shared_objects = {}
+        old_umask = os.umask(0o177)
+        try:
+            self.server = _Server(self.socket_path, _Handler)
+        finally:
+            os.umask(old_umask)
+        self.server.awsctl_daemon = self
+        return self.server
+
+    def serve_forever(self):
+        if self.server is None:
+            self.bind()
+        if self.idle_timeout:
+            threading.Thread(target=self._watch_idle, daemon=True).start()
+        try:
+            self.server.serve_forever(poll_interval=0.2)
+        finally:
+            self.server.server_close()
+            try:
+                os.unlink(self.socket_path)
+            except FileNotFoundError:
+                pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='awsctl-daemon', description='Warm awsctl process behind a Unix socket.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    serve = sub.add_parser('serve', help='run the daemon in the foreground')
+    serve.add_argument('--socket', default=default_socket_path())
+    serve.add_argument('--idle-timeout', type=int, default=1800, help='exit after this many idle seconds (0 = never)')
+    client = sub.add_parser('client', help='run one awsctl command through the daemon')
+    client.add_argument('--socket', default=default_socket_path())
+    client.add_argument('args', nargs=argparse.REMAINDER)
+    stop = sub.add_parser('stop', help='ask a running daemon to exit')
+    stop.add_argument('--socket', default=default_socket_path())
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        AwsctlDaemon(args.socket, args.idle_timeout).serve_forever()
+        return 0
+    if args.command == 'stop':
+        return stop_daemon(args.socket)
+    forwarded = args.args[1:] if args.args[:1] == ['--'] else args.args
+    return run_client(args.socket, forwarded)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,38 +1,54 @@
 import sys
-import os
 import click
-from aws_object import AwsObject, Ec2, S3, Route53
+from commands import AwsContext, LazyGroup
+from commands.output import FORMATS, parse_fields
 
 
-class AwsContext:
-    def __init__(self, aws_obj: AwsObject):
-        self.aws_obj = aws_obj
-
-
-@click.group()
+@click.group(cls=LazyGroup, lazy_subcommands={
+    'ec2': 'commands.ec2:ec2',
+    's3': 'commands.s3:s3',
+    'route53': 'commands.route53:route53',
+    'batch': 'commands.batch:batch',
+})
 @click.option('--aws-access-key-id', envvar='AWS_ACCESS_KEY_ID', required=False)
 @click.option('--aws-secret-access-key', envvar='AWS_SECRET_ACCESS_KEY', required=False)
 @click.option('--owner', envvar='AWS_OWNER', required=False)
 @click.option('--region', 'region_name', envvar='AWS_DEFAULT_REGION', default='us-east-1', show_default=True, help='AWS region to use')
+@click.option('--max-pool-connections', envvar='AWSCTL_MAX_POOL_CONNECTIONS', default=10, show_default=True, type=int, help='Maximum HTTP connections kept per AWS client')
+@click.option('--inventory-ttl', envvar='AWSCTL_INVENTORY_TTL', default=300, show_default=True, type=int, help='Seconds list commands answer from the local inventory before resyncing (0 disables)')
+@click.option('--max-request-rate', envvar='AWSCTL_MAX_REQUEST_RATE', default=0, show_default=True, type=click.FloatRange(min=0), help='Requests per second allowed per service and region, across all threads (0 = unlimited)')
+@click.option('--retry-mode', envvar='AWSCTL_RETRY_MODE', default='standard', show_default=True, type=click.Choice(['standard', 'adaptive', 'legacy']), help='botocore retry mode; adaptive also slows down after throttling')
+@click.option('--max-attempts', envvar='AWSCTL_MAX_ATTEMPTS', default=5, show_default=True, type=click.IntRange(min=1), help='Attempts per AWS request, including the first')
+@click.option('--output', envvar='AWSCTL_OUTPUT', default='text', show_default=True, type=click.Choice(FORMATS), help='Format of list commands, streamed as records arrive')
+@click.option('--fields', callback=parse_fields, help='Comma-separated fields to print, e.g. InstanceId,State.Name,Tags.Owner')
+@click.option('--profile-calls', is_flag=True, help='Print a per-API-call latency/retry/bytes summary to stderr at exit')
+@click.option('--trace-file', type=click.Path(dir_okay=False, writable=True), help='Also write a Chrome trace-event JSON timeline of the calls (implies --profile-calls)')
 @click.pass_context
-def cli(ctx: click.Context, aws_access_key_id: str, aws_secret_access_key: str, owner: str, region_name: str):
+def cli(ctx: click.Context, aws_access_key_id: str, aws_secret_access_key: str, owner: str, region_name: str, max_pool_connections: int, inventory_ttl: int,
+        max_request_rate: float, retry_mode: str, max_attempts: int, output: str, fields: list[str] | None,
+        profile_calls: bool, trace_file: str | None):
     """CLI for managing AWS resources based on aws_object module."""
-    # If completion script is being generated, don't prompt for credentials
-    if os.environ.get('_AWSCTL_COMPLETE'):
-        aws_access_key_id = aws_access_key_id or 'dummy'
-        aws_secret_access_key = aws_secret_access_key or 'dummy'
-        owner = owner or 'dummy'
-    else:
-        # Only prompt for missing credentials if not generating completion
-        if not aws_access_key_id:
-            aws_access_key_id = click.prompt('AWS Access Key ID', type=str)
-        if not aws_secret_access_key:
-            aws_secret_access_key = click.prompt('AWS Secret Access Key', type=str, hide_input=True)
-        if not owner:
-            owner = click.prompt('Owner tag', type=str)
-
-    aws_obj = AwsObject(aws_access_key_id, aws_secret_access_key, owner, region_name)
-    ctx.obj = AwsContext(aws_obj)
+    profiler = None
+    if profile_calls or trace_file:
+        from aws_object import CallProfiler
+        profiler = CallProfiler()
+    # aws_object (and with it boto3) is imported only when a command needs AWS
+    ctx.obj = AwsContext(
+        profiler=profiler,
+        output=output,
+        fields=fields,
+        aws_access_key_id=aws_access_key_id,
+        aws_secret_access_key=aws_secret_access_key,
+        owner=owner,
+        region_name=region_name,
+        max_pool_connections=max_pool_connections,
+        inventory_ttl=inventory_ttl,
+        max_request_rate=max_request_rate or None,
+        retry_mode=retry_mode,
+        max_attempts=max_attempts,
+    )
+    if profiler is not None:
+        ctx.call_on_close(lambda: ctx.obj.finish_profile(trace_file))
 
 
 @cli.command('add-user')
@@ -46,177 +62,6 @@ def add_user_cmd(ctx_obj: AwsContext):
         sys.exit(1)
 
 
-# EC2 commands
-@cli.group()
-@click.pass_obj
-def ec2(ctx_obj: AwsContext):
-    """Manage EC2 instances."""
-    pass
-
-
-@ec2.command('create')
-@click.option('--type', 'instance_type', default='t3.micro', show_default=True, help='EC2 instance type')
-@click.option('--image', 'image_id_or_name', default='ami-020cba7c55df1f615', show_default=True, help='AMI ID or known name (ubuntu/amazon-linux)')
-@click.pass_obj
-def ec2_create(ctx_obj: AwsContext, instance_type: str, image_id_or_name: str):
-    inst = Ec2(ctx_obj.aws_obj)
-    res = inst.create_ec2(type=instance_type, image_id_or_name=image_id_or_name)
-    if res is True:
-        click.echo('EC2 instance created')
-    else:
-        click.echo(str(res))
-        sys.exit(1)
-
-
-@ec2.command('list')
-@click.pass_obj
-def ec2_list(ctx_obj: AwsContext):
-    inst = Ec2(ctx_obj.aws_obj)
-    ids = inst.get_id()
-    if not ids:
-        click.echo('No instances found')
-        return
-    for i in ids:
-        click.echo(f'instance id: {i}')
-
-
-@ec2.command('stop')
-@click.option('--id', 'instance_id', help='Instance ID to stop; if omitted, all owned instances will be stopped')
-@click.pass_obj
-def ec2_stop(ctx_obj: AwsContext, instance_id: str | None):
-    inst = Ec2(ctx_obj.aws_obj)
-    if instance_id:
-        inst.stop(instance_id)
-        click.echo(f'Stopping {instance_id}')
-    else:
-        res = inst.stop_all()
-        if res is True:
-            click.echo('Stopping all owned instances')
-        else:
-            click.echo(str(res))
-
-
-@ec2.command('start')
-@click.option('--id', 'instance_id', help='Instance ID to start; if omitted, all owned instances will be started')
-@click.pass_obj
-def ec2_start(ctx_obj: AwsContext, instance_id: str | None):
-    inst = Ec2(ctx_obj.aws_obj)
-    if instance_id:
-        inst.start(instance_id)
-        click.echo(f'Starting {instance_id}')
-    else:
-        res = inst.start_all()
-        if res is True:
-            click.echo('Starting all owned instances')
-        else:
-            click.echo(str(res))
-
-
-# S3 commands
-@cli.group()
-@click.pass_obj
-def s3(ctx_obj: AwsContext):
-    """Manage S3 buckets and objects."""
-    pass
-
-
-@s3.command('create-bucket')
-@click.argument('bucket_name')
-@click.pass_obj
-def s3_create_bucket(ctx_obj: AwsContext, bucket_name: str):
-    client = S3(ctx_obj.aws_obj)
-    ok = client.create_bucket(bucket_name)
-    if ok:
-        click.echo(f'Bucket {bucket_name} created')
-    else:
-        click.echo('Failed to create bucket')
-        sys.exit(1)
-
-
-@s3.command('upload')
-@click.option('--bucket', 'bucket_name', required=True, help='Bucket name')
-@click.argument('file_path')
-@click.pass_obj
-def s3_upload(ctx_obj: AwsContext, bucket_name: str, file_path: str):
-    client = S3(ctx_obj.aws_obj)
-    ok = client.upload_file(bucket_name, file_path)
-    if ok:
-        click.echo(f'Uploaded {file_path} to s3://{bucket_name}/')
-    else:
-        click.echo('Failed to upload file')
-        sys.exit(1)
-
-
-@s3.command('list-buckets')
-@click.pass_obj
-def s3_list_buckets(ctx_obj: AwsContext):
-    client = S3(ctx_obj.aws_obj)
-    buckets = client.list_buckets()
-    if not buckets:
-        click.echo('No owned buckets found')
-        return
-    for b in buckets:
-        click.echo(b)
-
-
-# Route53 commands
-@cli.group()
-@click.pass_obj
-def route53(ctx_obj: AwsContext):
-    """Manage Route53 hosted zones and records."""
-    pass
-
-
-@route53.command('create-zone')
-@click.argument('domain_name')
-@click.pass_obj
-def r53_create_zone(ctx_obj: AwsContext, domain_name: str):
-    r53 = Route53(ctx_obj.aws_obj, domain_name)
-    click.echo(f'Hosted zone created: {r53.resourceId}')
-
-
-@route53.command('create-record')
-@click.argument('zone_domain')
-@click.argument('name')
-@click.argument('ip')
-@click.option('--type', 'dns_type', default='A', show_default=True)
-@click.option('--ttl', default=300, show_default=True, type=int)
-@click.pass_obj
-def r53_create_record(ctx_obj: AwsContext, zone_domain: str, name: str, ip: str, dns_type: str, ttl: int):
-    r53 = Route53(ctx_obj.aws_obj, zone_domain)
-    resp = r53.create_record(name, ip, dns_type=dns_type, ttl=ttl)
-    code = resp.get('ResponseMetadata', {}).get('HTTPStatusCode')
-    click.echo(f'Record create status: {code}')
-
-
-@route53.command('update-record')
-@click.argument('zone_domain')
-@click.argument('name')
-@click.option('--type', 'dns_type', default='A', show_default=True)
-@click.option('--ip')
-@click.option('--ttl', type=int)
-@click.pass_obj
-def r53_update_record(ctx_obj: AwsContext, zone_domain: str, name: str, dns_type: str, ip: str | None, ttl: int | None):
-    r53 = Route53(ctx_obj.aws_obj, zone_domain)
-    resp = r53.update_record(name, dns_type, ip=ip, ttl=ttl)
-    if isinstance(resp, str):
-        click.echo(resp)
-        sys.exit(1)
-    code = resp.get('ResponseMetadata', {}).get('HTTPStatusCode')
-    click.echo(f'Record update status: {code}')
-
-
-@route53.command('delete-record')
-@click.argument('zone_domain')
-@click.argument('name')
-@click.pass_obj
-def r53_delete_record(ctx_obj: AwsContext, zone_domain: str, name: str):
-    r53 = Route53(ctx_obj.aws_obj, zone_domain)
-    resp = r53.delete_record(name)
-    code = resp.get('ResponseMetadata', {}).get('HTTPStatusCode')
-    click.echo(f'Record delete status: {code}')
-
-
 # Shell completion command
 @cli.command('completion', help='Generate shell completion script', hidden=True)
 @click.argument('shell', type=click.Choice(['bash', 'zsh', 'fish', 'powershell']))
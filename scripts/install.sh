@@ -33,6 +33,9 @@ docker build -t awsctl:latest "$REPO_DIR"
 ensure_dir "$BIN_DIR"
 cp "$REPO_DIR/scripts/awsctl" "$BIN_DIR/awsctl"
 chmod +x "$BIN_DIR/awsctl"
+# Host-side client for the optional daemon (standard library only)
+cp "$REPO_DIR/daemon.py" "$BIN_DIR/awsctl-daemon"
+chmod +x "$BIN_DIR/awsctl-daemon"
 
 echo "Configuring shell completion..."
 SHELL_TYPE=""
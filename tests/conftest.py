@@ -0,0 +1,9 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def awsctl_cache_dir(tmp_path, monkeypatch):
+    # Keep the on-disk caches out of the real ~/.aws during tests
+    cache = tmp_path / "awsctl-cache"
+    monkeypatch.setenv("AWSCTL_CACHE_DIR", str(cache))
+    return cache
@@ -1,7 +1,6 @@
 import os
 import time
 import boto3
-import botocore
 import pytest
 
 if os.getenv("RUN_AWS_INTEGRATION") != "1":
@@ -32,26 +31,24 @@ def test_ec2_create_tag_list_stop_start_terminate(aws_object):
     instance_id = None
     try:
         # Create instance with default valid type/image
-        assert ec2_wrap.create_ec2() is True
-
-        # Find the instance by our tags
-        ids = ec2_wrap.get_id()
-        assert len(ids) >= 1
-        instance_id = ids[0]
-
-        # Try to stop without waiting (ignore IncorrectInstanceState)
-        try:
-            ec2_wrap.stop(instance_id)
-        except botocore.exceptions.ClientError as e:
-            if e.response.get('Error', {}).get('Code') != 'IncorrectInstanceState':
-                raise
-
-        # Try to start without waiting (ignore IncorrectInstanceState)
-        try:
-            ec2_wrap.start(instance_id)
-        except botocore.exceptions.ClientError as e:
-            if e.response.get('Error', {}).get('Code') != 'IncorrectInstanceState':
-                raise
+        created = ec2_wrap.create_ec2()
+        assert isinstance(created, list) and len(created) == 1
+        instance_id = created[0]
+
+        # The instance is also found by our tags
+        assert instance_id in ec2_wrap.get_id()
+
+        # A new instance is still pending, so wait until it runs before stopping it
+        _, pending = ec2_wrap.wait_for_state([instance_id], "running", timeout=300)
+        assert not pending
+
+        ec2_wrap.stop(instance_id)
+        _, pending = ec2_wrap.wait_for_state([instance_id], "stopped", timeout=300)
+        assert not pending
+
+        ec2_wrap.start(instance_id)
+        _, pending = ec2_wrap.wait_for_state([instance_id], "running", timeout=300)
+        assert not pending
     finally:
         if instance_id:
             try:
@@ -54,8 +54,8 @@ def test_valid_user_true(aws_object_instance):
 
 @mock_aws
 def test_valid_user_false(aws_object_instance, mocker):
-    # We can simulate an exception by mocking the get_user call
-    mocker.patch('boto3.client', side_effect=Exception("Invalid credentials"))
+    # We can simulate an exception by mocking the client factory
+    mocker.patch.object(aws_object_instance, 'client', side_effect=Exception("Invalid credentials"))
     assert aws_object_instance.valid_user() is False
 
 @mock_aws
@@ -71,3 +71,160 @@ def test_add_user(aws_object_instance, mocker):
     aws_object_instance.save_creadencial.assert_called_once()
     aws_object_instance.valid_user.assert_called_once()
     assert result is True
+
+@mock_aws
+def test_client_is_cached_per_service_and_region(aws_object_instance):
+    s3_client = aws_object_instance.client("s3")
+    assert aws_object_instance.client("s3") is s3_client
+    assert aws_object_instance.client("s3", "us-east-1") is s3_client
+    assert aws_object_instance.client("s3", "eu-west-1") is not s3_client
+    assert aws_object_instance.client("s3", endpoint_url="http://localhost:5000") is not s3_client
+    assert s3_client.meta.config.max_pool_connections == 10
+
+def test_client_cache_shared_across_threads(aws_object_instance):
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        clients = list(pool.map(lambda _: aws_object_instance.client("ec2"), range(32)))
+    assert all(c is clients[0] for c in clients)
+
+def test_resource_is_cached_per_thread(aws_object_instance):
+    import threading
+    resource = aws_object_instance.resource("s3")
+    assert aws_object_instance.resource("s3") is resource
+    other = []
+    t = threading.Thread(target=lambda: other.append(aws_object_instance.resource("s3")))
+    t.start()
+    t.join()
+    assert other[0] is not resource
+
+def test_max_pool_connections_is_configurable(aws_credentials):
+    obj = AwsObject("testing", "testing", "test-owner", max_pool_connections=50)
+    assert obj.client("s3").meta.config.max_pool_connections == 50
+
+def test_rate_limiter_reserves_slots_in_order(mocker):
+    from aws_object import RateLimiter
+    mocker.patch("aws_object.time.monotonic", return_value=100.0)
+    limiter = RateLimiter(10, burst=2)
+    assert [round(limiter.reserve(), 3) for _ in range(4)] == [0.0, 0.0, 0.1, 0.2]
+
+def test_rate_limiters_are_shared_per_service_and_region(aws_credentials):
+    obj = AwsObject("testing", "testing", "test-owner", max_request_rate=5, retry_mode="adaptive", max_attempts=8)
+    assert obj.rate_limiter("ec2") is obj.rate_limiter("ec2", "us-east-1")
+    assert obj.rate_limiter("ec2", "eu-west-1") is not obj.rate_limiter("ec2")
+    assert obj.client("ec2").meta.config.retries == {"mode": "adaptive", "total_max_attempts": 8}
+    assert AwsObject("testing", "testing", "test-owner").rate_limiter("ec2") is None
+
+
+class _Body:
+    def __init__(self, data):
+        self.data = data
+
+    def stream(self, **kwargs):
+        yield self.data
+
+
+class ThrottlingServer:
+    # Stands in for AWS's own per-account token bucket: requests over its rate
+    # get a Throttling error, the rest fall through to moto
+    body = (b'<ErrorResponse><Error><Type>Sender</Type><Code>Throttling</Code>'
+            b'<Message>Rate exceeded</Message></Error><RequestId>1</RequestId></ErrorResponse>')
+
+    def __init__(self, rate, burst):
+        import threading
+        import time
+        self.rate, self.burst = rate, burst
+        self.tokens, self.updated = burst, time.monotonic()
+        self.accepted = self.throttled = 0
+        self._lock = threading.Lock()
+
+    def before_send(self, request, **kwargs):
+        import time
+        from botocore.awsrequest import AWSResponse
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                self.accepted += 1
+                return None
+            self.throttled += 1
+        return AWSResponse(request.url, 400, {}, _Body(self.body))
+
+    def attach(self, client):
+        # Registered first so its error wins over moto's response, but after
+        # the client's own limiter, which is what the network would see
+        client.meta.events.register_first("before-send", self.before_send)
+
+
+def _hammer(obj, server, calls, workers=8):
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from botocore.exceptions import ClientError
+    client = obj.client("sts")
+    server.attach(client)
+
+    def call(_):
+        try:
+            client.get_caller_identity()
+            return True
+        except ClientError:
+            return False
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        ok = sum(pool.map(call, range(calls)))
+    return ok, time.perf_counter() - start
+
+@mock_aws
+def test_unlimited_fan_out_causes_throttling_storm(aws_credentials):
+    server = ThrottlingServer(rate=60, burst=20)
+    obj = AwsObject("testing", "testing", "test-owner", max_attempts=1)
+    ok, _ = _hammer(obj, server, calls=100)
+    assert server.throttled > 20
+    assert ok < 100
+
+@mock_aws
+def test_rate_limit_keeps_fan_out_under_server_limit(aws_credentials):
+    rate, calls = 50, 100
+    server = ThrottlingServer(rate=60, burst=rate)
+    obj = AwsObject("testing", "testing", "test-owner", max_request_rate=rate, max_attempts=1)
+    ok, elapsed = _hammer(obj, server, calls)
+    assert ok == calls
+    assert server.throttled == 0
+    # After the initial burst the limiter paces requests at its rate, not slower
+    paced = (calls - rate) / rate
+    assert paced * 0.9 <= elapsed <= paced + 1.0
+
+@mock_aws
+def test_call_profiler_records_calls_retries_and_trace(aws_credentials, mocker):
+    from aws_object import CallProfiler
+    mocker.patch("time.sleep")  # skip retry backoff
+    obj = AwsObject("testing", "testing", "test-owner", max_attempts=3)
+    obj.profiler = CallProfiler()
+    from botocore.awsrequest import AWSResponse
+    throttled = []
+
+    def throttle_once(request, **kwargs):
+        if not throttled:
+            throttled.append(request)
+            return AWSResponse(request.url, 400, {}, _Body(ThrottlingServer.body))
+
+    client = obj.client("sts")
+    client.meta.events.register_first("before-send", throttle_once)
+    client.get_caller_identity()
+    obj.client("s3").list_buckets()
+    obj.profiler, profiler = None, obj.profiler
+    obj.client("s3").list_buckets()  # not recorded once detached
+
+    rows = {row["operation"]: row for row in profiler.summary()}
+    assert set(rows) == {"GetCallerIdentity", "ListBuckets"}
+    assert rows["GetCallerIdentity"]["retries"] == 1
+    assert rows["GetCallerIdentity"]["bytes_out"] > 0
+    assert rows["ListBuckets"]["calls"] == 1 and rows["ListBuckets"]["bytes_in"] > 0
+    assert "GetCallerIdentity" in profiler.format_summary()
+
+    trace = profiler.chrome_trace()
+    spans = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+    assert [e["name"] for e in spans] == ["sts.GetCallerIdentity", "s3.ListBuckets"]
+    assert all(e["dur"] > 0 and e["args"]["status"] == 200 for e in spans)
@@ -0,0 +1,78 @@
+import json
+import pytest
+from click.testing import CliRunner
+from commands import AwsContext
+from commands.batch import parse_script
+from main import cli
+
+
+def test_parse_script_formats():
+    lines = [
+        "# comment\n",
+        "s3 create-bucket 'my bucket'\n",
+        '["s3", "list-buckets"]\n',
+        "wait\n",
+        '{"id": "zone", "args": "route53 create-zone example.com"}\n',
+        "awsctl ec2 list --state running\n",
+        '{"wait": true}\n',
+    ]
+    steps = list(parse_script(lines))
+    assert steps == [
+        {"step": 1, "id": 1, "args": ["s3", "create-bucket", "my bucket"]},
+        {"step": 2, "id": 2, "args": ["s3", "list-buckets"]},
+        None,
+        {"step": 3, "id": "zone", "args": ["route53", "create-zone", "example.com"]},
+        {"step": 4, "id": 4, "args": ["ec2", "list", "--state", "running"]},
+        None,
+    ]
+
+
+def test_parse_script_rejects_bad_json():
+    import click
+    with pytest.raises(click.BadParameter):
+        list(parse_script(['{"args": 3}']))
+
+
+@pytest.fixture
+def aws_env(monkeypatch):
+    moto = pytest.importorskip("moto")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    with moto.mock_aws():
+        yield
+
+
+def run_batch(script, *options):
+    result = CliRunner().invoke(cli, ["--owner", "test-owner", "batch", *options, "-"], input=script)
+    records = [json.loads(line) for line in result.output.splitlines()]
+    return result, records[:-1], records[-1]["summary"]
+
+
+def test_batch_runs_steps_over_one_aws_object(aws_env, monkeypatch):
+    created = []
+    import aws_object
+    original = aws_object.AwsObject.__init__
+
+    def counting_init(self, *args, **kwargs):
+        created.append(1)
+        original(self, *args, **kwargs)
+
+    monkeypatch.setattr(aws_object.AwsObject, "__init__", counting_init)
+    script = "s3 create-bucket batch-one\ns3 create-bucket batch-two\nwait\ns3 list-buckets --refresh\n"
+    result, records, summary = run_batch(script, "--concurrency", "2")
+    assert result.exit_code == 0, result.output
+    assert summary["ok"] == 3 and summary["failed"] == 0
+    by_step = {r["step"]: r for r in records}
+    assert sorted(by_step[3]["stdout"].split()) == ["batch-one", "batch-two"]
+    assert all(r["elapsed_ms"] >= 0 for r in records)
+    assert len(created) == 1
+    assert AwsContext.shared_objects is None
+
+
+def test_batch_reports_failures_and_stops(aws_env):
+    script = "s3 no-such-command\ns3 create-bucket never-created\n"
+    result, records, summary = run_batch(script, "--stop-on-error")
+    assert result.exit_code == 1
+    assert records[0]["exit_code"] == 2
+    assert "No such command" in records[0]["stderr"]
+    assert summary == {"ok": 0, "failed": 1, "skipped": 1, "elapsed_ms": summary["elapsed_ms"]}
@@ -0,0 +1,56 @@
+import io
+import os
+import threading
+import pytest
+import daemon
+from commands import AwsContext
+
+
+@pytest.fixture
+def running_daemon(tmp_path):
+    # Unix socket paths are limited to ~100 bytes, so keep it short
+    socket_path = os.path.join(str(tmp_path), "d.sock")
+    server = daemon.AwsctlDaemon(socket_path, idle_timeout=0)
+    server.bind()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    daemon.stop_daemon(socket_path)
+    thread.join(timeout=5)
+    AwsContext.shared_objects = None
+
+
+def call(server, argv, stdin=b"", env=None, cwd=None):
+    out, err = io.BytesIO(), io.BytesIO()
+    code = daemon.run_client(server.socket_path, argv, stdin=io.BytesIO(stdin), stdout=out, stderr=err, env=env or {}, cwd=cwd)
+    return code, out.getvalue().decode(), err.getvalue().decode()
+
+
+def test_client_without_daemon_reports_fallback(tmp_path):
+    code = daemon.run_client(str(tmp_path / "missing.sock"), ["--help"], stdin=io.BytesIO(), stdout=io.BytesIO(), stderr=io.BytesIO())
+    assert code == daemon.NO_DAEMON
+
+
+def test_help_and_usage_errors_stream_back(running_daemon):
+    code, out, _ = call(running_daemon, ["--help"])
+    assert code == 0
+    assert "Usage: awsctl" in out
+    code, _, err = call(running_daemon, ["no-such-command"])
+    assert code == 2
+    assert "No such command" in err
+
+
+def test_commands_share_warm_aws_object(running_daemon, tmp_path, awsctl_cache_dir):
+    moto = pytest.importorskip("moto")
+    env = {"AWS_ACCESS_KEY_ID": "testing", "AWS_SECRET_ACCESS_KEY": "testing", "AWS_OWNER": "test-owner",
+           "AWSCTL_CACHE_DIR": str(awsctl_cache_dir)}
+    records = b"name,type,ttl,value\nwww,A,300,1.2.3.4\n"
+    with moto.mock_aws():
+        assert call(running_daemon, ["route53", "create-zone", "daemon.com"], env=env)[0] == 0
+        # stdin is forwarded: "-" makes click read the records file from it
+        code, out, err = call(running_daemon, ["route53", "apply-records", "daemon.com", "-", "--format", "csv"], stdin=records, env=env, cwd=str(tmp_path))
+    assert code == 0, err
+    assert "CREATE www.daemon.com. A 300 1.2.3.4" in out
+    assert len(AwsContext.shared_objects) == 1
+    # The daemon's own environment is restored after each call
+    assert os.environ.get("AWS_OWNER") != "test-owner"
@@ -25,13 +25,24 @@ def aws_object(aws_credentials):
 def ec2_instance(aws_object):
     return Ec2(aws_object)
 
+def _create_owned(count, owner='test-owner', region='us-east-1'):
+    ec2 = boto3.resource('ec2', region_name=region)
+    return ec2.create_instances(
+        ImageId='ami-020cba7c55df1f615',
+        InstanceType='t3.micro',
+        MinCount=count,
+        MaxCount=count,
+        TagSpecifications=[{'ResourceType': 'instance', 'Tags': [{'Key': 'Owner', 'Value': owner}, {'Key': 'CreatedBy', 'Value': 'platform-cli'}]}]
+    )
+
 @mock_aws
 def test_create_ec2_success(ec2_instance):
     ec2_client = boto3.client("ec2", region_name="us-east-1")
     result = ec2_instance.create_ec2()
-    assert result is True
-    
+    assert isinstance(result, list) and len(result) == 1
+
     instances = ec2_client.describe_instances()
+    assert instances['Reservations'][0]['Instances'][0]['InstanceId'] == result[0]
     assert len(instances['Reservations'][0]['Instances']) == 1
     tags = instances['Reservations'][0]['Instances'][0]['Tags']
     assert {'Key': 'CreatedBy', 'Value': 'platform-cli'} in tags
@@ -43,6 +54,28 @@ def test_create_ec2_invalid_type(ec2_instance):
     result = ec2_instance.create_ec2(type="invalid-type")
     assert "instance type must one of" in result
 
+
+@mock_aws
+def test_create_ec2_count_launches_in_one_call(ec2_instance, mocker):
+    ec2_instance.max_instnces = 5
+    spy = mocker.spy(ec2_instance.aws_object.client('ec2'), 'run_instances')
+    ids = ec2_instance.create_ec2(image_id_or_name="amazon-linux", count=3)
+    assert len(ids) == 3
+    assert spy.call_count == 1
+    assert spy.call_args.kwargs['MinCount'] == spy.call_args.kwargs['MaxCount'] == 3
+    assert sorted(ec2_instance.get_id()) == sorted(ids)
+
+
+@mock_aws
+def test_create_ec2_enforces_owner_cap(ec2_instance, mocker):
+    _create_owned(1)
+    _create_owned(5, owner='someone-else')
+    spy = mocker.spy(ec2_instance.aws_object.client('ec2'), 'run_instances')
+    result = ec2_instance.create_ec2(count=2)
+    assert "would exceed the limit of 2" in result
+    assert spy.call_count == 0
+    assert len(ec2_instance.create_ec2(count=1)) == 1
+
 @mock_aws
 def test_get_id(ec2_instance):
     ec2 = boto3.resource('ec2', region_name='us-east-1')
@@ -58,6 +91,32 @@ def test_get_id(ec2_instance):
     ids = ec2_instance.get_id()
     assert ids == [instance_id]
 
+@mock_aws
+def test_iter_instances_paginates(ec2_instance, mocker):
+    # moto pages by reservation, so launch each instance separately
+    ids = sorted(_create_owned(1)[0].id for _ in range(12))
+    client = ec2_instance.aws_object.client('ec2')
+    spy = mocker.spy(client, 'describe_instances')
+
+    stream = ec2_instance.iter_instances(page_size=5)
+    first = next(stream)
+    # Only the first page has been requested so far
+    assert spy.call_count == 1
+    assert sorted([first['InstanceId']] + [i['InstanceId'] for i in stream]) == ids
+    assert spy.call_count == 3
+
+@mock_aws
+def test_iter_instances_extra_filters(ec2_instance):
+    instances = _create_owned(2)
+    instances[0].stop()
+    instances[1].create_tags(Tags=[{'Key': 'env', 'Value': 'prod'}])
+
+    stopped = [i['InstanceId'] for i in ec2_instance.iter_instances(states=['stopped'])]
+    assert stopped == [instances[0].id]
+    tagged = ec2_instance.get_id(tags={'env': 'prod'})
+    assert tagged == [instances[1].id]
+    assert ec2_instance.get_id(instance_types=['t2.small']) == []
+
 @mock_aws
 def test_stop_and_start(ec2_instance):
     ec2 = boto3.resource('ec2', region_name='us-east-1')
@@ -82,22 +141,61 @@ def test_stop_and_start(ec2_instance):
 
 @mock_aws
 def test_stop_all_and_start_all(ec2_instance, mocker):
-    mock_ids = ["i-12345", "i-67890"]
-    mocker.patch.object(ec2_instance, 'get_id', return_value=mock_ids)
-    mock_stop = mocker.patch.object(ec2_instance, 'stop')
-    mock_start = mocker.patch.object(ec2_instance, 'start')
+    instances = _create_owned(5)
+    _create_owned(1, owner='someone-else')
+    ids = sorted(i.id for i in instances)
+    ec2_instance.batch_size = 2
+    client = ec2_instance.aws_object.client('ec2')
+    stop_spy = mocker.spy(client, 'stop_instances')
+
+    report = ec2_instance.stop_all()
+    assert sorted(r['InstanceId'] for r in report) == ids
+    assert all(r['PreviousState'] == 'running' for r in report)
+    # 5 instances in chunks of 2
+    assert stop_spy.call_count == 3
+
+    start_spy = mocker.spy(client, 'start_instances')
+    report = ec2_instance.start_all()
+    assert sorted(r['InstanceId'] for r in report) == ids
+    assert start_spy.call_count == 3
+
+@mock_aws
+def test_stop_all_skips_instances_already_stopped(ec2_instance, mocker):
+    instances = _create_owned(3)
+    instances[0].stop()
+    report = ec2_instance.stop_all()
+    assert sorted(r['InstanceId'] for r in report) == sorted(i.id for i in instances[1:])
+    # Everything is stopped now, so there is nothing left to stop
+    assert ec2_instance.stop_all() == "There is no instances"
+
+@mock_aws
+def test_change_state_isolates_failing_instance(ec2_instance, mocker):
+    from botocore.exceptions import ClientError
+    instances = _create_owned(2)
+    bad_id = instances[0].id
+    client = ec2_instance.aws_object.client('ec2')
+    real_stop = client.stop_instances
 
-    result_stop = ec2_instance.stop_all()
-    assert result_stop is True
-    assert mock_stop.call_count == len(mock_ids)
-    mock_stop.assert_any_call("i-12345")
-    mock_stop.assert_any_call("i-67890")
+    def stop_instances(InstanceIds):
+        if bad_id in InstanceIds:
+            raise ClientError({'Error': {'Code': 'IncorrectInstanceState'}}, 'StopInstances')
+        return real_stop(InstanceIds=InstanceIds)
 
-    result_start = ec2_instance.start_all()
-    assert result_start is True
-    assert mock_start.call_count == len(mock_ids)
-    mock_start.assert_any_call("i-12345")
-    mock_start.assert_any_call("i-67890")
+    mocker.patch.object(client, 'stop_instances', side_effect=stop_instances)
+    report = {r['InstanceId']: r for r in ec2_instance.stop_all()}
+    assert report[bad_id]['Error'] == 'IncorrectInstanceState'
+    assert report[instances[1].id]['CurrentState'] in ('stopping', 'stopped')
+
+@mock_aws
+def test_change_state_does_not_split_batch_on_throttling(ec2_instance, mocker):
+    from botocore.exceptions import ClientError
+    instances = _create_owned(2)
+    client = ec2_instance.aws_object.client('ec2')
+    stop = mocker.patch.object(client, 'stop_instances', side_effect=ClientError({'Error': {'Code': 'RequestLimitExceeded'}}, 'StopInstances'))
+    report = ec2_instance.stop_all()
+    assert stop.call_count == 1
+    assert sorted(r['InstanceId'] for r in report) == sorted(i.id for i in instances)
+    assert all(r['Error'] == 'RequestLimitExceeded' for r in report)
 
 @mock_aws
 def test_list_ec2(ec2_instance, mocker):
@@ -107,3 +205,170 @@ def test_list_ec2(ec2_instance, mocker):
     # For now, just call it to ensure no errors.
     # A better implementation of listec2 would return the string.
     ec2_instance.listec2()
+
+@mock_aws
+def test_list_instances_served_from_inventory(ec2_instance, mocker):
+    instances = _create_owned(2)
+    first = sorted(i['InstanceId'] for i in ec2_instance.list_instances())
+    assert first == sorted(i.id for i in instances)
+
+    spy = mocker.spy(ec2_instance.aws_object.client('ec2'), 'describe_instances')
+    assert sorted(i['InstanceId'] for i in ec2_instance.list_instances()) == first
+    assert spy.call_count == 0
+
+    # Stopping leaves the index in a transitional state, so the next read resyncs
+    ec2_instance.stop(instances[0].id)
+    stopped = [i['InstanceId'] for i in ec2_instance.list_instances(states=['stopped'])]
+    assert stopped == [instances[0].id]
+    assert spy.call_count == 1
+
+    # Creating instances checks the cap with one listing; the pending launch forces a resync
+    ec2_instance.max_instnces = 5
+    created = ec2_instance.create_ec2()
+    assert spy.call_count == 2
+    assert created[0] in [i['InstanceId'] for i in ec2_instance.list_instances()]
+    assert spy.call_count == 3
+    assert len(list(ec2_instance.list_instances())) == 3
+    assert spy.call_count == 3
+    list(ec2_instance.list_instances(refresh=True))
+    assert spy.call_count == 4
+
+
+@mock_aws
+def test_inventory_resyncs_after_state_change(ec2_instance):
+    instances = _create_owned(2)
+    assert len(list(ec2_instance.list_instances())) == 2
+    ec2_instance.stop_all()
+    stopped = sorted(i['InstanceId'] for i in ec2_instance.list_instances(states=['stopped']))
+    assert stopped == sorted(i.id for i in instances)
+
+    ec2_instance.start_all()
+    running = sorted(i['InstanceId'] for i in ec2_instance.list_instances(states=['running']))
+    assert running == sorted(i.id for i in instances)
+
+    ec2_instance.max_instnces = 5
+    created = ec2_instance.create_ec2()
+    assert created[0] in [i['InstanceId'] for i in ec2_instance.list_instances(states=['running'])]
+
+@mock_aws
+def test_inventory_is_scoped_per_account(ec2_instance, mocker):
+    instance = _create_owned(1)[0]
+    assert [i['InstanceId'] for i in ec2_instance.list_instances()] == [instance.id]
+    # Same owner tag, other credentials: never answered from the first account's index
+    other = Ec2(AwsObject("other-key", "other-secret", "test-owner"))
+    mocker.patch.object(other, 'iter_instances', return_value=iter([]))
+    assert list(other.list_instances()) == []
+    assert [i['InstanceId'] for i in ec2_instance.list_instances()] == [instance.id]
+
+@mock_aws
+def test_enabled_regions_are_cached(aws_object, mocker):
+    regions = aws_object.enabled_regions()
+    assert 'us-east-1' in regions and 'eu-west-1' in regions
+    spy = mocker.spy(aws_object.client('ec2'), 'describe_regions')
+    assert AwsObject("testing", "testing", "test-owner").enabled_regions() == regions
+    assert aws_object.enabled_regions() == regions
+    assert spy.call_count == 0
+    aws_object.enabled_regions(refresh=True)
+    assert spy.call_count == 1
+
+
+@mock_aws
+def test_map_regions_isolates_failing_region(aws_object):
+    from botocore.exceptions import ClientError
+
+    def fn(region):
+        if region == 'eu-west-1':
+            raise ClientError({'Error': {'Code': 'AuthFailure', 'Message': 'region disabled'}}, 'DescribeInstances')
+        return region.upper()
+
+    outcomes = {o['Region']: o for o in aws_object.map_regions(fn, ['us-east-1', 'eu-west-1', 'us-west-2'], max_workers=2)}
+    assert outcomes['us-east-1']['Result'] == 'US-EAST-1'
+    assert 'AuthFailure' in outcomes['eu-west-1']['Error']
+    assert all(o['Elapsed'] >= 0 for o in outcomes.values())
+
+
+@mock_aws
+def test_cli_list_and_stop_across_regions(aws_credentials, awsctl_cache_dir):
+    import json
+    import time
+    from click.testing import CliRunner
+    from main import cli
+    # Seed the discovered-regions cache so --all-regions only visits two regions
+    awsctl_cache_dir.mkdir()
+    (awsctl_cache_dir / 'regions.json').write_text(json.dumps(
+        {'testing': {'regions': ['eu-west-1', 'us-east-1'], 'fetched_at': time.time()}}))
+    east = _create_owned(1)[0].id
+    west = _create_owned(2, region='eu-west-1')
+    runner = CliRunner()
+    base = ['--owner', 'test-owner']
+    result = runner.invoke(cli, base + ['ec2', 'list', '--regions', 'us-east-1,eu-west-1'])
+    assert result.exit_code == 0, result.output
+    assert f'instance id: {east} region: us-east-1' in result.output
+    for instance in west:
+        assert f'instance id: {instance.id} region: eu-west-1' in result.output
+    assert 'eu-west-1: 2 instances in' in result.output
+
+    result = runner.invoke(cli, base + ['--output', 'table', 'ec2', 'list', '--regions', 'us-east-1,eu-west-1'])
+    assert result.exit_code == 0, result.output
+    rows = [line.split() for line in result.output.splitlines() if line.startswith(('InstanceId', 'i-'))]
+    assert rows[0] == ['InstanceId', 'State.Name', 'InstanceType', 'PrivateIpAddress', 'PublicIpAddress', 'Placement.AvailabilityZone', 'Region']
+    assert sorted((row[0], row[-1]) for row in rows[1:]) == sorted([(east, 'us-east-1')] + [(i.id, 'eu-west-1') for i in west])
+
+    result = runner.invoke(cli, base + ['ec2', 'stop', '--all-regions', '--region-workers', '4'])
+    assert result.exit_code == 0, result.output
+    assert f'{east} (us-east-1): running -> stopping' in result.output
+    assert f'{west[0].id} (eu-west-1): running -> stopping' in result.output
+
+    result = runner.invoke(cli, base + ['ec2', 'start', '--regions', 'eu-west-1', '--id', east])
+    assert result.exit_code == 2
+
+
+@mock_aws
+def test_wait_for_state_polls_pending_instances_in_batches(ec2_instance, mocker):
+    instances = _create_owned(5)
+    ids = [i.id for i in instances]
+    ec2_instance.filter_size = 2
+    sleep = mocker.patch('aws_object.time.sleep')
+    ec2_instance._change_state('stop_instances', 'StoppingInstances', ids)
+    spy = mocker.spy(ec2_instance.aws_object.client('ec2'), 'describe_instances')
+    seen = []
+    done, pending = ec2_instance.wait_for_state(ids, 'stopped', progress=lambda d, t: seen.append((d, t)))
+    assert done == {id: 'stopped' for id in ids}
+    assert pending == {}
+    # One poll, three filter chunks, no sleeping once everything is stopped
+    assert spy.call_count == 3
+    assert seen == [(5, 5)]
+    sleep.assert_not_called()
+
+
+@mock_aws
+def test_wait_for_state_backs_off_and_times_out(ec2_instance, mocker):
+    ids = [i.id for i in _create_owned(2)]
+    clock = [0.0]
+    mocker.patch('aws_object.time.monotonic', side_effect=lambda: clock[0])
+    sleeps = []
+
+    def fake_sleep(seconds):
+        sleeps.append(seconds)
+        clock[0] += seconds
+
+    mocker.patch('aws_object.time.sleep', side_effect=fake_sleep)
+    # The instances stay running, so nothing ever moves after the first poll
+    done, pending = ec2_instance.wait_for_state(ids, 'stopped', timeout=30, delay=2, max_delay=8)
+    assert done == {}
+    assert pending == {id: 'running' for id in ids}
+    assert sleeps == [2, 4, 8, 8, 8]
+
+
+@mock_aws
+def test_cli_stop_all_wait(aws_credentials, mocker):
+    from click.testing import CliRunner
+    from main import cli
+    ids = [i.id for i in _create_owned(3)]
+    mocker.patch('aws_object.time.sleep')
+    result = CliRunner().invoke(cli, ['--owner', 'test-owner', 'ec2', 'stop', '--wait', '--timeout', '30'])
+    assert result.exit_code == 0, result.output
+    assert '3/3 instances stopped' in result.output
+    result = CliRunner().invoke(cli, ['--owner', 'test-owner', 'ec2', 'start', '--id', ids[0], '--wait'])
+    assert result.exit_code == 0, result.output
+    assert 'Starting' in result.output and '1/1 instances running' in result.output
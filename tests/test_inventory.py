@@ -0,0 +1,51 @@
+import time
+import pytest
+from aws_object import Inventory
+
+
+@pytest.fixture
+def inventory(tmp_path):
+    return Inventory(str(tmp_path / "inventory.sqlite3"))
+
+
+def test_record_marks_scope_fresh_after_full_stream(inventory):
+    items = [{"Id": "b"}, {"Id": "a"}]
+    stream = inventory.record("bucket", "me", "", iter(items), "Id", batch_size=1)
+    next(stream)
+    # A partially consumed listing must not look like a complete sync
+    assert not inventory.is_fresh("bucket", "me", "", 60)
+    list(stream)
+    assert inventory.is_fresh("bucket", "me", "", 60)
+    assert inventory.items("bucket", "me", "") == [{"Id": "a"}, {"Id": "b"}]
+
+
+def test_full_record_drops_resources_that_disappeared(inventory):
+    list(inventory.record("instance", "me", "us-east-1", [{"Id": "i-1"}, {"Id": "i-2"}], "Id"))
+    list(inventory.record("instance", "me", "us-east-1", [{"Id": "i-2"}], "Id"))
+    assert inventory.items("instance", "me", "us-east-1") == [{"Id": "i-2"}]
+
+
+def test_scopes_are_isolated(inventory):
+    list(inventory.record("instance", "me", "us-east-1", [{"Id": "i-1"}], "Id"))
+    assert inventory.items("instance", "me", "eu-west-1") == []
+    assert inventory.items("instance", "someone-else", "us-east-1") == []
+    assert not inventory.is_fresh("instance", "me", "eu-west-1", 60)
+
+
+def test_ttl_and_invalidate(inventory, monkeypatch):
+    list(inventory.record("instance", "me", "us-east-1", [], "Id"))
+    assert inventory.is_fresh("instance", "me", "us-east-1", 60)
+    assert not inventory.is_fresh("instance", "me", "us-east-1", 0)
+    real_time = time.time
+    monkeypatch.setattr(time, "time", lambda: real_time() + 120)
+    assert not inventory.is_fresh("instance", "me", "us-east-1", 60)
+    monkeypatch.setattr(time, "time", real_time)
+    inventory.invalidate("instance", "me", "us-east-1")
+    assert not inventory.is_fresh("instance", "me", "us-east-1", 60)
+
+
+def test_update_changes_stored_item(inventory):
+    inventory.upsert("instance", "me", "us-east-1", [{"Id": "i-1", "State": {"Name": "running"}}], "Id")
+    inventory.update("instance", "me", "us-east-1", "i-1", lambda item: item["State"].update(Name="stopped"))
+    inventory.update("instance", "me", "us-east-1", "i-missing", lambda item: item.clear())
+    assert inventory.items("instance", "me", "us-east-1") == [{"Id": "i-1", "State": {"Name": "stopped"}}]
@@ -0,0 +1,82 @@
+import os
+import subprocess
+import sys
+import time
+import pytest
+from click.testing import CliRunner
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+# Wall-clock budget for a cold `awsctl --help` / completion process, in seconds
+STARTUP_BUDGET = float(os.environ.get("AWSCTL_STARTUP_BUDGET", "1.5"))
+
+PROBE = """
+import sys, main
+try:
+    main.cli(prog_name='awsctl')
+except SystemExit:
+    pass
+heavy = sorted(m for m in ('boto3', 'botocore', 'aws_object') if m in sys.modules)
+sys.stderr.write('HEAVY=' + ','.join(heavy))
+"""
+
+
+def run_probe(args, env=None):
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE, *args],
+        cwd=ROOT_DIR, capture_output=True, text=True,
+        env={**os.environ, **(env or {})}, timeout=60,
+    )
+    elapsed = time.perf_counter() - start
+    heavy = result.stderr.rsplit("HEAVY=", 1)[-1].strip()
+    return result.stdout, heavy, elapsed
+
+
+def test_help_does_not_import_aws_sdk():
+    out, heavy, elapsed = run_probe(["--help"])
+    assert "route53" in out
+    assert heavy == ""
+    assert elapsed < STARTUP_BUDGET
+
+
+def test_completion_does_not_import_aws_sdk():
+    out, heavy, elapsed = run_probe([], env={
+        "_AWSCTL_COMPLETE": "bash_complete",
+        "COMP_WORDS": "awsctl s3 up",
+        "COMP_CWORD": "2",
+    })
+    assert "upload" in out
+    assert heavy == ""
+    assert elapsed < STARTUP_BUDGET
+
+
+def test_subcommand_help_does_not_prompt_or_import():
+    out, heavy, _ = run_probe(["ec2", "list", "--help"])
+    assert "--refresh" in out
+    assert heavy == ""
+
+
+def test_lazy_commands_still_run(monkeypatch):
+    moto = pytest.importorskip("moto")
+    from main import cli
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    with moto.mock_aws():
+        result = CliRunner().invoke(cli, ["--owner", "test-owner", "s3", "create-bucket", "lazy-bucket"])
+    assert result.exit_code == 0, result.output
+    assert "Bucket lazy-bucket created" in result.output
+
+
+def test_profile_calls_writes_summary_and_trace(monkeypatch, tmp_path):
+    import json
+    moto = pytest.importorskip("moto")
+    from main import cli
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    trace = tmp_path / "trace.json"
+    with moto.mock_aws():
+        result = CliRunner().invoke(cli, ["--owner", "test-owner", "--trace-file", str(trace), "s3", "create-bucket", "traced-bucket"])
+    assert result.exit_code == 0, result.output
+    assert "CreateBucket" in result.output and "ms wall" in result.output
+    names = [e["name"] for e in json.loads(trace.read_text())["traceEvents"] if e["ph"] == "X"]
+    assert names == ["s3.CreateBucket", "s3.PutBucketTagging"]
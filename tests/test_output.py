@@ -0,0 +1,90 @@
+import json
+import click
+import pytest
+from commands import AwsContext
+from commands import output
+from commands.output import get_field, render
+
+INSTANCE = {
+    'InstanceId': 'i-1',
+    'State': {'Name': 'running'},
+    'NetworkInterfaces': [{'PrivateIpAddress': '10.0.0.1'}],
+    'Tags': [{'Key': 'Owner', 'Value': 'me'}],
+}
+
+
+def _render(capsys, records, fmt, fields=None, **kwargs):
+    ctx_obj = AwsContext(output=fmt, fields=fields)
+    count = render(ctx_obj, records, lambda r: f"id: {r['InstanceId']}", ['InstanceId', 'State.Name'], **kwargs)
+    return count, capsys.readouterr().out
+
+
+def test_get_field_paths():
+    assert get_field(INSTANCE, 'State.Name') == 'running'
+    assert get_field(INSTANCE, 'NetworkInterfaces.0.PrivateIpAddress') == '10.0.0.1'
+    assert get_field(INSTANCE, 'NetworkInterfaces.3.PrivateIpAddress') is None
+    assert get_field(INSTANCE, 'Tags.Owner') == 'me'
+    assert get_field(INSTANCE, 'Tags.Missing') is None
+    assert get_field(INSTANCE, 'InstanceId.Nope') is None
+
+
+def test_render_formats(capsys):
+    records = [INSTANCE, dict(INSTANCE, InstanceId='i-2', State={'Name': 'stopped'})]
+    assert _render(capsys, records, 'text') == (2, 'id: i-1\nid: i-2\n')
+    count, out = _render(capsys, iter(records), 'ndjson', ['InstanceId', 'Tags.Owner'])
+    assert [json.loads(line) for line in out.splitlines()] == [
+        {'InstanceId': 'i-1', 'Tags.Owner': 'me'}, {'InstanceId': 'i-2', 'Tags.Owner': 'me'}]
+    count, out = _render(capsys, iter(records), 'json')
+    assert json.loads(out) == records
+    count, out = _render(capsys, iter(records), 'table')
+    assert out.splitlines() == ['InstanceId  State.Name', 'i-1         running', 'i-2         stopped']
+    count, out = _render(capsys, records, 'text', ['InstanceId', 'State.Name', 'PublicIpAddress'])
+    assert out == 'i-1\trunning\t-\ni-2\tstopped\t-\n'
+
+
+def test_render_empty(capsys):
+    assert _render(capsys, [], 'text', empty='No instances found') == (0, 'No instances found\n')
+    assert _render(capsys, [], 'json', empty='No instances found') == (0, '[]\n')
+    assert _render(capsys, [], 'ndjson', empty='No instances found') == (0, '')
+
+
+def test_render_streams_in_chunks(capsys, monkeypatch):
+    # The first row is flushed at once, then every FLUSH_EVERY rows, before the iterator is exhausted
+    monkeypatch.setattr(output, 'FLUSH_EVERY', 2)
+    monkeypatch.setattr(output, 'FLUSH_INTERVAL', 3600)
+    monkeypatch.setattr(output, 'TABLE_SAMPLE', 2)
+    seen = []
+
+    def records():
+        for i in range(5):
+            seen.append(capsys.readouterr().out)
+            yield {'InstanceId': f'i-{i}', 'State': {'Name': 'running'}}
+
+    for fmt in ('ndjson', 'table'):
+        seen.clear()
+        _render(capsys, records(), fmt)
+        assert seen[2] and seen[4]
+        assert not seen[3]
+    seen.clear()
+    _render(capsys, records(), 'ndjson')
+    assert seen[1] == '{"InstanceId": "i-0", "State": {"Name": "running"}}\n'
+
+
+def test_render_flushes_slow_listings(capsys, monkeypatch):
+    # Rows held back longer than FLUSH_INTERVAL are written without waiting for FLUSH_EVERY
+    monkeypatch.setattr(output, 'FLUSH_INTERVAL', 0)
+    seen = []
+
+    def records():
+        for i in range(3):
+            seen.append(capsys.readouterr().out)
+            yield {'InstanceId': f'i-{i}', 'State': {'Name': 'running'}}
+
+    _render(capsys, records(), 'text')
+    assert seen[1:] == ['id: i-0\n', 'id: i-1\n']
+
+
+def test_parse_fields_rejects_empty():
+    assert output.parse_fields(None, None, 'a, b.c') == ['a', 'b.c']
+    with pytest.raises(click.BadParameter):
+        output.parse_fields(None, None, ' , ')
@@ -73,3 +73,129 @@ def test_update_record(route53_instance):
     
     a_records = [r for r in record_sets['ResourceRecordSets'] if r['Type'] == 'A' and r['Name'] == 'update-me.example.com.']
     assert a_records[0]['ResourceRecords'][0]['Value'] == '9.9.9.9'
+
+@mock_aws
+def test_list_zones_filters_by_tags_and_uses_inventory(aws_object, mocker):
+    route53_client = boto3.client("route53", region_name="us-east-1")
+    route53_client.create_hosted_zone(Name="foreign.com", CallerReference="foreign")
+    owned = Route53(aws_object, "owned.com")
+
+    r53 = Route53(aws_object)
+    assert [z['Id'] for z in r53.list_zones(refresh=True)] == [owned.resourceId]
+
+    spy = mocker.spy(r53.route53, "list_hosted_zones")
+    assert [z['Name'] for z in r53.list_zones()] == ["owned.com."]
+    assert spy.call_count == 0
+
+@mock_aws
+def test_existing_zone_is_resolved_not_recreated(aws_object):
+    first = Route53(aws_object, "reuse.com")
+    assert first.created is True
+
+    second = Route53(AwsObject("testing", "testing", "test-owner"), "reuse.com")
+    assert second.created is False
+    assert second.resourceId == first.resourceId
+    zones = boto3.client("route53", region_name="us-east-1").list_hosted_zones()['HostedZones']
+    assert [z['Name'] for z in zones].count("reuse.com.") == 1
+
+@mock_aws
+def test_cached_zone_id_means_single_change_call(aws_object, mocker):
+    Route53(aws_object, "cached.com")
+    fresh = AwsObject("testing", "testing", "test-owner")
+    client = fresh.client("route53")
+    lookup = mocker.spy(client, "list_hosted_zones_by_name")
+    change = mocker.spy(client, "change_resource_record_sets")
+
+    r53 = Route53(fresh, "cached.com", create_if_missing=False)
+    r53.create_record("www.cached.com", "1.2.3.4")
+    assert lookup.call_count == 0
+    assert change.call_count == 1
+
+@mock_aws
+def test_missing_zone_is_not_created_unless_asked(aws_object):
+    from botocore.exceptions import ClientError
+    with pytest.raises(ClientError) as exc:
+        Route53(aws_object, "absent.com", create_if_missing=False)
+    assert exc.value.response['Error']['Code'] == 'NoSuchHostedZone'
+    zones = boto3.client("route53", region_name="us-east-1").list_hosted_zones()['HostedZones']
+    assert zones == []
+
+@mock_aws
+def test_stale_cached_zone_is_resolved_again(aws_object):
+    r53 = Route53(aws_object, "stale.com")
+    aws_object.hosted_zone_ids.set(r53._zone_cache_key("stale.com."), "/hostedzone/DELETED")
+
+    again = Route53(aws_object, "stale.com", create_if_missing=False)
+    assert again.resourceId == "/hostedzone/DELETED"
+    response = again.create_record("www.stale.com", "1.2.3.4")
+    assert response['ResponseMetadata']['HTTPStatusCode'] == 200
+    assert again.resourceId == r53.resourceId
+
+@mock_aws
+def test_zone_deleted_out_of_band_is_created_again(aws_object):
+    first = Route53(aws_object, "gone.com")
+    client = boto3.client("route53", region_name="us-east-1")
+    client.delete_hosted_zone(Id=first.resourceId)
+
+    again = Route53(aws_object, "gone.com")
+    assert again.created is True
+    assert again.resourceId != first.resourceId
+    assert [z['Id'] for z in client.list_hosted_zones()['HostedZones']] == [again.resourceId]
+    assert aws_object.hosted_zone_ids.get(again._zone_cache_key("gone.com.")) == again.resourceId
+
+@mock_aws
+def test_plan_records_recovers_from_stale_zone(aws_object):
+    r53 = Route53(aws_object, "plan.com")
+    r53.create_record("www.plan.com", "1.1.1.1")
+    aws_object.hosted_zone_ids.set(r53._zone_cache_key("plan.com."), "/hostedzone/DELETED")
+
+    again = Route53(aws_object, "plan.com", create_if_missing=False)
+    changes = again.plan_records([{'name': 'www', 'values': ['1.1.1.1']}])
+    assert changes == []
+    assert again.resourceId == r53.resourceId
+
+def test_plan_records_diffs_against_zone(route53_instance):
+    route53_instance.create_record("same.example.com", "1.1.1.1")
+    route53_instance.create_record("changed.example.com", "2.2.2.2")
+    route53_instance.create_record("stale.example.com", "3.3.3.3")
+    records = [
+        {'name': 'same', 'type': 'A', 'ttl': 300, 'values': ['1.1.1.1']},
+        {'name': 'changed.example.com', 'type': 'A', 'ttl': 300, 'values': ['9.9.9.9']},
+        {'name': 'new', 'type': 'A', 'ttl': 60, 'values': ['4.4.4.4']},
+    ]
+    plan = {(c['Action'], c['ResourceRecordSet']['Name']) for c in route53_instance.plan_records(records)}
+    assert plan == {('UPSERT', 'changed.example.com.'), ('CREATE', 'new.example.com.')}
+
+    pruned = {(c['Action'], c['ResourceRecordSet']['Name']) for c in route53_instance.plan_records(records, prune=True)}
+    assert ('DELETE', 'stale.example.com.') in pruned
+    # The zone's own SOA/NS records are never pruned
+    assert not any(name == 'example.com.' for _, name in pruned)
+
+def test_apply_changes_batches_within_limits(route53_instance, mocker):
+    route53_instance.max_batch_records = 10
+    records = [{'name': f'host{i}', 'type': 'A', 'ttl': 300, 'values': [f'10.0.0.{i}']} for i in range(25)]
+    spy = mocker.spy(route53_instance.route53, 'change_resource_record_sets')
+    route53_instance.apply_changes(route53_instance.plan_records(records))
+    assert spy.call_count == 3
+    # Applying the same file again is a no-op
+    assert route53_instance.plan_records(records) == []
+
+def test_change_batches_counts_upsert_twice(route53_instance):
+    route53_instance.max_batch_records = 4
+    upsert = {'Action': 'UPSERT', 'ResourceRecordSet': {'Name': 'a.', 'Type': 'A', 'ResourceRecords': [{'Value': '1.1.1.1'}]}}
+    batches = list(route53_instance.change_batches([upsert] * 3))
+    assert [len(b) for b in batches] == [2, 1]
+
+def test_load_records_formats(tmp_path):
+    import io
+    from aws_object import load_records
+    csv_records = load_records(io.StringIO("name,type,ttl,value\nwww,A,60,1.2.3.4\n"), 'csv')
+    assert csv_records[0]['values'] == ['1.2.3.4'] and csv_records[0]['ttl'] == '60'
+    json_records = load_records(io.StringIO('[{"name": "mx", "type": "MX", "values": ["10 mail.example.com"]}]'), 'json')
+    assert json_records[0]['type'] == 'MX'
+    ndjson = tmp_path / "records.ndjson"
+    ndjson.write_text('{"name": "api", "value": "5.6.7.8"}\n\n')
+    with open(ndjson) as f:
+        assert load_records(f)[0]['values'] == ['5.6.7.8']
+    with pytest.raises(ValueError):
+        load_records(io.StringIO('{"name": "broken"}\n'), 'ndjson')
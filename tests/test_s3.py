@@ -67,3 +67,567 @@ def test_list_buckets(s3_instance):
     assert 'owned-bucket' in buckets
     assert 'other-owner-bucket' not in buckets
     assert 'no-tags-bucket' not in buckets
+
+def _tag_bucket(s3_client, name, owner='test-owner'):
+    s3_client.create_bucket(Bucket=name)
+    s3_client.put_bucket_tagging(Bucket=name, Tagging={'TagSet': [{'Key': 'Owner', 'Value': owner}, {'Key': 'CreatedBy', 'Value': 'platform-cli'}]})
+
+@mock_aws
+def test_list_buckets_concurrent_orders(s3_instance):
+    s3_client = boto3.client("s3", region_name="us-east-1")
+    owned = [f"owned-{i:02d}" for i in range(20)]
+    for name in owned:
+        _tag_bucket(s3_client, name)
+    _tag_bucket(s3_client, "foreign", owner="other-owner")
+    s3_client.create_bucket(Bucket="untagged")
+
+    assert s3_instance.list_buckets(max_workers=4) == owned
+    assert sorted(s3_instance.list_buckets(max_workers=4, order="completion")) == owned
+
+@mock_aws
+def test_list_buckets_reraises_unexpected_errors(s3_instance, mocker):
+    from botocore.exceptions import ClientError
+    s3_client = s3_instance.aws_object.client("s3")
+    s3_client.create_bucket(Bucket="boom")
+    mocker.patch.object(s3_client, "get_bucket_tagging", side_effect=ClientError({'Error': {'Code': 'InternalError'}}, 'GetBucketTagging'))
+    with pytest.raises(ClientError):
+        s3_instance.list_buckets()
+
+def test_list_buckets_rejects_unknown_order(s3_instance):
+    with pytest.raises(ValueError):
+        s3_instance.list_buckets(order="random")
+
+@mock_aws
+def test_bucket_region_resolved_once_and_persisted(s3_instance, aws_object, awsctl_cache_dir, mocker):
+    eu_client = boto3.client("s3", region_name="eu-west-1")
+    eu_client.create_bucket(Bucket="eu-bucket", CreateBucketConfiguration={'LocationConstraint': 'eu-west-1'})
+    eu_client.put_bucket_tagging(Bucket="eu-bucket", Tagging={'TagSet': [{'Key': 'Owner', 'Value': 'test-owner'}, {'Key': 'CreatedBy', 'Value': 'platform-cli'}]})
+
+    assert s3_instance.list_buckets() == ["eu-bucket"]
+    # Tags were read through a client pinned to the bucket's region
+    assert ("s3", "eu-west-1", None) in aws_object._clients
+    assert (awsctl_cache_dir / "bucket-regions.json").exists()
+
+    # A new process reads the region from disk instead of calling GetBucketLocation
+    fresh = S3(AwsObject("testing", "testing", "test-owner"))
+    spy = mocker.spy(fresh.aws_object.client("s3"), "get_bucket_location")
+    assert fresh.bucket_region("eu-bucket") == "eu-west-1"
+    assert spy.call_count == 0
+
+@mock_aws
+def test_bucket_region_falls_back_to_head_bucket(s3_instance, mocker):
+    from botocore.exceptions import ClientError
+    eu_client = boto3.client("s3", region_name="eu-west-1")
+    eu_client.create_bucket(Bucket="denied-bucket", CreateBucketConfiguration={'LocationConstraint': 'eu-west-1'})
+    client = s3_instance.aws_object.client("s3")
+    mocker.patch.object(client, "get_bucket_location", side_effect=ClientError({'Error': {'Code': 'AccessDenied'}}, 'GetBucketLocation'))
+
+    assert s3_instance.bucket_region("denied-bucket") == "eu-west-1"
+
+@mock_aws
+def test_upload_file_uses_bucket_region(s3_instance, tmp_path):
+    eu_client = boto3.client("s3", region_name="eu-west-1")
+    eu_client.create_bucket(Bucket="eu-bucket", CreateBucketConfiguration={'LocationConstraint': 'eu-west-1'})
+    test_file = tmp_path / "eu.txt"
+    test_file.write_text("bonjour")
+
+    assert s3_instance.upload_file("eu-bucket", str(test_file)) is True
+    assert s3_instance.aws_object.bucket_regions.get("eu-bucket") == "eu-west-1"
+    assert eu_client.get_object(Bucket="eu-bucket", Key="eu.txt")['Body'].read() == b"bonjour"
+
+@mock_aws
+def test_create_bucket_records_region(s3_instance):
+    assert s3_instance.create_bucket("new-bucket") is True
+    assert s3_instance.aws_object.bucket_regions.get("new-bucket") == "us-east-1"
+
+@mock_aws
+def test_stale_region_is_re_resolved(s3_instance, mocker):
+    from botocore.exceptions import ClientError
+    boto3.client("s3", region_name="us-east-1").create_bucket(Bucket="moved-bucket")
+    s3_instance.aws_object.bucket_regions.set("moved-bucket", "ap-south-1")
+    calls = []
+
+    def fn(client):
+        calls.append(client.meta.region_name)
+        if client.meta.region_name == "ap-south-1":
+            raise ClientError({'Error': {'Code': 'PermanentRedirect'}}, 'GetBucketTagging')
+        return "ok"
+
+    assert s3_instance._call_bucket("moved-bucket", fn) == "ok"
+    assert calls == ["ap-south-1", "us-east-1"]
+    assert s3_instance.aws_object.bucket_regions.get("moved-bucket") == "us-east-1"
+
+@mock_aws
+def test_list_owned_buckets_uses_inventory(s3_instance, mocker):
+    s3_client = boto3.client("s3", region_name="us-east-1")
+    _tag_bucket(s3_client, "owned-a")
+    assert list(s3_instance.list_owned_buckets()) == ["owned-a"]
+
+    # Buckets created through the tool land in the index without a resync
+    s3_instance.create_bucket("owned-b")
+    spy = mocker.spy(s3_instance.aws_object.client("s3"), "list_buckets")
+    assert list(s3_instance.list_owned_buckets()) == ["owned-a", "owned-b"]
+    assert spy.call_count == 0
+
+    _tag_bucket(s3_client, "owned-c")
+    assert list(s3_instance.list_owned_buckets(refresh=True)) == ["owned-a", "owned-b", "owned-c"]
+    assert spy.call_count == 1
+
+@mock_aws
+def test_cli_list_buckets_structured_output(aws_credentials):
+    import json
+    from click.testing import CliRunner
+    from main import cli
+    s3_client = boto3.client("s3", region_name="us-east-1")
+    _tag_bucket(s3_client, "owned-a")
+    s3_client.put_bucket_tagging(Bucket="owned-a", Tagging={'TagSet': [
+        {'Key': 'Owner', 'Value': 'test-owner'}, {'Key': 'CreatedBy', 'Value': 'platform-cli'}, {'Key': 'team', 'Value': 'data'}]})
+    _tag_bucket(s3_client, "other", owner="other-owner")
+    runner = CliRunner()
+    result = runner.invoke(cli, ['--owner', 'test-owner', '--output', 'ndjson', '--fields', 'Name,Region,Tags.team', 's3', 'list-buckets'])
+    assert result.exit_code == 0, result.output
+    assert [json.loads(line) for line in result.output.splitlines()] == [{'Name': 'owned-a', 'Region': 'us-east-1', 'Tags.team': 'data'}]
+
+    # The second listing comes from the inventory and carries the same record
+    result = runner.invoke(cli, ['--owner', 'test-owner', '--output', 'json', 's3', 'list-buckets'])
+    assert result.exit_code == 0, result.output
+    [bucket] = json.loads(result.output)
+    assert bucket['Name'] == 'owned-a' and bucket['CreationDate']
+
+def _put_multipart(s3_client, tmp_path, key, size, part_size=5 * 1024 * 1024):
+    from boto3.s3.transfer import TransferConfig
+    data = os.urandom(size)
+    source = tmp_path / "source.bin"
+    source.write_bytes(data)
+    s3_client.upload_file(str(source), "dl-bucket", key, Config=TransferConfig(multipart_threshold=part_size, multipart_chunksize=part_size))
+    return data
+
+@mock_aws
+def test_download_file_ranged_and_verified(s3_instance, tmp_path):
+    from click.testing import CliRunner
+    from main import cli
+    s3_client = boto3.client("s3", region_name="us-east-1")
+    s3_client.create_bucket(Bucket="dl-bucket")
+    data = _put_multipart(s3_client, tmp_path, "big.bin", 11 * 1024 * 1024 + 7)
+    s3_client.put_object(Bucket="dl-bucket", Key="empty", Body=b"")
+
+    dest = tmp_path / "big.bin"
+    result = s3_instance.download_file("dl-bucket", "big.bin", str(dest), part_size=1024 * 1024, max_workers=4)
+    assert dest.read_bytes() == data
+    assert result == {'Size': len(data), 'Parts': 12, 'Resumed': 0, 'Verified': True}
+    assert not (tmp_path / "big.bin.awsctl-part").exists()
+
+    assert s3_instance.download_file("dl-bucket", "empty", str(tmp_path / "empty"))['Verified'] is True
+    assert (tmp_path / "empty").read_bytes() == b""
+
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    result = CliRunner().invoke(cli, ['--owner', 'test-owner', 's3', 'download', '--bucket', 'dl-bucket', '--part-size', '2', 'big.bin', str(out_dir)])
+    assert result.exit_code == 0, result.output
+    assert 'in 6 parts, checksum verified' in result.output
+    assert (out_dir / "big.bin").read_bytes() == data
+
+@mock_aws
+def test_download_file_resumes_after_failure(s3_instance, tmp_path, mocker):
+    from botocore.exceptions import ClientError, ResponseStreamingError
+    s3_client = boto3.client("s3", region_name="us-east-1")
+    s3_client.create_bucket(Bucket="dl-bucket")
+    data = _put_multipart(s3_client, tmp_path, "big.bin", 6 * 1024 * 1024)
+    client = s3_instance.bucket_client("dl-bucket")
+    real_get_object = client.get_object
+    calls = []
+    total = []
+
+    def flaky_get_object(**kwargs):
+        calls.append(kwargs['Range'])
+        total.append(kwargs['Range'])
+        if len(total) == 2:
+            # A dropped connection is retried for the same range
+            raise ResponseStreamingError(error="connection reset")
+        if len(total) == 5:
+            raise ClientError({'Error': {'Code': 'InternalError', 'Message': 'boom'}}, 'GetObject')
+        return real_get_object(**kwargs)
+
+    mocker.patch.object(client, 'get_object', side_effect=flaky_get_object)
+    dest = tmp_path / "big.bin"
+    with pytest.raises(ClientError):
+        s3_instance.download_file("dl-bucket", "big.bin", str(dest), part_size=1024 * 1024, max_workers=1)
+    assert calls[1] == calls[2]
+    assert not dest.exists()
+
+    calls.clear()
+    result = s3_instance.download_file("dl-bucket", "big.bin", str(dest), part_size=1024 * 1024, max_workers=1)
+    assert result['Resumed'] == 3 * 1024 * 1024
+    assert len(calls) == 3
+    assert dest.read_bytes() == data
+
+    # A changed object is never stitched onto ranges of the old one
+    _put_multipart(s3_client, tmp_path, "big.bin", 6 * 1024 * 1024)
+    (tmp_path / "big.bin.awsctl-part").write_bytes(b"x" * 6 * 1024 * 1024)
+    calls.clear()
+    assert s3_instance.download_file("dl-bucket", "big.bin", str(dest), part_size=1024 * 1024)['Resumed'] == 0
+    assert len(calls) == 6
+
+@mock_aws
+def test_iter_objects_sharded_matches_serial_listing(s3_instance, mocker):
+    s3_client = boto3.client("s3", region_name="us-east-1")
+    s3_client.create_bucket(Bucket="ls-bucket")
+    keys = ["top.txt"] + [f"logs/{d}/{i}.log" for d in ("a", "b", "c") for i in range(7)] + [f"data/{i:03d}" for i in range(12)]
+    for key in keys:
+        s3_client.put_object(Bucket="ls-bucket", Key=key, Body=b"x")
+
+    serial = [obj['Key'] for obj in s3_instance.iter_objects("ls-bucket", page_size=5)]
+    assert serial == sorted(keys)
+    spy = mocker.spy(s3_instance.bucket_client("ls-bucket"), "list_objects_v2")
+    sharded = [obj['Key'] for obj in s3_instance.iter_objects_sharded("ls-bucket", max_workers=3, page_size=5)]
+    assert sorted(sharded) == sorted(keys)
+    # One delimiter listing of the root, then each top-level prefix as its own chain
+    assert sorted(call.kwargs['Prefix'] for call in spy.call_args_list) == [''] + ['data/'] * 3 + ['logs/'] * 5
+
+    spy.reset_mock()
+    deeper = [obj['Key'] for obj in s3_instance.iter_objects_sharded("ls-bucket", prefix="logs/", shard_depth=2)]
+    assert sorted(deeper) == sorted(k for k in keys if k.startswith("logs/"))
+    assert sorted(call.kwargs['Prefix'] for call in spy.call_args_list) == ['logs/', 'logs/a/', 'logs/b/', 'logs/c/']
+
+    # Stopping early does not leave workers blocked behind the page queue
+    objects = s3_instance.iter_objects_sharded("ls-bucket", max_workers=2, page_size=1)
+    assert next(objects)['Key']
+    objects.close()
+
+@mock_aws
+def test_cli_ls(aws_credentials):
+    from click.testing import CliRunner
+    from main import cli
+    s3_client = boto3.client("s3", region_name="us-east-1")
+    s3_client.create_bucket(Bucket="ls-bucket")
+    for key in ("a/1", "a/2", "b/1"):
+        s3_client.put_object(Bucket="ls-bucket", Key=key, Body=b"abc")
+    runner = CliRunner()
+    result = runner.invoke(cli, ['--owner', 'test-owner', 's3', 'ls', 'ls-bucket', '--prefix', 'a/'])
+    assert result.exit_code == 0, result.output
+    assert [line.split()[-2:] for line in result.output.splitlines()] == [['3', 'a/1'], ['3', 'a/2']]
+    result = runner.invoke(cli, ['--owner', 'test-owner', '--output', 'ndjson', '--fields', 'Key', 's3', 'ls', 'ls-bucket', '--parallel'])
+    assert result.exit_code == 0, result.output
+    assert sorted(result.output.splitlines()) == ['{"Key": "a/1"}', '{"Key": "a/2"}', '{"Key": "b/1"}']
+    result = runner.invoke(cli, ['--owner', 'test-owner', 's3', 'ls', 'missing-bucket', '--parallel'])
+    assert result.exit_code == 1
+    assert 'NoSuchBucket' in result.output
+
+@mock_aws
+def test_delete_prefix_pipelines_batches(s3_instance, mocker):
+    s3_client = boto3.client("s3", region_name="us-east-1")
+    s3_client.create_bucket(Bucket="del-bucket")
+    for i in range(20):
+        s3_client.put_object(Bucket="del-bucket", Key=f"logs/{i:02d}", Body=b"x")
+    s3_client.put_object(Bucket="del-bucket", Key="keep/me", Body=b"x")
+    client = s3_instance.bucket_client("del-bucket")
+    real_delete = client.delete_objects
+
+    def delete_objects(**kwargs):
+        response = real_delete(**kwargs)
+        # Report one key as failed, like a per-key AccessDenied
+        first = kwargs['Delete']['Objects'][0]['Key']
+        if first == "logs/00":
+            response['Errors'] = [{'Key': first, 'Code': 'AccessDenied', 'Message': 'Access Denied'}]
+        return response
+
+    spy = mocker.patch.object(client, "delete_objects", side_effect=delete_objects)
+    results = list(s3_instance.delete_prefix("del-bucket", "logs/", max_workers=2, batch_size=3))
+    assert spy.call_count == 7
+    assert sum(deleted for deleted, _ in results) == 19
+    assert [error['Key'] for _, errors in results for error in errors] == ["logs/00"]
+    assert [obj['Key'] for obj in s3_instance.iter_objects("del-bucket")] == ["keep/me"]
+
+@mock_aws
+def test_delete_prefix_versions(s3_instance):
+    s3_client = boto3.client("s3", region_name="us-east-1")
+    s3_client.create_bucket(Bucket="ver-bucket")
+    s3_client.put_bucket_versioning(Bucket="ver-bucket", VersioningConfiguration={'Status': 'Enabled'})
+    for body in (b"1", b"2"):
+        s3_client.put_object(Bucket="ver-bucket", Key="doc", Body=body)
+
+    # Without versions a versioned bucket only gets a delete marker
+    assert sum(deleted for deleted, _ in s3_instance.delete_prefix("ver-bucket")) == 1
+    assert len(list(s3_instance.iter_object_versions("ver-bucket"))) == 3
+    assert sum(deleted for deleted, _ in s3_instance.delete_prefix("ver-bucket", versions=True)) == 3
+    assert list(s3_instance.iter_object_versions("ver-bucket")) == []
+
+@mock_aws
+def test_cli_empty_bucket(aws_credentials):
+    from click.testing import CliRunner
+    from main import cli
+    runner = CliRunner()
+    base = ['--owner', 'test-owner']
+    assert runner.invoke(cli, base + ['s3', 'create-bucket', 'mine']).exit_code == 0
+    s3_client = boto3.client("s3", region_name="us-east-1")
+    s3_client.create_bucket(Bucket="theirs")
+    for bucket in ("mine", "theirs"):
+        for i in range(3):
+            s3_client.put_object(Bucket=bucket, Key=f"tmp/{i}", Body=b"x")
+    s3_client.put_object(Bucket="mine", Key="keep", Body=b"x")
+
+    result = runner.invoke(cli, base + ['s3', 'delete-prefix', 'mine', 'tmp/'], input='n\n')
+    assert result.exit_code == 1
+    result = runner.invoke(cli, base + ['s3', 'delete-prefix', 'mine', 'tmp/'], input='y\n')
+    assert result.exit_code == 0, result.output
+    assert '3 objects deleted, 0 failed' in result.output
+
+    result = runner.invoke(cli, base + ['s3', 'empty-bucket', 'theirs', '--yes'])
+    assert result.exit_code == 1
+    assert 'not tagged as owned' in result.output
+
+    result = runner.invoke(cli, base + ['s3', 'empty-bucket', 'mine', '--yes', '--delete-bucket'])
+    assert result.exit_code == 0, result.output
+    assert 'Bucket mine deleted' in result.output
+    assert [b['Name'] for b in s3_client.list_buckets()['Buckets']] == ['theirs']
+    result = runner.invoke(cli, base + ['s3', 'list-buckets'])
+    assert 'No owned buckets found' in result.output
+
+@mock_aws
+def test_upload_stream_reuses_bounded_buffers(s3_instance, mocker):
+    import io
+    import aws_object
+    s3_client = boto3.client("s3", region_name="us-east-1")
+    s3_client.create_bucket(Bucket="stream-bucket")
+    part = 5 * 1024 * 1024
+    data = os.urandom(4 * part + 123)
+    allocations = []
+    real_bytearray = bytearray
+    mocker.patch.object(aws_object, "bytearray", side_effect=lambda size: allocations.append(size) or real_bytearray(size), create=True)
+    # Parts double in size after every 2 parts here: 5, 5, 10 MiB and the last 123 bytes
+    mocker.patch.object(s3_instance, "part_growth_every", 2)
+    config = s3_instance.transfer_config(multipart_chunksize=part, max_concurrency=2)
+
+    assert s3_instance.upload_stream("stream-bucket", io.BytesIO(data), "dump.sql", transfer_config=config) == len(data)
+    assert s3_client.get_object(Bucket="stream-bucket", Key="dump.sql")['Body'].read() == data
+    assert s3_client.head_object(Bucket="stream-bucket", Key="dump.sql")['ETag'].endswith('-4"')
+    # Three buffers at most (two uploading, one filling), regrown once for the bigger parts
+    assert allocations.count(part) <= 3 and 1 <= allocations.count(2 * part) <= 3
+    tags = s3_client.get_object_tagging(Bucket="stream-bucket", Key="dump.sql")['TagSet']
+    assert {'Key': 'Owner', 'Value': 'test-owner'} in tags
+
+    # Short streams are a single PutObject
+    assert s3_instance.upload_stream("stream-bucket", io.BytesIO(b"tiny"), "tiny", transfer_config=config) == 4
+    assert s3_client.get_object(Bucket="stream-bucket", Key="tiny")['Body'].read() == b"tiny"
+
+@mock_aws
+def test_upload_stream_aborts_on_failure(s3_instance, mocker):
+    import io
+    from botocore.exceptions import ClientError
+    s3_client = boto3.client("s3", region_name="us-east-1")
+    s3_client.create_bucket(Bucket="stream-bucket")
+    client = s3_instance.bucket_client("stream-bucket")
+    mocker.patch.object(client, "upload_part", side_effect=ClientError({'Error': {'Code': 'InternalError', 'Message': 'boom'}}, 'UploadPart'))
+    stream = io.BytesIO(os.urandom(30 * 1024 * 1024))
+    config = s3_instance.transfer_config(multipart_chunksize=5 * 1024 * 1024, max_concurrency=1)
+    with pytest.raises(ClientError):
+        s3_instance.upload_stream("stream-bucket", stream, "broken", transfer_config=config)
+    # Reading stopped early and nothing is left behind
+    assert stream.tell() < 30 * 1024 * 1024
+    assert s3_client.list_multipart_uploads(Bucket="stream-bucket").get('Uploads', []) == []
+
+@mock_aws
+def test_cli_upload_stdin(aws_credentials):
+    from click.testing import CliRunner
+    from main import cli
+    s3_client = boto3.client("s3", region_name="us-east-1")
+    s3_client.create_bucket(Bucket="stream-bucket")
+    runner = CliRunner()
+    result = runner.invoke(cli, ['--owner', 'test-owner', 's3', 'upload', '--bucket', 'stream-bucket', '--prefix', 'backups', '--key', 'db.sql', '-'], input=b"select 1;\n")
+    assert result.exit_code == 0, result.output
+    assert s3_client.get_object(Bucket="stream-bucket", Key="backups/db.sql")['Body'].read() == b"select 1;\n"
+    result = runner.invoke(cli, ['--owner', 'test-owner', 's3', 'upload', '--bucket', 'stream-bucket', '-'])
+    assert result.exit_code == 2
+
+@mock_aws
+def test_copy_object_small_and_multipart(s3_instance, tmp_path, mocker):
+    s3_client = boto3.client("s3", region_name="us-east-1")
+    s3_client.create_bucket(Bucket="dl-bucket")
+    s3_client.create_bucket(Bucket="copy-dst")
+    data = _put_multipart(s3_client, tmp_path, "big.bin", 12 * 1024 * 1024)
+    s3_client.put_object(Bucket="dl-bucket", Key="small.txt", Body=b"hello", ContentType="text/plain",
+                         Tagging="Owner=someone-else&team=data")
+    s3_client.put_object_tagging(Bucket="dl-bucket", Key="big.bin", Tagging={'TagSet': [{'Key': 'team', 'Value': 'data'}]})
+    s3_client.copy_object(Bucket="dl-bucket", Key="big.bin", CopySource={'Bucket': 'dl-bucket', 'Key': 'big.bin'},
+                          ContentType="application/x-tar", MetadataDirective="REPLACE", Metadata={'build': '42'}, TaggingDirective="COPY")
+    # The GetObject/PutObject path is never used: only server-side copies
+    client = s3_instance.bucket_client("copy-dst")
+    get_spy = mocker.spy(client, "get_object")
+    part_spy = mocker.spy(client, "upload_part_copy")
+    head_spy = mocker.spy(client, "head_object")
+    config = s3_instance.transfer_config(multipart_threshold=5 * 1024 * 1024, multipart_chunksize=5 * 1024 * 1024)
+
+    assert s3_instance.copy_object("dl-bucket", "small.txt", "copy-dst", "small.txt", transfer_config=config) == 5
+    tags = s3_client.get_object_tagging(Bucket="copy-dst", Key="small.txt")['TagSet']
+    assert {'Key': 'Owner', 'Value': 'test-owner'} in tags and {'Key': 'team', 'Value': 'data'} not in tags
+
+    assert s3_instance.copy_object("dl-bucket", "big.bin", "copy-dst", "copy/big.bin", tags="copy", transfer_config=config) == len(data)
+    assert part_spy.call_count == 3
+    assert get_spy.call_count == 0
+    # One HEAD per object gives both the size and the metadata for the multipart path
+    assert head_spy.call_count == 2
+    assert s3_client.get_object(Bucket="copy-dst", Key="copy/big.bin")['Body'].read() == data
+    head = s3_client.head_object(Bucket="copy-dst", Key="copy/big.bin")
+    assert head['ContentType'] == "application/x-tar" and head['Metadata'] == {'build': '42'}
+    assert s3_client.get_object_tagging(Bucket="copy-dst", Key="copy/big.bin")['TagSet'] == [{'Key': 'team', 'Value': 'data'}]
+
+@mock_aws
+def test_copy_objects_into_own_prefix_ends(s3_instance):
+    s3_client = boto3.client("s3", region_name="us-east-1")
+    s3_client.create_bucket(Bucket="nest-bucket")
+    for i in range(30):
+        s3_client.put_object(Bucket="nest-bucket", Key=f"data/{i:04d}", Body=b"x")
+    # Small pages, so later pages are listed after earlier copies already exist
+    results = list(s3_instance.copy_objects("nest-bucket", "data/", "nest-bucket", "data/zz/", max_workers=4, page_size=5))
+    assert sorted(dst for _, dst, error in results if error is None) == [f"data/zz/{i:04d}" for i in range(30)]
+    keys = [obj['Key'] for obj in s3_instance.iter_objects("nest-bucket")]
+    assert len(keys) == 60 and not any(key.startswith("data/zz/zz/") for key in keys)
+
+    with pytest.raises(ValueError):
+        list(s3_instance.copy_objects("nest-bucket", "data/", "nest-bucket", "data/"))
+
+@mock_aws
+def test_cli_copy_prefix_and_key(aws_credentials):
+    from click.testing import CliRunner
+    from main import cli
+    s3_client = boto3.client("s3", region_name="us-east-1")
+    for bucket in ("copy-src", "copy-dst"):
+        s3_client.create_bucket(Bucket=bucket)
+    for key in ("site/index.html", "site/js/app.js", "other.txt"):
+        s3_client.put_object(Bucket="copy-src", Key=key, Body=key.encode())
+    runner = CliRunner()
+    base = ['--owner', 'test-owner', 's3', 'copy']
+
+    result = runner.invoke(cli, base + ['s3://copy-src/site/', 's3://copy-dst/backup', '--workers', '2'])
+    assert result.exit_code == 0, result.output
+    assert '2 copied, 0 failed' in result.output
+    assert sorted(obj['Key'] for obj in s3_client.list_objects_v2(Bucket="copy-dst")['Contents']) == ['backup/index.html', 'backup/js/app.js']
+
+    result = runner.invoke(cli, base + ['s3://copy-src/other.txt', 's3://copy-dst/'])
+    assert result.exit_code == 0, result.output
+    assert s3_client.get_object(Bucket="copy-dst", Key="other.txt")['Body'].read() == b"other.txt"
+
+    result = runner.invoke(cli, base + ['s3://copy-src', 's3://copy-dst/all'])
+    assert '3 copied, 0 failed' in result.output
+    result = runner.invoke(cli, base + ['s3://copy-src/site/', 's3://copy-src/site/'])
+    assert result.exit_code == 2 and 'is the source itself' in result.output
+    result = runner.invoke(cli, base + ['s3://copy-src/missing/', 's3://copy-dst/'])
+    assert result.exit_code == 1 and 'No objects matched' in result.output
+
+def test_expand_upload_paths(tmp_path):
+    from aws_object import expand_upload_paths
+    (tmp_path / "build" / "js").mkdir(parents=True)
+    (tmp_path / "build" / "index.html").write_text("x")
+    (tmp_path / "build" / "js" / "app.js").write_text("x")
+    (tmp_path / "notes.txt").write_text("x")
+
+    pairs = list(expand_upload_paths([str(tmp_path / "build")], prefix="site"))
+    assert [key for _, key in pairs] == ["site/index.html", "site/js/app.js"]
+    pairs = list(expand_upload_paths([str(tmp_path / "build" / "**" / "*.js")]))
+    assert [key for _, key in pairs] == ["js/app.js"]
+    pairs = list(expand_upload_paths([str(tmp_path / "notes.txt")], prefix="docs/"))
+    assert pairs == [(str(tmp_path / "notes.txt"), "docs/notes.txt")]
+
+@mock_aws
+def test_upload_paths_parallel_multipart_with_tags(s3_instance, tmp_path):
+    s3_client = boto3.client("s3", region_name="us-east-1")
+    s3_client.create_bucket(Bucket="test-bucket")
+    tree = tmp_path / "tree"
+    (tree / "sub").mkdir(parents=True)
+    (tree / "small.txt").write_text("small")
+    (tree / "sub" / "big.bin").write_bytes(b"a" * (6 * 1024 * 1024))
+
+    config = s3_instance.transfer_config(multipart_threshold=5 * 1024 * 1024, multipart_chunksize=5 * 1024 * 1024, max_concurrency=2)
+    results = list(s3_instance.upload_paths("test-bucket", [str(tree)], prefix="p", max_workers=2, transfer_config=config))
+    assert sorted(key for _, key, error in results if error is None) == ["p/small.txt", "p/sub/big.bin"]
+
+    head = s3_client.head_object(Bucket="test-bucket", Key="p/sub/big.bin")
+    # Multipart ETags carry a part count suffix
+    assert head['ETag'].strip('"').endswith("-2")
+    for key in ("p/small.txt", "p/sub/big.bin"):
+        tags = s3_client.get_object_tagging(Bucket="test-bucket", Key=key)['TagSet']
+        assert {'Key': 'Owner', 'Value': 'test-owner'} in tags
+        assert {'Key': 'CreatedBy', 'Value': 'platform-cli'} in tags
+
+@mock_aws
+def test_concurrent_transfers_get_a_pool_that_fits(s3_instance, tmp_path):
+    s3_client = boto3.client("s3", region_name="us-east-1")
+    s3_client.create_bucket(Bucket="pool-bucket")
+    s3_client.create_bucket(Bucket="pool-copy")
+    (tmp_path / "a.txt").write_text("a")
+    clients = s3_instance.aws_object._clients
+    # 4 files at once with boto3's 10 parts each need 40 connections, not the default 10
+    list(s3_instance.upload_paths("pool-bucket", [str(tmp_path)], max_workers=4))
+    assert clients[("s3", "us-east-1", None, 40)].meta.config.max_pool_connections == 40
+    list(s3_instance.copy_objects("pool-bucket", "", "pool-copy", "", max_workers=2))
+    assert ("s3", "us-east-1", None, 20) in clients
+    # Calls that fit the default pool keep sharing the default client
+    s3_instance.upload_file("pool-bucket", str(tmp_path / "a.txt"), transfer_config=s3_instance.transfer_config(max_concurrency=5))
+    assert clients[("s3", "us-east-1", None)].meta.config.max_pool_connections == 10
+    assert len([key for key in clients if key[0] == "s3"]) == 3
+
+@mock_aws
+def test_upload_paths_reports_failures(s3_instance, tmp_path):
+    test_file = tmp_path / "orphan.txt"
+    test_file.write_text("x")
+    s3_instance.aws_object.bucket_regions.set("missing-bucket", "us-east-1")
+    [(path, key, error)] = list(s3_instance.upload_paths("missing-bucket", [str(test_file)]))
+    assert key == "orphan.txt"
+    assert error is not None
+
+def test_file_digests_match_s3_etags(tmp_path):
+    import hashlib
+    from aws_object import file_digests
+    small = tmp_path / "small"
+    small.write_bytes(b"hello")
+    assert file_digests(str(small), 8, 4) == (hashlib.md5(b"hello").hexdigest(),) * 2
+    empty = tmp_path / "empty"
+    empty.write_bytes(b"")
+    assert file_digests(str(empty), 8, 4)[0] == hashlib.md5(b"").hexdigest()
+    md5, etag = file_digests(str(small), 4, 4)
+    parts = hashlib.md5(b"hell").digest() + hashlib.md5(b"o").digest()
+    assert etag == f"{hashlib.md5(parts).hexdigest()}-2"
+
+@mock_aws
+def test_sync_uploads_only_changes(s3_instance, tmp_path, mocker):
+    import os
+    s3_client = boto3.client("s3", region_name="us-east-1")
+    s3_client.create_bucket(Bucket="test-bucket")
+    s3_client.put_object(Bucket="test-bucket", Key="app/removed.txt", Body=b"old")
+    tree = tmp_path / "tree"
+    (tree / "sub").mkdir(parents=True)
+    (tree / "a.txt").write_text("a")
+    (tree / "sub" / "big.bin").write_bytes(b"b" * (6 * 1024 * 1024))
+    config = s3_instance.transfer_config(multipart_threshold=5 * 1024 * 1024, multipart_chunksize=5 * 1024 * 1024)
+
+    first = s3_instance.sync(str(tree), "test-bucket", prefix="app", delete=True, transfer_config=config)
+    assert sorted(first['uploaded']) == ["app/a.txt", "app/sub/big.bin"]
+    assert first['deleted'] == ["app/removed.txt"]
+
+    # Nothing changed: nothing is uploaded and nothing is re-hashed
+    digests = mocker.patch("aws_object.file_digests", wraps=__import__("aws_object").file_digests)
+    second = s3_instance.sync(str(tree), "test-bucket", prefix="app", transfer_config=config)
+    assert second['uploaded'] == [] and second['unchanged'] == 2
+    assert digests.call_count == 0
+
+    # Touching a file without changing its content re-hashes it but does not upload
+    os.utime(tree / "a.txt", ns=(1, 1))
+    (tree / "sub" / "big.bin").write_bytes(b"c" * (6 * 1024 * 1024))
+    third = s3_instance.sync(str(tree), "test-bucket", prefix="app", transfer_config=config)
+    assert third['uploaded'] == ["app/sub/big.bin"]
+    assert digests.call_count == 2
+    tags = s3_client.get_object_tagging(Bucket="test-bucket", Key="app/sub/big.bin")['TagSet']
+    assert {'Key': 'Owner', 'Value': 'test-owner'} in tags
+
+@mock_aws
+def test_sync_dry_run_changes_nothing(s3_instance, tmp_path):
+    s3_client = boto3.client("s3", region_name="us-east-1")
+    s3_client.create_bucket(Bucket="test-bucket")
+    s3_client.put_object(Bucket="test-bucket", Key="gone.txt", Body=b"old")
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "new.txt").write_text("new")
+    result = s3_instance.sync(str(src), "test-bucket", delete=True, dry_run=True)
+    assert result['uploaded'] == ["new.txt"] and result['deleted'] == ["gone.txt"]
+    keys = [o['Key'] for o in s3_client.list_objects_v2(Bucket="test-bucket")['Contents']]
+    assert keys == ["gone.txt"]